@@ -0,0 +1,91 @@
+"""Compare the creation of the core state space with the former implementation.
+
+Run the script with
+
+.. code-block:: bash
+
+    $ python benchmark_core_state_space.py
+
+Each implementation is executed in a fresh process such that the peak memory reported
+by the operating system is not contaminated by previous runs.
+
+"""
+import datetime as dt
+import json
+import resource
+import subprocess
+import sys
+from pathlib import Path
+
+
+MODELS = {"kw_94_one": [10, 20, 40], "kw_97_basic": [10, 15, 20], "kw_2000": [10, 15]}
+IMPLEMENTATIONS = ["enumeration", "product"]
+
+
+def main():
+    """Run the benchmark for all models, number of periods, and implementations."""
+    filepath = Path(__file__).resolve()
+
+    for model, list_of_n_periods in MODELS.items():
+        for n_periods in list_of_n_periods:
+            for implementation in IMPLEMENTATIONS:
+                subprocess.check_call(
+                    [
+                        sys.executable,
+                        str(filepath),
+                        model,
+                        str(n_periods),
+                        implementation,
+                    ]
+                )
+
+
+def run_single_benchmark(model, n_periods, implementation):
+    """Create the core state space once and record the duration and peak memory."""
+    import respy as rp
+    from respy.pre_processing.model_processing import process_params_and_options
+    from respy.state_space import _create_core_state_space
+    from respy.tests._former_code import _create_core_state_space_with_product
+
+    params, options = rp.get_example_model(model, with_data=False)
+    options["n_periods"] = n_periods
+    optim_paras, options = process_params_and_options(params, options)
+
+    func = {
+        "enumeration": _create_core_state_space,
+        "product": _create_core_state_space_with_product,
+    }[implementation]
+
+    # Compile Numba functions on a tiny model first to exclude compilation time.
+    if implementation == "enumeration":
+        options_ = {**options, "n_periods": 1}
+        func({**optim_paras, "n_periods": 1}, options_)
+
+    memory_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = dt.datetime.now()
+    core = func(optim_paras, options)
+    end = dt.datetime.now()
+
+    memory_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    output = {
+        "model": model,
+        "n_periods": n_periods,
+        "implementation": implementation,
+        "n_states": core.shape[0],
+        "duration": str(end - start),
+        "peak_memory_increase_mb": (memory_after - memory_before) / 1024,
+    }
+
+    print(json.dumps(output))  # noqa: T001
+    with open("benchmark_core_state_space.txt", "a+") as file:
+        file.write(json.dumps(output))
+        file.write("\n")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 1:
+        main()
+    else:
+        run_single_benchmark(sys.argv[1], int(sys.argv[2]), sys.argv[3])
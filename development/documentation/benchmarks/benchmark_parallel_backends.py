@@ -0,0 +1,81 @@
+"""Compare the backends for the parallelization across dense dimensions.
+
+Run the script with
+
+.. code-block:: bash
+
+    $ python benchmark_parallel_backends.py
+
+The benchmark uses the Keane and Wolpin (1997) model with four types such that every
+period has multiple dense keys which can be processed in parallel. Each combination of
+backend and number of workers is executed in a fresh process. The duration of the
+criterion function excludes the first evaluation which compiles Numba functions and
+starts the workers. The scheduling statistics of the parallelized functions are recorded
+to tune the size of tasks.
+
+"""
+import datetime as dt
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+
+MODEL = "kw_97_extended"
+N_PERIODS = 15
+N_EVALUATIONS = 3
+BACKENDS = {
+    "serial": [1],
+    "threads": [2, 4],
+    "processes": [2, 4],
+    "loky": [2, 4],
+}
+
+
+def main():
+    """Run the benchmark for all backends and numbers of workers."""
+    filepath = Path(__file__).resolve()
+
+    for backend, list_of_n_jobs in BACKENDS.items():
+        for n_jobs in list_of_n_jobs:
+            subprocess.check_call([sys.executable, str(filepath), backend, str(n_jobs)])
+
+
+def run_single_benchmark(backend, n_jobs):
+    """Evaluate the criterion function and record the average duration."""
+    import respy as rp
+    from respy.parallelization import get_scheduling_statistics
+
+    params, options, df = rp.get_example_model(MODEL)
+    options["n_periods"] = N_PERIODS
+    options["parallel"] = {"backend": backend, "n_jobs": n_jobs}
+    df = df.query("Period < @N_PERIODS")
+
+    log_like = rp.get_log_like_func(params, options, df)
+    log_like(params)
+
+    start = dt.datetime.now()
+    for _ in range(N_EVALUATIONS):
+        log_like(params)
+    end = dt.datetime.now()
+
+    output = {
+        "model": MODEL,
+        "n_periods": N_PERIODS,
+        "backend": backend,
+        "n_jobs": n_jobs,
+        "duration_per_evaluation": str((end - start) / N_EVALUATIONS),
+        "scheduling_statistics": get_scheduling_statistics(),
+    }
+
+    print(json.dumps(output))  # noqa: T001
+    with open("benchmark_parallel_backends.txt", "a+") as file:
+        file.write(json.dumps(output))
+        file.write("\n")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 1:
+        main()
+    else:
+        run_single_benchmark(sys.argv[1], int(sys.argv[2]))
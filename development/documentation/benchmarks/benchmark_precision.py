@@ -0,0 +1,107 @@
+"""Compare the single-precision and double-precision computation of the likelihood.
+
+Run the script with
+
+.. code-block:: bash
+
+    $ python benchmark_precision.py
+
+The benchmark uses the Keane and Wolpin (1997) model with four types. Each precision is
+evaluated in a fresh process such that the peak memory usage of the process can be
+compared. The duration of the criterion function excludes the first evaluation which
+compiles Numba functions. Besides the duration and the peak memory usage, the script
+records the memory of the arrays which are stored in the requested precision and the
+deviation of the criterion from the double-precision criterion.
+
+"""
+import datetime as dt
+import json
+import resource
+import subprocess
+import sys
+from pathlib import Path
+
+
+MODEL = "kw_97_extended"
+N_PERIODS = 15
+N_AGENTS = 5_000
+N_EVALUATIONS = 3
+PRECISIONS = ["float64", "float32"]
+
+
+def main():
+    """Run the benchmark for all precisions and compare the criterion values."""
+    filepath = Path(__file__).resolve()
+
+    results = {}
+    for precision in PRECISIONS:
+        output = subprocess.check_output([sys.executable, str(filepath), precision])
+        results[precision] = json.loads(output.decode().strip().splitlines()[-1])
+
+    reference = results["float64"]
+    for precision, result in results.items():
+        result["absolute_deviation"] = abs(result["criterion"] - reference["criterion"])
+        result["relative_deviation"] = result["absolute_deviation"] / abs(
+            reference["criterion"]
+        )
+        result["speedup"] = reference["seconds_per_evaluation"] / (
+            result["seconds_per_evaluation"]
+        )
+        result["memory_of_arrays_ratio"] = (
+            result["memory_of_arrays"] / reference["memory_of_arrays"]
+        )
+
+        print(json.dumps(result))  # noqa: T001
+        with open("benchmark_precision.txt", "a+") as file:
+            file.write(json.dumps(result))
+            file.write("\n")
+
+
+def run_single_benchmark(precision):
+    """Evaluate the criterion function with the precision and measure resources."""
+    import respy as rp
+
+    params, options = rp.get_example_model(MODEL, with_data=False)
+    options["n_periods"] = N_PERIODS
+    options["simulation_agents"] = N_AGENTS
+    df = rp.get_simulate_func(params, options)(params)
+
+    options["precision"] = precision
+    log_like = rp.get_log_like_func(params, options, df)
+    criterion = log_like(params)
+
+    start = dt.datetime.now()
+    for _ in range(N_EVALUATIONS):
+        log_like(params)
+    end = dt.datetime.now()
+
+    state_space = log_like.keywords["solve"].keywords["state_space"]
+    base_draws_est = log_like.keywords["base_draws_est"]
+    memory_of_arrays = sum(
+        buffer.nbytes
+        for store in [
+            state_space.wages,
+            state_space.nonpecs,
+            state_space.expected_value_functions,
+        ]
+        for buffer in store.buffers.values()
+    ) + sum(draws.nbytes for draws in base_draws_est.values())
+
+    output = {
+        "model": MODEL,
+        "n_periods": N_PERIODS,
+        "precision": precision,
+        "criterion": criterion,
+        "seconds_per_evaluation": (end - start).total_seconds() / N_EVALUATIONS,
+        "memory_of_arrays": memory_of_arrays,
+        "peak_memory_kilobytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+    print(json.dumps(output))  # noqa: T001
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 1:
+        main()
+    else:
+        run_single_benchmark(sys.argv[1])
@@ -0,0 +1,116 @@
+"""Compare variance reduction techniques for the Monte Carlo integration of the EMAX.
+
+Run the script with
+
+.. code-block:: bash
+
+    $ python benchmark_variance_reduction.py
+
+The expected value functions of all states are computed with antithetic draws, a
+control variate, both, or neither and an increasing number of draws. The error is the
+root mean squared relative deviation from a reference solution with many draws and
+averaged over multiple seeds. The duration excludes the first solution which compiles
+Numba functions.
+
+"""
+import datetime as dt
+import json
+
+import numpy as np
+
+import respy as rp
+
+
+MODELS = {"kw_94_one": 40, "kw_97_basic": 10}
+SEQUENCES = ["random", "sobol"]
+METHODS = {
+    "plain": {"solution_antithetic": False, "solution_control_variate": False},
+    "antithetic": {"solution_antithetic": True, "solution_control_variate": False},
+    "control_variate": {
+        "solution_antithetic": False,
+        "solution_control_variate": True,
+    },
+    "both": {"solution_antithetic": True, "solution_control_variate": True},
+}
+LIST_OF_N_DRAWS = [25, 50, 100, 200, 400]
+N_DRAWS_REFERENCE = 20_000
+SEEDS = range(5)
+
+
+def main():
+    """Run the benchmark for all models, sequences, methods and numbers of draws."""
+    for model, n_periods in MODELS.items():
+        params, options = rp.get_example_model(model, with_data=False)
+        options["n_periods"] = n_periods
+
+        reference, _ = compute_expected_value_functions(
+            params,
+            {
+                **options,
+                **METHODS["plain"],
+                "solution_draws": N_DRAWS_REFERENCE,
+                "monte_carlo_sequence": "sobol",
+            },
+        )
+
+        for sequence in SEQUENCES:
+            for method, method_options in METHODS.items():
+                for n_draws in LIST_OF_N_DRAWS:
+                    errors = []
+                    durations = []
+                    for seed in SEEDS:
+                        expected_value_functions, duration = (
+                            compute_expected_value_functions(
+                                params,
+                                {
+                                    **options,
+                                    **method_options,
+                                    "solution_draws": n_draws,
+                                    "solution_seed": seed,
+                                    "monte_carlo_sequence": sequence,
+                                },
+                            )
+                        )
+                        relative_deviation = (
+                            expected_value_functions - reference
+                        ) / reference
+                        errors.append(np.sqrt(np.mean(relative_deviation ** 2)))
+                        durations.append(duration)
+
+                    output = {
+                        "model": model,
+                        "n_periods": n_periods,
+                        "monte_carlo_sequence": sequence,
+                        "method": method,
+                        "n_draws": n_draws,
+                        "rmse_relative": np.mean(errors),
+                        "seconds_per_solution": np.mean(durations),
+                    }
+
+                    print(json.dumps(output))  # noqa: T001
+                    with open("benchmark_variance_reduction.txt", "a+") as file:
+                        file.write(json.dumps(output))
+                        file.write("\n")
+
+
+def compute_expected_value_functions(params, options):
+    """Solve the model and return the expected value functions of all states."""
+    solve = rp.get_solve_func(params, options)
+    solve(params)
+
+    start = dt.datetime.now()
+    state_space = solve(params)
+    end = dt.datetime.now()
+
+    expected_value_functions = np.concatenate(
+        [
+            state_space.expected_value_functions.buffers[period]
+            for period in range(options["n_periods"])
+        ]
+    )
+
+    return expected_value_functions, (end - start).total_seconds()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,11 @@ import sys
 def main():
     """Evaluate the criterion function multiple times for a scalability report.
 
-    The criterion function is evaluated ``maxfun``-times. The number of threads used is
-    limited by environment variables. **respy** has to be imported after the environment
-    variables are set as Numpy, Numba and others load them at import time.
+    The criterion function is evaluated ``maxfun``-times. The number of threads used by
+    Numba and BLAS is limited with :func:`respy.set_num_threads`. The environment
+    variables are set as well because BLAS is only limited at runtime if
+    :mod:`threadpoolctl` is installed and Numexpr only reads its variable at import.
+    **respy** has to be imported after the environment variables are set.
 
     """
     model = sys.argv[1]
@@ -24,14 +26,17 @@ def main():
     )
 
     # Set number of threads
-    os.environ["NUMBA_NUM_THREADS"] = f"{n_threads}"
-    os.environ["MKL_NUM_THREADS"] = f"{n_threads}"
-    os.environ["OMP_NUM_THREADS"] = f"{n_threads}"
-    os.environ["NUMEXPR_NUM_THREADS"] = f"{n_threads}"
+    if n_threads != -1:
+        os.environ["NUMBA_NUM_THREADS"] = f"{n_threads}"
+        os.environ["MKL_NUM_THREADS"] = f"{n_threads}"
+        os.environ["OMP_NUM_THREADS"] = f"{n_threads}"
+        os.environ["NUMEXPR_NUM_THREADS"] = f"{n_threads}"
 
     # Late import of respy to ensure that environment variables are read by Numpy, etc..
     import respy as rp
 
+    rp.set_num_threads(n_threads)
+
     # Get model
     params, options = rp.get_example_model(model, with_data=False)
 
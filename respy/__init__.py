@@ -18,6 +18,8 @@ from respy.likelihood import get_log_like_func  # noqa: F401
 from respy.method_of_simulated_moments import get_diag_weighting_matrix  # noqa: F401
 from respy.method_of_simulated_moments import get_flat_moments  # noqa: F401
 from respy.method_of_simulated_moments import get_moment_errors_func  # noqa: F401
+from respy.parallelization import num_threads  # noqa: F401
+from respy.parallelization import set_num_threads  # noqa: F401
 from respy.simulate import get_simulate_func  # noqa: F401
 from respy.solve import get_solve_func  # noqa: F401
 from respy.tests.random_model import add_noise_to_params  # noqa: F401
@@ -33,6 +35,8 @@ __all__ = [
     "get_diag_weighting_matrix",
     "get_flat_moments",
     "add_noise_to_params",
+    "set_num_threads",
+    "num_threads",
 ]
 
 __version__ = "2.0.0"
@@ -31,7 +31,8 @@ def create_draws_and_log_prob_wages(
         contain numpy.nan or any number for non-wage choices. The non-wage choices only
         have to be there to not raise index errors.
     base_draws : numpy.ndarray
-        Array with shape (n_draws, n_choices) with standard normal random variables.
+        Array with shape (n_draws, n_choices) with standard normal random variables. If
+        the draws are single-precision, the conditional draws are single-precision, too.
     choices : numpy.ndarray
         Array with shape (n_obs * n_types,) containing observed choices. Is used to
         select columns of systematic wages. Therefore it has to be coded starting at
@@ -77,9 +78,12 @@ def create_draws_and_log_prob_wages(
     else:
         updated_chols = update_cholcov(shocks_cholesky, n_wages)
 
+    # Single-precision draws overflow for smaller values than double-precision draws.
+    max_log_float = min(MAX_LOG_FLOAT, np.log(np.finfo(base_draws.dtype).max))
+
     chol_indices = np.where(np.isfinite(log_wage_observed), choices, n_wages)
     draws = calculate_conditional_draws(
-        base_draws, updated_means, updated_chols, chol_indices, MAX_LOG_FLOAT
+        base_draws, updated_means, updated_chols, chol_indices, max_log_float
     )
 
     return draws, log_prob_wages
@@ -275,7 +279,10 @@ def update_cholcov(shocks_cholesky, n_wages):
 
 
 @guvectorize(
-    ["f8[:, :], f8[:], f8[:, :, :], u2, f8, f8[:, :]"],
+    [
+        "f4[:, :], f8[:], f8[:, :, :], u2, f8, f4[:, :]",
+        "f8[:, :], f8[:], f8[:, :, :], u2, f8, f8[:, :]",
+    ],
     "(n_draws, n_choices), (n_choices), (n_wages_plus_one, n_choices, n_choices), (), "
     "() -> (n_draws, n_choices)",
     nopython=True,
@@ -42,6 +42,48 @@ dimension.
 
 """
 
+INDEXER_MIN_LOOKUP_SIZE = 2 ** 16
+"""int : Number of slots up to which a state indexer always uses a lookup array.
+
+A :class:`~respy.shared.StateIndexer` stores values in a lookup array with one slot per
+mixed-radix code if the number of slots is at most this constant or four times the
+number of stored keys. Otherwise, the codes are stored in an open-addressing hash table
+which requires memory proportional to the number of keys.
+
+"""
+
+SHARED_MEMORY_MIN_NBYTES = 2 ** 16
+"""int : Minimum number of bytes of an array which is shared with worker processes.
+
+Process-based backends of
+:func:`~respy.parallelization.parallelize_across_dense_dimensions` place arrays whose
+underlying buffer has at least this size in :mod:`multiprocessing.shared_memory` once
+per call. Workers receive lightweight handles and attach to the memory without
+copying. Smaller arrays are pickled.
+
+"""
+
+TASKS_PER_WORKER = 4
+"""int : Number of tasks per worker if dense keys are scheduled automatically.
+
+Parallel backends of :func:`~respy.parallelization.parallelize_across_dense_dimensions`
+group the dense keys into tasks of similar size. More tasks per worker balance the load
+better while fewer tasks reduce the overhead of dispatching a task.
+
+"""
+
+MAX_N_STATE_STORES = 4
+"""int : Maximum number of state stores which are kept in memory per process."""
+STATE_SPACE_ARTIFACT_NAME = "state_space.pickle"
+"""str : Name of the file which contains the structural parts of the state space."""
+STATE_SPACE_ARTIFACT_VERSION = 6
+"""int : Version of the format of state space artifacts stored on disk.
+
+Increment the version whenever the construction of the state space changes such that
+artifacts created by previous versions become invalid.
+
+"""
+
 # Some assert functions take rtol instead of decimals
 TOL_REGRESSION_TESTS = 1e-10
 
@@ -56,10 +98,22 @@ DEFAULT_OPTIONS = {
     "simulation_seed": 2,
     "solution_draws": 200,
     "solution_seed": 3,
+    "solution_antithetic": False,
+    "solution_control_variate": False,
+    "solution_integration": "monte_carlo",
+    "solution_quadrature_order": 2,
+    "solution_adaptive_tolerance": None,
+    "solution_adaptive_block_size": 20,
+    "solution_cache_size": 0,
     "core_state_space_filters": [],
     "negative_choice_set": {},
     "monte_carlo_sequence": "sobol",
     "cache_compression": "snappy",
+    "cache_state_space": False,
+    "cache_backend": "memory",
+    "solution_engine": "period",
+    "precision": "float64",
+    "parallel": {"backend": "serial", "n_jobs": 1, "task_size": "auto"},
 }
 
 KEANE_WOLPIN_1994_MODELS = [f"kw_94_{suffix}" for suffix in ["one", "two", "three"]]
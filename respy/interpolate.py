@@ -7,6 +7,9 @@ import numpy as np
 from respy.config import MAX_LOG_FLOAT
 from respy.parallelization import parallelize_across_dense_dimensions
 from respy.shared import calculate_expected_value_functions
+from respy.shared import calculate_expected_value_functions_with_clark
+from respy.shared import calculate_expected_value_functions_with_control_variate
+from respy.shared import calculate_weighted_expected_value_functions
 from respy.shared import calculate_value_functions_and_flow_utilities
 
 
@@ -68,6 +71,11 @@ def kw_94_interpolation(
     wages = state_space.get_attribute_from_period("wages", period)
     nonpecs = state_space.get_attribute_from_period("nonpecs", period)
     continuation_values = state_space.get_continuation_values(period)
+    weights = (
+        None
+        if state_space.base_weights_sol is None
+        else state_space.get_attribute_from_period("base_weights_sol", period)
+    )
 
     # Create some dense key conversion objects.
     dense_keys_in_period = list(wages)
@@ -90,15 +98,28 @@ def kw_94_interpolation(
     )
 
     not_interpolated = _get_not_interpolated_indicator(
-        interpolation_points, dense_key_to_n_states, seeds
+        interpolation_points,
+        dense_key_to_n_states,
+        seeds,
+        parallel=options["parallel"],
     )
 
     expected_shocks = _compute_expected_shocks(
         dense_key_to_choice_set_in_period, optim_paras
     )
+    shocks_covariance = (
+        _compute_covariance_of_shocks(dense_key_to_choice_set_in_period, optim_paras)
+        if options["solution_integration"] == "clark"
+        else None
+    )
 
     exogenous, max_emax = _compute_rhs_variables(
-        wages, nonpecs, continuation_values, expected_shocks, optim_paras["delta"]
+        wages,
+        nonpecs,
+        continuation_values,
+        expected_shocks,
+        optim_paras["delta"],
+        parallel=options["parallel"],
     )
 
     endogenous = _compute_lhs_variable(
@@ -108,14 +129,23 @@ def kw_94_interpolation(
         max_emax,
         not_interpolated,
         period_draws_emax_risk,
+        expected_shocks,
+        shocks_covariance,
+        options["solution_control_variate"],
+        weights,
         optim_paras["delta"],
+        parallel=options["parallel"],
     )
 
     # Create prediction model based on the random subset of points where the EMAX is
     # actually simulated and thus dependent and independent variables are available. For
     # the interpolation points, the actual values are used.
     period_expected_value_functions = _predict_with_linear_model(
-        endogenous, exogenous, max_emax, not_interpolated
+        endogenous,
+        exogenous,
+        max_emax,
+        not_interpolated,
+        parallel=options["parallel"],
     )
 
     return period_expected_value_functions
@@ -240,6 +270,43 @@ def _compute_expected_shocks(dense_key_to_choice_set_in_period, optim_paras):
     return expected_shocks
 
 
+def _compute_covariance_of_shocks(dense_key_to_choice_set_in_period, optim_paras):
+    r"""Compute the covariance matrix of the shocks.
+
+    The shocks of working alternatives are :math:`\exp\{\epsilon_i\}` and the shocks
+    of non-working alternatives are :math:`\epsilon_j` where :math:`\epsilon` is
+    normally distributed with covariance matrix :math:`\Sigma`. The covariances are
+
+    .. math::
+
+        Cov(\exp\{\epsilon_i\}, \exp\{\epsilon_k\}) &= \exp\{\frac{\sigma_{ii} +
+            \sigma_{kk}}{2}\} (\exp\{\sigma_{ik}\} - 1) \\
+        Cov(\exp\{\epsilon_i\}, \epsilon_j) &= \sigma_{ij}
+            \exp\{\frac{\sigma_{ii}}{2}\}
+
+    """
+    n_wages = len(optim_paras["choices_w_wage"])
+
+    shocks_cholesky = optim_paras["shocks_cholesky"]
+    covariance = np.clip(shocks_cholesky.dot(shocks_cholesky.T), None, MAX_LOG_FLOAT)
+    variances = np.clip(np.diag(covariance), 0, MAX_LOG_FLOAT)
+
+    shocks_covariance = covariance.copy()
+    expected_wage_shocks = np.exp(variances[:n_wages] / 2)
+    shocks_covariance[:n_wages, :n_wages] = np.outer(
+        expected_wage_shocks, expected_wage_shocks
+    ) * np.expm1(covariance[:n_wages, :n_wages])
+    shocks_covariance[:n_wages, n_wages:] *= expected_wage_shocks.reshape(-1, 1)
+    shocks_covariance[n_wages:, :n_wages] *= expected_wage_shocks
+
+    shocks_covariance = {
+        dense_index: shocks_covariance[np.ix_(choice_set, choice_set)]
+        for dense_index, choice_set in dense_key_to_choice_set_in_period.items()
+    }
+
+    return shocks_covariance
+
+
 @parallelize_across_dense_dimensions
 def _compute_rhs_variables(wages, nonpec, continuation_values, draws, delta):
     """Compute right-hand side variables of the linear model.
@@ -293,13 +360,20 @@ def _compute_lhs_variable(
     max_value_functions,
     not_interpolated,
     draws,
+    expected_shocks,
+    shocks_covariance,
+    control_variate,
+    weights,
     delta,
 ):
     """Calculate left-hand side variable for all states which are not interpolated.
 
     The function computes the full solution for a subset of states. Then, the dependent
     variable is the expected value function minus the maximum of value function with the
-    expected shocks.
+    expected shocks. If weights are given, the draws are the nodes of a quadrature rule.
+    If the covariance of the shocks is given, the expected value functions are
+    approximated in closed form. Otherwise, the variance of the Monte Carlo integration
+    can be reduced with a control variate.
 
     Parameters
     ----------
@@ -317,17 +391,58 @@ def _compute_lhs_variable(
         continuation_values.
     draws : numpy.ndarray
         Array with shape (n_draws, n_choices) containing draws.
+    expected_shocks : numpy.ndarray
+        Array with shape (n_choices,) containing the expected value of the shocks.
+    shocks_covariance : numpy.ndarray or None
+        Array with shape (n_choices, n_choices) containing the covariance matrix of the
+        shocks or None if the expected value functions are not approximated in closed
+        form.
+    control_variate : bool
+        Whether to use a control variate for the Monte Carlo integration.
+    weights : numpy.ndarray or None
+        Array with shape (n_draws,) containing the weights of the nodes of a quadrature
+        rule or None if the draws are equally weighted.
     delta : float
         Discount factor.
 
     """
-    expected_value_functions = calculate_expected_value_functions(
-        wages[not_interpolated],
-        nonpec[not_interpolated],
-        continuation_values[not_interpolated],
-        draws,
-        delta,
-    )
+    if weights is not None:
+        expected_value_functions = calculate_weighted_expected_value_functions(
+            wages[not_interpolated],
+            nonpec[not_interpolated],
+            continuation_values[not_interpolated],
+            draws,
+            weights,
+            delta,
+        )
+    elif shocks_covariance is not None:
+        expected_value_functions = calculate_expected_value_functions_with_clark(
+            wages[not_interpolated],
+            nonpec[not_interpolated],
+            continuation_values[not_interpolated],
+            expected_shocks,
+            shocks_covariance,
+            delta,
+        )
+    elif control_variate:
+        expected_value_functions = (
+            calculate_expected_value_functions_with_control_variate(
+                wages[not_interpolated],
+                nonpec[not_interpolated],
+                continuation_values[not_interpolated],
+                draws,
+                expected_shocks,
+                delta,
+            )
+        )
+    else:
+        expected_value_functions = calculate_expected_value_functions(
+            wages[not_interpolated],
+            nonpec[not_interpolated],
+            continuation_values[not_interpolated],
+            draws,
+            delta,
+        )
     endogenous = expected_value_functions - max_value_functions[not_interpolated]
 
     return endogenous
@@ -14,6 +14,7 @@ from respy.parallelization import parallelize_across_dense_dimensions
 from respy.parallelization import split_and_combine_df
 from respy.pre_processing.data_checking import check_estimation_data
 from respy.pre_processing.model_processing import process_params_and_options
+from respy.pre_processing.model_processing import process_params_with_plan
 from respy.pre_processing.process_covariates import identify_necessary_covariates
 from respy.shared import aggregate_keane_wolpin_utility
 from respy.shared import compute_covariates
@@ -98,6 +99,7 @@ def get_log_like_func(
 
     solve = get_solve_func(params, options)
     state_space = solve.keywords["state_space"]
+    parameter_plan = solve.keywords["parameter_plan"]
 
     df, type_covariates = _process_estimation_data(
         df, state_space, optim_paras, options
@@ -112,7 +114,7 @@ def get_log_like_func(
             next(options["estimation_seed_startup"]),
             options["monte_carlo_sequence"],
         )
-        base_draws_est[dense_key] = draws
+        base_draws_est[dense_key] = draws.astype(options["precision"], copy=False)
 
     criterion_function = partial(
         log_like,
@@ -123,6 +125,7 @@ def get_log_like_func(
         options=options,
         return_scalar=return_scalar,
         return_comparison_plot_data=return_comparison_plot_data,
+        parameter_plan=parameter_plan,
     )
 
     return criterion_function
@@ -137,6 +140,7 @@ def log_like(
     options,
     return_scalar,
     return_comparison_plot_data,
+    parameter_plan=None,
 ):
     """Criterion function for the likelihood maximization.
 
@@ -155,9 +159,12 @@ def log_like(
         Function which solves the model with new parameters.
     options : dict
         Contains model options.
+    parameter_plan : dict, optional
+        Plan to process the parameters created by
+        :func:`~respy.pre_processing.model_processing.create_parameter_plan`.
 
     """
-    optim_paras, options = process_params_and_options(params, options)
+    optim_paras, options = process_params_with_plan(params, options, parameter_plan)
 
     state_space = solve(params)
 
@@ -398,7 +405,10 @@ def _logsumexp(x):
 
 
 @nb.guvectorize(
-    ["f8[:], f8[:], f8[:], f8[:, :], f8, i8, f8, f8[:]"],
+    [
+        "f4[:], f4[:], f4[:], f4[:, :], f4, i8, f4, f8[:]",
+        "f8[:], f8[:], f8[:], f8[:, :], f8, i8, f8, f8[:]",
+    ],
     "(n_choices), (n_choices), (n_choices), (n_draws, n_choices), (), (), () -> ()",
     nopython=True,
     target="parallel",
@@ -432,6 +442,10 @@ def _simulate_log_probability_of_individuals_observed_choice(
     consecutive `logsumexp` functions is included in `#278
     <https://github.com/OpenSourceEconomics/respy/pull/288>`_.
 
+    The inputs can be single-precision if ``options["precision"]`` is ``"float32"``.
+    Then, the probabilities of single draws are computed in single precision, but the
+    log probabilities are accumulated over draws in double precision.
+
     Parameters
     ----------
     wages : numpy.ndarray
@@ -458,7 +472,7 @@ def _simulate_log_probability_of_individuals_observed_choice(
     n_draws, n_choices = draws.shape
 
     smoothed_log_probabilities = np.empty(n_draws)
-    smoothed_value_functions = np.empty(n_choices)
+    smoothed_value_functions = np.empty(n_choices, dtype=draws.dtype)
 
     for i in range(n_draws):
 
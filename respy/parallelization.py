@@ -1,11 +1,56 @@
 """This module contains the code to control parallel execution."""
+import concurrent.futures
+import contextlib
+import copy
 import functools
+import importlib
+import inspect
+import io
+import math
+import multiprocessing
+import os
+import pickle
+import sys
+import weakref
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
 
 import joblib
+import numba as nb
+import numpy as np
 import pandas as pd
 
+from respy.config import SHARED_MEMORY_MIN_NBYTES
+from respy.config import TASKS_PER_WORKER
 
-def parallelize_across_dense_dimensions(func=None, *, n_jobs=1):
+try:
+    import threadpoolctl
+except ImportError:
+    threadpoolctl = None
+
+
+_PROCESS_POOLS = {}
+"""dict : Process pools of the ``"processes"`` backend which are reused across calls."""
+
+_THREAD_BUDGET = {"n_threads": None, "blas_limiter": None}
+"""dict : Number of threads which respy may use or :obj:`None` if it is not restricted.
+
+The dictionary also holds the object of :mod:`threadpoolctl` which restores the original
+limits of BLAS threads.
+
+"""
+
+_SCHEDULING_STATISTICS = {}
+"""dict : Statistics of the last schedule of each decorated function."""
+
+_ATTACHED_SEGMENTS = {}
+"""dict : Shared memory segments of a worker process and the arrays pointing to them."""
+
+_LOADED_OBJECTS_IN_MEMORY = {"payload": None}
+"""dict : Pickled objects of the parent process which were last loaded by a worker."""
+
+
+def parallelize_across_dense_dimensions(func=None, *, n_jobs=1, split_rows=None):
     """Parallelizes decorated function across dense state space dimensions.
 
     Parallelization is only possible if the decorated function has no side-effects to
@@ -21,23 +66,62 @@ def parallelize_across_dense_dimensions(func=None, *, n_jobs=1):
     across dense dimensions by patching the attribute access such that each sub state
     space can only access its attributes.
 
+    The backend and the number of workers are taken from ``options["parallel"]`` (see
+    :func:`~respy.pre_processing.model_processing._parse_parallel_options`) if the
+    decorated function receives the options. Functions without options accept the
+    configuration with the keyword argument ``parallel`` which is, like ``bypass``,
+    consumed by the decorator. Otherwise, the function is executed serially or with
+    ``n_jobs`` workers of the loky backend.
+
+    Parallel backends do not dispatch one task per dense key. Instead,
+    :func:`_schedule_dense_keys` creates tasks of similar size which are dispatched
+    largest-first. If the rows of the arguments in ``split_rows`` can be processed
+    independently, large dense keys are split into chunks of rows and the outputs of the
+    chunks are concatenated. Statistics of the schedules are available with
+    :func:`get_scheduling_statistics`.
+
     The decorator can be applied to functions without trailing parentheses. At the same
     time, the `*` prohibits to use the decorator with positional arguments.
 
     """
 
     def decorator_parallelize_across_dense_dimensions(func):
+        signature = inspect.signature(func)
+
         @functools.wraps(func)
         def wrapper_parallelize_across_dense_dimensions(*args, **kwargs):
             bypass = kwargs.pop("bypass", {})
+            parallel = kwargs.pop("parallel", None)
             dense_keys = _infer_dense_keys_from_arguments(args, kwargs)
 
             if dense_keys:
+                sizes = _compute_sizes_of_dense_keys(args, kwargs, dense_keys)
+                split_arguments = _locate_split_arguments(
+                    signature, args, kwargs, split_rows
+                )
+                options = _get_options_from_arguments(signature, args, kwargs, bypass)
+                if parallel is None:
+                    parallel = (
+                        options.get("parallel") if isinstance(options, dict) else None
+                    )
+                if parallel is None:
+                    parallel = {
+                        "backend": "serial" if n_jobs == 1 else "loky",
+                        "n_jobs": n_jobs,
+                    }
+
                 args_, kwargs_ = _broadcast_arguments(args, kwargs, dense_keys)
 
-                out = joblib.Parallel(n_jobs=n_jobs)(
-                    joblib.delayed(func)(*args_[idx], **kwargs_[idx], **bypass)
-                    for idx in dense_keys
+                out = _execute_across_dense_keys(
+                    func,
+                    args_,
+                    kwargs_,
+                    bypass,
+                    dense_keys,
+                    parallel,
+                    options,
+                    sizes,
+                    split_arguments,
                 )
                 # Re-order multiple return values from list of tuples to tuple of lists
                 # to tuple of dictionaries to set as state space attributes.
@@ -65,6 +149,657 @@ def parallelize_across_dense_dimensions(func=None, *, n_jobs=1):
         return decorator_parallelize_across_dense_dimensions
 
 
+def _get_options_from_arguments(signature, args, kwargs, bypass):
+    """Get the argument ``options`` of the decorated function if it has one."""
+    if "options" not in signature.parameters:
+        return None
+
+    try:
+        arguments = signature.bind_partial(*args, **kwargs, **bypass).arguments
+    except TypeError:
+        arguments = {}
+
+    return arguments.get("options")
+
+
+def _execute_across_dense_keys(
+    func, args, kwargs, bypass, dense_keys, parallel, options, sizes, split_arguments
+):
+    """Execute the function for every dense key with the requested backend.
+
+    The serial backend calls the function once per dense key. Other backends execute
+    the tasks created by :func:`_schedule_dense_keys` where each task is a batch of
+    dense keys or chunks of rows of a dense key.
+
+    Workers of process-based backends do not share the objects which
+    :func:`~respy.shared.dump_objects` keeps in memory with the parent process. Thus,
+    the objects of the model are sent to the workers and the objects written by the
+    workers are collected and stored in the parent process.
+
+    """
+    backend = parallel["backend"]
+    n_jobs, n_threads = _split_thread_budget(parallel["n_jobs"])
+
+    if backend == "serial" or n_jobs == 1:
+        return [func(*args[idx], **kwargs[idx], **bypass) for idx in dense_keys]
+
+    n_rows = _get_number_of_rows(args, kwargs, dense_keys, split_arguments)
+    tasks, statistics = _schedule_dense_keys(
+        sizes, n_rows, parallel.get("task_size", "auto"), n_jobs
+    )
+    _SCHEDULING_STATISTICS[f"{func.__module__}.{func.__qualname__}"] = statistics
+
+    units = [
+        [
+            _select_rows(args[idx], kwargs[idx], rows, split_arguments)
+            for idx, rows in task
+        ]
+        for task in tasks
+    ]
+
+    if len(tasks) == 1:
+        results = [_execute_batch(func, units[0], bypass)]
+
+    elif backend == "threads":
+        with _limit_blas_threads(n_threads):
+            results = joblib.Parallel(n_jobs=n_jobs, backend="threading", batch_size=1)(
+                joblib.delayed(_execute_batch)(func, units_, bypass, n_threads)
+                for units_ in units
+            )
+
+    else:
+        # Avoid a circular import as :mod:`respy.shared` uses the decorator.
+        from respy.shared import _OBJECTS_IN_MEMORY
+
+        objects_in_memory = {}
+        if isinstance(options, dict) and "state_space_path" in options:
+            directory = str(options["state_space_path"])
+            if directory in _OBJECTS_IN_MEMORY:
+                objects_in_memory[directory] = _OBJECTS_IN_MEMORY[directory]
+
+        # Arrays are placed in shared memory once and every task only receives handles.
+        segments = {}
+        try:
+            objects_in_memory = _dumps_with_shared_memory(objects_in_memory, segments)
+            common = _dumps_with_shared_memory(bypass, segments)
+            payloads = [
+                (
+                    (func.__module__, func.__qualname__),
+                    objects_in_memory,
+                    common,
+                    _dumps_with_shared_memory(units_, segments),
+                    n_threads,
+                )
+                for units_ in units
+            ]
+
+            if backend == "processes":
+                pool = _get_process_pool(n_jobs)
+                outputs = list(pool.map(_execute_in_worker, *zip(*payloads)))
+            else:
+                outputs = joblib.Parallel(n_jobs=n_jobs, backend="loky", batch_size=1)(
+                    joblib.delayed(_execute_in_worker)(*payload) for payload in payloads
+                )
+        finally:
+            for segment, _ in segments.values():
+                segment.close()
+                segment.unlink()
+
+        results = []
+        for out, written_objects in outputs:
+            results.append(out)
+            for directory, objects in written_objects.items():
+                _OBJECTS_IN_MEMORY.setdefault(directory, {}).update(objects)
+
+    return _combine_outputs_of_tasks(tasks, results, dense_keys)
+
+
+def _execute_batch(func, units, bypass, n_threads=None):
+    """Execute the function for the arguments of every dense key or chunk in a task.
+
+    If ``n_threads`` is given, the number of threads of Numba is limited while the task
+    is executed. The number is local to the executing thread.
+
+    """
+    if n_threads is None:
+        out = [func(*args, **kwargs, **bypass) for args, kwargs in units]
+    else:
+        previous = nb.get_num_threads()
+        nb.set_num_threads(min(n_threads, nb.config.NUMBA_NUM_THREADS))
+        try:
+            out = [func(*args, **kwargs, **bypass) for args, kwargs in units]
+        finally:
+            nb.set_num_threads(previous)
+
+    return out
+
+
+def _combine_outputs_of_tasks(tasks, results, dense_keys):
+    """Collect the outputs of the dense keys and concatenate the outputs of chunks."""
+    chunks = {}
+    for task, outputs in zip(tasks, results):
+        for (idx, rows), out in zip(task, outputs):
+            start = 0 if rows is None else rows.start
+            chunks.setdefault(idx, []).append((start, out))
+
+    out = []
+    for idx in dense_keys:
+        outputs = [out_ for _, out_ in sorted(chunks[idx], key=lambda x: x[0])]
+        if len(outputs) == 1:
+            out.append(outputs[0])
+        elif isinstance(outputs[0], tuple):
+            out.append(tuple(np.concatenate(outs) for outs in zip(*outputs)))
+        else:
+            out.append(np.concatenate(outputs))
+
+    return out
+
+
+def _compute_sizes_of_dense_keys(args, kwargs, dense_keys):
+    """Compute the size of each dense key.
+
+    The size is the number of elements in the arrays and data frames of the arguments
+    which differ between dense keys. It is a proxy for the work of a dense key.
+
+    """
+    sizes = dict.fromkeys(dense_keys, 0)
+    for argument in [*args, *kwargs.values()]:
+        if _is_dense_dictionary_argument(argument, dense_keys):
+            for idx in dense_keys:
+                sizes[idx] += _get_size(argument[idx])
+
+    return {idx: max(size, 1) for idx, size in sizes.items()}
+
+
+def _get_size(obj):
+    """Get the number of elements of arrays and data frames in an object."""
+    if isinstance(obj, (np.ndarray, pd.DataFrame, pd.Series)):
+        size = obj.size
+    elif isinstance(obj, (tuple, list)):
+        size = sum(_get_size(element) for element in obj)
+    else:
+        size = 0
+
+    return size
+
+
+def _locate_split_arguments(signature, args, kwargs, split_rows):
+    """Locate the arguments which can be split into chunks of rows.
+
+    Returns
+    -------
+    positions : list
+        Positions of the arguments in ``args``.
+    names : list
+        Names of the arguments in ``kwargs``.
+
+    """
+    if not split_rows:
+        return [], []
+
+    parameters = list(signature.parameters)
+    positions = [i for i in range(len(args)) if parameters[i] in split_rows]
+    names = [name for name in kwargs if name in split_rows]
+
+    return positions, names
+
+
+def _get_number_of_rows(args, kwargs, dense_keys, split_arguments):
+    """Get the number of rows of dense keys which can be split into chunks.
+
+    Dense keys can only be split if all arguments in ``split_rows`` are arrays with the
+    same number of rows.
+
+    """
+    positions, names = split_arguments
+    if not positions and not names:
+        return {}
+
+    n_rows = {}
+    for idx in dense_keys:
+        arguments = [args[idx][i] for i in positions] + [kwargs[idx][n] for n in names]
+        lengths = {
+            len(arg) if isinstance(arg, np.ndarray) and arg.ndim else -1
+            for arg in arguments
+        }
+        if len(lengths) == 1 and -1 not in lengths:
+            n_rows[idx] = lengths.pop()
+
+    return n_rows
+
+
+def _select_rows(args, kwargs, rows, split_arguments):
+    """Select the chunk of rows of the arguments which can be split."""
+    if rows is None:
+        return args, kwargs
+
+    positions, names = split_arguments
+    args = [arg[rows] if i in positions else arg for i, arg in enumerate(args)]
+    kwargs = {
+        name: value[rows] if name in names else value for name, value in kwargs.items()
+    }
+
+    return args, kwargs
+
+
+def _schedule_dense_keys(sizes, n_rows, task_size, n_jobs):
+    """Schedule dense keys as tasks of similar size.
+
+    Dense keys are processed largest-first. Dense keys larger than the task size are
+    split into chunks of rows if they have an entry in ``n_rows``. Dense keys smaller
+    than the task size are coalesced into batches. If the task size is ``"auto"``, it
+    is chosen such that every worker receives about
+    :data:`~respy.config.TASKS_PER_WORKER` tasks.
+
+    Parameters
+    ----------
+    sizes : dict
+        Maps dense keys to their sizes.
+    n_rows : dict
+        Maps dense keys which can be split to their number of rows.
+    task_size : int or "auto"
+        Target size of a task.
+    n_jobs : int
+        Number of workers.
+
+    Returns
+    -------
+    tasks : list
+        Tasks sorted by decreasing size. Each task is a list of tuples of a dense key
+        and a slice of rows or :obj:`None` if all rows are processed.
+    statistics : dict
+        Statistics of the schedule.
+
+    Examples
+    --------
+    >>> tasks, statistics = _schedule_dense_keys(
+    ...     {0: 1, 1: 2, 2: 8, 3: 1}, {2: 4}, task_size=4, n_jobs=3
+    ... )
+    >>> [[idx for idx, _ in task] for task in tasks]
+    [[2], [2], [1, 0, 3]]
+    >>> tasks[0]
+    [(2, slice(0, 2, None))]
+    >>> statistics["load_imbalance"]
+    1.0
+
+    """
+    total_size = sum(sizes.values())
+    if task_size == "auto":
+        task_size = max(math.ceil(total_size / (n_jobs * TASKS_PER_WORKER)), 1)
+
+    tasks = []
+    task_sizes = []
+    batch = []
+    batch_size = 0
+    for idx in sorted(sizes, key=lambda idx: -sizes[idx]):
+        size = sizes[idx]
+        if size > task_size and n_rows.get(idx, 0) > 1:
+            n_chunks = min(math.ceil(size / task_size), n_rows[idx])
+            bounds = np.linspace(0, n_rows[idx], n_chunks + 1).astype(int)
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                tasks.append([(idx, slice(int(start), int(stop)))])
+                task_sizes.append(size * (stop - start) / n_rows[idx])
+        elif size >= task_size:
+            tasks.append([(idx, None)])
+            task_sizes.append(size)
+        else:
+            batch.append((idx, None))
+            batch_size += size
+            if batch_size >= task_size:
+                tasks.append(batch)
+                task_sizes.append(batch_size)
+                batch = []
+                batch_size = 0
+    if batch:
+        tasks.append(batch)
+        task_sizes.append(batch_size)
+
+    order = sorted(range(len(tasks)), key=lambda i: -task_sizes[i])
+    tasks = [tasks[i] for i in order]
+    task_sizes = [task_sizes[i] for i in order]
+
+    # Simulate the assignment of tasks to the next idle worker to measure the balance.
+    loads = [0] * min(n_jobs, len(tasks))
+    for size in task_sizes:
+        loads[loads.index(min(loads))] += size
+
+    statistics = {
+        "n_dense_keys": len(sizes),
+        "n_tasks": len(tasks),
+        "n_batched_dense_keys": sum(len(task) for task in tasks if len(task) > 1),
+        "n_split_dense_keys": len(
+            {task[0][0] for task in tasks if task[0][1] is not None}
+        ),
+        "task_size": task_size,
+        "max_task_size": max(task_sizes),
+        "min_task_size": min(task_sizes),
+        "load_imbalance": max(loads) / (total_size / len(loads)),
+    }
+
+    return tasks, statistics
+
+
+def get_scheduling_statistics():
+    """Get statistics of the last schedule of every parallelized function.
+
+    The statistics help to tune ``options["parallel"]["task_size"]``. They are only
+    collected for parallel backends.
+
+    Returns
+    -------
+    statistics : dict
+        Maps the qualified names of functions to dictionaries with the number of dense
+        keys, tasks, dense keys batched with other dense keys and split dense keys, the
+        target, maximum and minimum task size, and the load imbalance. The load
+        imbalance is the ratio of the largest load of a worker to the average load if
+        tasks are assigned to the next idle worker. A value of one means that the work
+        is evenly distributed.
+
+    """
+    return copy.deepcopy(_SCHEDULING_STATISTICS)
+
+
+def _get_process_pool(n_jobs):
+    """Get a pool of processes which is created once per number of workers.
+
+    The workers are forked from a server process because forking the parent process
+    after Numba's threading layer was initialized might deadlock.
+
+    """
+    if n_jobs not in _PROCESS_POOLS:
+        _PROCESS_POOLS[n_jobs] = concurrent.futures.ProcessPoolExecutor(
+            max_workers=n_jobs, mp_context=multiprocessing.get_context("forkserver")
+        )
+
+    return _PROCESS_POOLS[n_jobs]
+
+
+def _execute_in_worker(function, objects_in_memory, common, payload, n_threads):
+    """Execute a decorated function in a worker process.
+
+    The function is passed by its module and qualified name as the undecorated function
+    cannot be pickled by reference. The arguments are passed as two pickled payloads,
+    the keyword arguments which are shared by all tasks and the positional and keyword
+    arguments of every dense key or chunk in the task. The objects which the parent
+    process keeps in memory are a third payload which is loaded once per worker and
+    call. Arrays in the payloads are attached from shared memory. Numba and BLAS use
+    ``n_threads`` threads in the worker.
+
+    Returns
+    -------
+    out : list
+        The outputs of the function for every dense key or chunk in the task.
+    written_objects : dict
+        The objects written by :func:`respy.shared.dump_objects` during the execution.
+
+    """
+    from respy.shared import _OBJECTS_IN_MEMORY
+
+    module, qualname = function
+    func = getattr(importlib.import_module(module), qualname).__wrapped__
+    _set_inner_threads(n_threads)
+
+    # The payload contains the names of new segments in every call. Thus, an equal
+    # payload means that the objects were loaded by a previous task of the same call.
+    if _LOADED_OBJECTS_IN_MEMORY["payload"] != objects_in_memory:
+        for directory, objects in pickle.loads(objects_in_memory).items():
+            _OBJECTS_IN_MEMORY.setdefault(directory, {}).update(objects)
+        _LOADED_OBJECTS_IN_MEMORY["payload"] = objects_in_memory
+    before = {
+        directory: dict(objects) for directory, objects in _OBJECTS_IN_MEMORY.items()
+    }
+
+    try:
+        bypass = pickle.loads(common)
+        units = pickle.loads(payload)
+        out = _execute_batch(func, units, bypass)
+    finally:
+        bypass = units = None
+        _detach_shared_arrays()
+
+    written_objects = {}
+    for directory, objects in _OBJECTS_IN_MEMORY.items():
+        previous = before.get(directory, {})
+        written = {
+            name: object_
+            for name, object_ in objects.items()
+            if previous.get(name) is not object_
+        }
+        if written:
+            written_objects[directory] = written
+
+    return out, written_objects
+
+
+class _SharedMemoryPickler(pickle.Pickler):
+    """Pickler which replaces large arrays with handles to shared memory.
+
+    The buffer underlying an array is copied to shared memory once even if multiple
+    views on the buffer like the arrays of a :class:`~respy.shared.DenseKeyStore` are
+    pickled. The segments are collected in ``segments`` and must be released by the
+    caller.
+
+    """
+
+    def __init__(self, file, segments):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.segments = segments
+
+    def reducer_override(self, obj):
+        if type(obj) is not np.ndarray or obj.dtype.hasobject:
+            return NotImplemented
+
+        base = obj
+        while isinstance(base.base, np.ndarray):
+            base = base.base
+
+        if base.nbytes < SHARED_MEMORY_MIN_NBYTES or not base.flags.c_contiguous:
+            return NotImplemented
+
+        if id(base) not in self.segments:
+            segment = shared_memory.SharedMemory(create=True, size=base.nbytes)
+            np.ndarray(base.shape, base.dtype, buffer=segment.buf)[...] = base
+            # Keep a reference to the base such that its id is not reused.
+            self.segments[id(base)] = (segment, base)
+        segment = self.segments[id(base)][0]
+
+        offset = (
+            obj.__array_interface__["data"][0] - base.__array_interface__["data"][0]
+        )
+        tracker = _get_resource_tracker_pid()
+        handle = (segment.name, obj.dtype.str, obj.shape, obj.strides, offset, tracker)
+
+        return _attach_shared_array, (handle,)
+
+
+def _dumps_with_shared_memory(obj, segments):
+    """Pickle an object and place its large arrays in shared memory."""
+    file = io.BytesIO()
+    _SharedMemoryPickler(file, segments).dump(obj)
+
+    return file.getvalue()
+
+
+def _attach_shared_array(handle):
+    """Create a read-only view on an array in shared memory.
+
+    The parent process owns the segment and unlinks it. Thus, the segment is
+    unregistered if the worker started its own resource tracker which would otherwise
+    unlink the segment when the worker exits. Workers which share the tracker with the
+    parent must not unregister the segment.
+
+    """
+    name, dtype, shape, strides, offset, tracker = handle
+
+    if name not in _ATTACHED_SEGMENTS:
+        if sys.version_info >= (3, 13):
+            segment = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            segment = shared_memory.SharedMemory(name=name)
+            if _get_resource_tracker_pid() not in [None, tracker]:
+                resource_tracker.unregister(segment._name, "shared_memory")
+        _ATTACHED_SEGMENTS[name] = (segment, [])
+    segment, arrays = _ATTACHED_SEGMENTS[name]
+
+    array = np.ndarray(shape, dtype, buffer=segment.buf, offset=offset, strides=strides)
+    array.flags.writeable = False
+    arrays.append(weakref.ref(array))
+
+    return array
+
+
+def _get_resource_tracker_pid():
+    """Get the process id of the resource tracker used by this process.
+
+    Before Python 3.13, attaching to a shared memory segment registers it with the
+    resource tracker of the process (bpo-39959). Workers compare the id with the one of
+    their parent to decide whether they have to unregister attached segments. From
+    Python 3.13 on, segments are attached with ``track=False`` and the id is unused by
+    workers. The attribute is private and raises an :class:`AttributeError` if it
+    changes instead of silently keeping the segments registered.
+
+    """
+    return resource_tracker._resource_tracker._pid
+
+
+def _detach_shared_arrays():
+    """Close the shared memory segments to which no array of the worker points.
+
+    Views on the attached arrays keep them alive, e.g., if the output of a function is a
+    view on its input. Then, the segment is kept and closed after a later task.
+
+    """
+    for name, (segment, arrays) in list(_ATTACHED_SEGMENTS.items()):
+        if all(array() is None for array in arrays):
+            segment.close()
+            del _ATTACHED_SEGMENTS[name]
+
+
+def set_num_threads(n_threads):
+    """Set the number of threads which respy may use.
+
+    Parallel Numba functions like
+    :func:`~respy.shared.calculate_expected_value_functions` and BLAS routines use
+    threads inside the workers of :func:`parallelize_across_dense_dimensions`. To
+    prevent oversubscription, the budget of threads is split between both levels. The
+    number of workers is capped at the budget and every worker uses the budget divided
+    by the number of workers. Outside of parallel backends, the whole budget is
+    available to Numba and BLAS.
+
+    BLAS threads are only limited if :mod:`threadpoolctl` is installed. The number of
+    threads of Numba cannot exceed ``NUMBA_NUM_THREADS`` which is set at import.
+
+    Parameters
+    ----------
+    n_threads : int or None
+        Positive number of threads, -1 for all cores, or :obj:`None` to remove the
+        restriction.
+
+    Returns
+    -------
+    previous : int or None
+        The previous number of threads.
+
+    See also
+    --------
+    num_threads
+
+    """
+    if not (
+        n_threads is None
+        or n_threads == -1
+        or (isinstance(n_threads, (int, np.integer)) and n_threads > 0)
+    ):
+        raise ValueError(
+            "The number of threads must be a positive integer, -1 or None, but it is "
+            f"{n_threads}."
+        )
+
+    previous = _THREAD_BUDGET["n_threads"]
+    if _THREAD_BUDGET["blas_limiter"] is not None:
+        _THREAD_BUDGET["blas_limiter"].restore_original_limits()
+        _THREAD_BUDGET["blas_limiter"] = None
+
+    if n_threads is None:
+        _THREAD_BUDGET["n_threads"] = None
+        nb.set_num_threads(nb.config.NUMBA_NUM_THREADS)
+    else:
+        n_threads = os.cpu_count() if n_threads == -1 else int(n_threads)
+        _THREAD_BUDGET["n_threads"] = n_threads
+        nb.set_num_threads(min(n_threads, nb.config.NUMBA_NUM_THREADS))
+        if threadpoolctl is not None:
+            _THREAD_BUDGET["blas_limiter"] = threadpoolctl.threadpool_limits(n_threads)
+
+    return previous
+
+
+@contextlib.contextmanager
+def num_threads(n_threads):
+    """Limit the number of threads which respy may use inside a context.
+
+    On exit, the previous budget and the previous number of threads of Numba are
+    restored. See :func:`set_num_threads` for more information.
+
+    Examples
+    --------
+    >>> with rp.num_threads(1):
+    ...     nb.get_num_threads()
+    1
+
+    """
+    previous_numba = nb.get_num_threads()
+    previous = set_num_threads(n_threads)
+    try:
+        yield
+    finally:
+        set_num_threads(previous)
+        nb.set_num_threads(previous_numba)
+
+
+def _split_thread_budget(n_jobs):
+    """Split the budget of threads between workers and threads inside workers.
+
+    Without a budget set by :func:`set_num_threads`, all cores are available.
+
+    Parameters
+    ----------
+    n_jobs : int
+        The requested number of workers or -1 for one worker per thread.
+
+    Returns
+    -------
+    n_jobs : int
+        The number of workers.
+    n_threads : int
+        The number of threads per worker.
+
+    """
+    budget = _THREAD_BUDGET["n_threads"] or os.cpu_count()
+    n_jobs = budget if n_jobs == -1 else n_jobs
+    if _THREAD_BUDGET["n_threads"] is not None:
+        n_jobs = min(n_jobs, budget)
+    n_threads = max(budget // n_jobs, 1)
+
+    return n_jobs, n_threads
+
+
+def _set_inner_threads(n_threads):
+    """Set the number of threads of Numba and BLAS in a worker process."""
+    nb.set_num_threads(min(n_threads, nb.config.NUMBA_NUM_THREADS))
+    if threadpoolctl is not None:
+        threadpoolctl.threadpool_limits(n_threads)
+
+
+def _limit_blas_threads(n_threads):
+    """Limit the number of BLAS threads inside a context if possible."""
+    if threadpoolctl is None:
+        context = contextlib.nullcontext()
+    else:
+        context = threadpoolctl.threadpool_limits(n_threads)
+
+    return context
+
+
 def split_and_combine_df(func):
     """Split the data across dense indices, run a function, and combine again."""
 
@@ -29,6 +29,39 @@ def validate_options(o):
         for key, val in o["negative_choice_set"].items()
     )
     assert o["monte_carlo_sequence"] in ["random", "halton", "sobol"]
+    assert isinstance(o["solution_antithetic"], bool)
+    assert isinstance(o["solution_control_variate"], bool)
+    assert o["solution_integration"] in [
+        "monte_carlo",
+        "gauss_hermite",
+        "sparse_grid",
+        "clark",
+    ]
+    assert _is_positive_nonzero_integer(o["solution_quadrature_order"])
+    assert o["solution_integration"] == "monte_carlo" or not (
+        o["solution_antithetic"] or o["solution_control_variate"]
+    )
+    assert o["solution_adaptive_tolerance"] is None or (
+        isinstance(o["solution_adaptive_tolerance"], float)
+        and o["solution_adaptive_tolerance"] > 0
+        and o["solution_integration"] == "monte_carlo"
+        and not o["solution_control_variate"]
+    )
+    assert _is_positive_nonzero_integer(o["solution_adaptive_block_size"])
+    assert _is_nonnegative_integer(o["solution_cache_size"])
+    assert isinstance(o["cache_state_space"], bool)
+    assert o["cache_backend"] in ["parquet", "memory", "mmap"]
+    assert o["solution_engine"] in ["period", "horizon"]
+    assert o["precision"] in ["float64", "float32"]
+    assert o["parallel"]["backend"] in ["serial", "threads", "processes", "loky"]
+    assert (
+        _is_positive_nonzero_integer(o["parallel"]["n_jobs"])
+        or o["parallel"]["n_jobs"] == -1
+    )
+    assert (
+        _is_positive_nonzero_integer(o["parallel"]["task_size"])
+        or o["parallel"]["task_size"] == "auto"
+    )
 
 
 def validate_params(params, optim_paras):
@@ -1,6 +1,8 @@
 """Process model specification files or objects."""
 import copy
+import hashlib
 import itertools
+import json
 import os
 import re
 import warnings
@@ -18,12 +20,15 @@ from respy.config import DEFAULT_OPTIONS
 from respy.config import MAX_FLOAT
 from respy.config import MIN_FLOAT
 from respy.config import SEED_STARTUP_ITERATION_GAP
+from respy.config import STATE_SPACE_ARTIFACT_VERSION
 from respy.pre_processing.model_checking import validate_options
 from respy.pre_processing.model_checking import validate_params
 from respy.pre_processing.process_covariates import remove_irrelevant_covariates
 from respy.pre_processing.process_covariates import (
     separate_covariates_into_core_dense_mixed,
 )
+from respy.shared import CompiledFormula
+from respy.shared import create_dense_state_space_columns
 from respy.shared import normalize_probabilities
 
 warnings.simplefilter("error", category=pd.errors.PerformanceWarning)
@@ -42,6 +47,7 @@ def process_params_and_options(params, options):
     options = _create_internal_seeds_from_user_seeds(options)
     options = remove_irrelevant_covariates(options, params)
     options = _parse_cache_directory(options)
+    options = _parse_parallel_options(options)
     validate_options(options)
 
     optim_paras = _parse_parameters(params, options)
@@ -52,6 +58,208 @@ def process_params_and_options(params, options):
     return optim_paras, options
 
 
+def create_parameter_plan(params, options):
+    """Create a plan to process new parameter values without parsing the model again.
+
+    The parameters of a model are parsed once. The plan records for each parameter
+    group in ``optim_paras`` the positions of its values in the parameter vector. Then,
+    :func:`process_params_with_plan` only inserts new values into a copy of the parsed
+    ``optim_paras`` and recomputes derived quantities like the Cholesky factor of the
+    shocks instead of reading the options and parsing the parameters again.
+
+    Parameters
+    ----------
+    params : pandas.DataFrame or pandas.Series
+        Contains the parameters of the model.
+    options : dict
+        Options passed to :func:`process_params_and_options` in every evaluation.
+
+    Returns
+    -------
+    plan : dict or None
+        The plan or None if the index of the parameters is not unique.
+
+    """
+    optim_paras, processed_options = process_params_and_options(params, options)
+    params = _read_params(params)
+
+    if not params.index.is_unique:
+        return None
+
+    # The regular expressions are the same as in the functions parsing the groups.
+    groups = []
+    for name in optim_paras["exogenous_processes"]:
+        regex = fr"\bexogenous_process_{name}_([0-9a-z_]+)\b"
+        groups.append((("exogenous_processes", name), regex))
+    for name in optim_paras["observables"]:
+        regex = fr"\bobservable_{name}_([0-9a-z_]+)\b"
+        groups.append((("observables", name), regex))
+    groups += [
+        (("choices", choice, "start"), fr"\binitial_exp_{choice}_([0-9]+)\b")
+        for choice in optim_paras["choices_w_exp"]
+    ]
+    if optim_paras["n_types"] >= 2:
+        groups.append((("type_prob",), r"\btype_([0-9]+)\b"))
+    groups += [
+        ((f"lagged_choice_{lag}",), fr"lagged_choice_{lag}_([A-Za-z_]+)")
+        for lag in range(1, optim_paras["n_lagged_choices"] + 1)
+    ]
+
+    parameter_groups = []
+    for path, regex in groups:
+        mask = _get_mask_of_parameter_group(params, regex)
+        if mask.any():
+            sub = params.loc[mask]
+            levels = _get_levels_of_parameter_group(sub, regex)
+            parsed_parameters = _convert_parameter_group(sub, levels, regex)
+            is_probability = (sub.index.get_level_values("name") == "probability").all()
+            level_to_positions = {
+                level: (np.flatnonzero(levels == level), value.index)
+                for level, value in parsed_parameters.items()
+            }
+            parameter_groups.append(
+                (path, regex, np.flatnonzero(mask), is_probability, level_to_positions)
+            )
+
+    categories = [
+        f"{prefix}_{choice}"
+        for choice in optim_paras["choices"]
+        for prefix in ["wage", "nonpec"]
+        if f"{prefix}_{choice}" in optim_paras
+    ]
+    shocks = next(
+        f"shocks_{i}"
+        for i in ["sdcorr", "cov", "chol"]
+        if f"shocks_{i}" in params.index
+    )
+
+    meas_error_labels = [
+        ("meas_error", f"sd_{choice}") for choice in optim_paras["choices_w_wage"]
+    ]
+    is_structural = params.index.get_level_values("category") == "maximum_exp"
+
+    plan = {
+        "index": params.index,
+        "optim_paras": optim_paras,
+        "options": processed_options,
+        "structural_positions": np.flatnonzero(is_structural),
+        "structural_values": params.to_numpy()[is_structural],
+        "delta": params.index.get_loc(("delta", "delta")),
+        "beta": params.index.get_loc(("beta", "beta"))
+        if ("beta", "beta") in params.index
+        else None,
+        "categories": {
+            category: _get_positions_of_category(params, category)
+            for category in categories + [shocks]
+        },
+        "shocks": shocks,
+        "meas_error": params.index.get_indexer(meas_error_labels)
+        if optim_paras["has_meas_error"]
+        else None,
+        "parameter_groups": parameter_groups,
+    }
+
+    return plan
+
+
+def process_params_with_plan(params, options, plan):
+    """Process ``params`` with a plan created by :func:`create_parameter_plan`.
+
+    The result is the same as of :func:`process_params_and_options`. If there is no
+    plan, the index of the parameters differs from the index used to create the plan,
+    or parameters which affect the structure of the model like the maximum experience
+    change, the parameters and options are processed from scratch.
+
+    """
+    params = _read_params(params)
+
+    if (
+        plan is None
+        or not params.index.equals(plan["index"])
+        or not np.array_equal(
+            params.to_numpy()[plan["structural_positions"]], plan["structural_values"]
+        )
+    ):
+        return process_params_and_options(params, options)
+
+    values = params.to_numpy()
+    optim_paras = _copy_dictionaries(plan["optim_paras"])
+
+    optim_paras["delta"] = values[plan["delta"]]
+    optim_paras["beta"] = 1 if plan["beta"] is None else values[plan["beta"]]
+    optim_paras["beta_delta"] = optim_paras["beta"] * optim_paras["delta"]
+
+    for category, (positions, index, name) in plan["categories"].items():
+        if category != plan["shocks"]:
+            optim_paras[category] = pd.Series(values[positions], index, name=name)
+
+    positions, index, name = plan["categories"][plan["shocks"]]
+    shocks = pd.Series(values[positions], index, name=name)
+    if plan["shocks"] == "shocks_sdcorr":
+        optim_paras["shocks_cholesky"] = robust_cholesky(
+            sdcorr_params_to_matrix(shocks)
+        )
+    elif plan["shocks"] == "shocks_cov":
+        optim_paras["shocks_cholesky"] = robust_cholesky(cov_params_to_matrix(shocks))
+    else:
+        optim_paras["shocks_cholesky"] = chol_params_to_lower_triangular_matrix(shocks)
+
+    if plan["meas_error"] is not None:
+        optim_paras["meas_error"] = optim_paras["meas_error"].copy()
+        optim_paras["meas_error"][: len(plan["meas_error"])] = values[
+            plan["meas_error"]
+        ]
+
+    for path, regex, positions, is_probability, level_to_positions in plan[
+        "parameter_groups"
+    ]:
+        group_values = values[positions]
+        if is_probability:
+            if group_values.sum() != 1:
+                warnings.warn(
+                    f"The probabilities for parameter group {regex} do not sum to one.",
+                    category=UserWarning,
+                )
+                group_values = normalize_probabilities(group_values)
+            group_values = np.log(np.clip(group_values, 1 / MAX_FLOAT, None))
+
+        parsed_parameters = {
+            level: pd.Series(group_values[level_positions], index, name=params.name)
+            for level, (level_positions, index) in level_to_positions.items()
+        }
+
+        container = optim_paras
+        for key in path[:-1]:
+            container = container[key]
+        # Keep the order of levels and the defaults of levels without parameters.
+        container[path[-1]] = {
+            level: parsed_parameters.get(level, default)
+            for level, default in container[path[-1]].items()
+        }
+
+    options = _create_internal_seeds_from_user_seeds({**plan["options"]})
+
+    return optim_paras, options
+
+
+def _get_positions_of_category(params, category):
+    """Get the positions, the names and the name of the parameters of a category."""
+    sub = params.loc[category]
+    positions = params.index.get_indexer(
+        pd.MultiIndex.from_product([[category], sub.index])
+    )
+
+    return positions, sub.index, sub.name
+
+
+def _copy_dictionaries(dictionary):
+    """Copy nested dictionaries without copying other values."""
+    return {
+        key: _copy_dictionaries(value) if isinstance(value, dict) else value
+        for key, value in dictionary.items()
+    }
+
+
 def _read_options(dict_or_path):
     """Read the options which can either be a dictionary or a path."""
     if isinstance(dict_or_path, Path):
@@ -603,58 +811,79 @@ def _parse_probabilities_or_logit_coefficients(params, regex_for_levels):
     not sum to one.
 
     """
-    mask = (
-        params.index.get_level_values("category")
-        .str.extract(regex_for_levels, expand=False)
-        .notna()
-    )
-    n_parameters = mask.sum()
+    mask = _get_mask_of_parameter_group(params, regex_for_levels)
 
     # If parameters for initial experiences are specified, the parameters can either
     # be probabilities or multinomial logit coefficients.
-    if n_parameters:
+    if mask.sum():
         # Work on subset.
         sub = params.loc[mask].copy()
+        levels = _get_levels_of_parameter_group(sub, regex_for_levels)
+        container = _convert_parameter_group(sub, levels, regex_for_levels)
 
-        levels = sub.index.get_level_values("category").str.extract(
-            regex_for_levels, expand=False
-        )
-        levels = pd.to_numeric(levels, errors="ignore")
-        unique_levels = sorted(levels.unique())
+    # If no parameters are provided, return `None` so that the default is handled
+    # outside the function.
+    else:
+        container = None
 
-        n_probabilities = (sub.index.get_level_values("name") == "probability").sum()
+    return container
 
-        # It is allowed to specify the shares of initial experiences as
-        # probabilities. Then, the probabilities are replaced with their logs to
-        # recover the probabilities with a multinomial logit model.
-        if n_probabilities == len(unique_levels) == n_parameters:
-            if sub.sum() != 1:
-                warnings.warn(
-                    f"The probabilities for parameter group {regex_for_levels} do not "
-                    "sum to one.",
-                    category=UserWarning,
-                )
-                sub = normalize_probabilities(sub)
 
-            # Clip at the smallest representable number to prevent -infinity for log(0).
-            sub = np.log(np.clip(sub, 1 / MAX_FLOAT, None))
-            sub = sub.rename(index={"probability": "constant"}, level="name")
+def _get_mask_of_parameter_group(params, regex_for_levels):
+    """Get the mask of parameters whose category matches the regex of a group."""
+    return (
+        params.index.get_level_values("category")
+        .str.extract(regex_for_levels, expand=False)
+        .notna()
+    )
 
-        elif n_probabilities > 0:
-            raise ValueError(
-                "Cannot mix probabilities and multinomial logit coefficients for the "
-                f"parameter group: {regex_for_levels}."
+
+def _get_levels_of_parameter_group(sub, regex_for_levels):
+    """Get the level of each parameter in a group, e.g., the initial experience."""
+    levels = sub.index.get_level_values("category").str.extract(
+        regex_for_levels, expand=False
+    )
+
+    return pd.to_numeric(levels, errors="ignore")
+
+
+def _convert_parameter_group(sub, levels, regex_for_levels):
+    """Convert a group of probabilities or logit coefficients to logit coefficients.
+
+    See :func:`_parse_probabilities_or_logit_coefficients` for more information.
+
+    """
+    n_parameters = len(sub)
+    unique_levels = sorted(levels.unique())
+
+    n_probabilities = (sub.index.get_level_values("name") == "probability").sum()
+
+    # It is allowed to specify the shares of initial experiences as probabilities.
+    # Then, the probabilities are replaced with their logs to recover the
+    # probabilities with a multinomial logit model.
+    if n_probabilities == len(unique_levels) == n_parameters:
+        if sub.sum() != 1:
+            warnings.warn(
+                f"The probabilities for parameter group {regex_for_levels} do not "
+                "sum to one.",
+                category=UserWarning,
             )
+            sub = normalize_probabilities(sub)
 
-        # Drop level 'category' from :class:`pd.MultiIndex`.
-        s = sub.droplevel(axis="index", level="category")
-        # Insert parameters for every level of initial experiences.
-        container = {level: s.loc[levels == level] for level in unique_levels}
+        # Clip at the smallest representable number to prevent -infinity for log(0).
+        sub = np.log(np.clip(sub, 1 / MAX_FLOAT, None))
+        sub = sub.rename(index={"probability": "constant"}, level="name")
 
-    # If no parameters are provided, return `None` so that the default is handled
-    # outside the function.
-    else:
-        container = None
+    elif n_probabilities > 0:
+        raise ValueError(
+            "Cannot mix probabilities and multinomial logit coefficients for the "
+            f"parameter group: {regex_for_levels}."
+        )
+
+    # Drop level 'category' from :class:`pd.MultiIndex`.
+    s = sub.droplevel(axis="index", level="category")
+    # Insert parameters for every level of initial experiences.
+    container = {level: s.loc[levels == level] for level in unique_levels}
 
     return container
 
@@ -730,6 +959,9 @@ def _sync_optim_paras_and_options(optim_paras, options):
     options = _add_default_is_inadmissible(options, optim_paras)
     options = _convert_labels_in_formulas_to_codes(options, optim_paras)
     options = separate_covariates_into_core_dense_mixed(options, optim_paras)
+    options = _compile_formulas(options, optim_paras)
+    options = _add_covariates_of_rewards(options, optim_paras)
+    options = _add_state_space_path(options, optim_paras)
 
     return optim_paras, options
 
@@ -888,6 +1120,182 @@ def _convert_labels_in_filters_to_codes(optim_paras, options):
     return options
 
 
+def _compile_formulas(options, optim_paras):
+    """Compile filters and formulas of inadmissible choices into predicates.
+
+    The formulas are parsed once such that the core state space and the choice sets can
+    be computed with single vectorized passes over the states. Duplicate formulas of
+    inadmissible choices are only compiled once as they are combined with "or".
+
+    """
+    options["compiled_core_state_space_filters"] = [
+        CompiledFormula(filter_) for filter_ in options["core_state_space_filters"]
+    ]
+    options["compiled_negative_choice_set"] = {
+        choice: [
+            CompiledFormula(formula)
+            for formula in dict.fromkeys(options["negative_choice_set"].get(choice, []))
+        ]
+        for choice in optim_paras["choices"]
+    }
+
+    return options
+
+
+def _add_covariates_of_rewards(options, optim_paras):
+    """Add the covariates of wages and non-pecuniary rewards to the options.
+
+    The covariates are stored in the order of their first appearance in the parameters
+    and determine the columns of the design matrices of rewards which are created with
+    the state space. Following :func:`separate_covariates_into_core_dense_mixed`, the
+    covariates are separated into three groups such that the rewards are computed once
+    per core state, once per dense vector and only for the mixed covariates per
+    combination of both.
+
+    Examples
+    --------
+    >>> options = {
+    ...     "covariates_dense": {"type_1": {}},
+    ...     "covariates_mixed": {"exp_a_type_1": {}},
+    ... }
+    >>> optim_paras = {
+    ...     "choices": ["a", "b"],
+    ...     "exogenous_processes": {},
+    ...     "n_types": 2,
+    ...     "observables": {},
+    ...     "wage_a": pd.Series(index=["constant", "exp_a_type_1"], dtype="float64"),
+    ...     "nonpec_b": pd.Series(index=["constant", "type_1"], dtype="float64"),
+    ... }
+    >>> _add_covariates_of_rewards(options, optim_paras)["covariates_rewards"]
+    {'core': ['constant'], 'dense': ['type_1'], 'mixed': ['exp_a_type_1']}
+
+    """
+    covariates = [
+        covariate
+        for choice in optim_paras["choices"]
+        for category in [f"wage_{choice}", f"nonpec_{choice}"]
+        if category in optim_paras
+        for covariate in optim_paras[category].index
+    ]
+    dense_columns = create_dense_state_space_columns(optim_paras)
+
+    covariates_rewards = {"core": [], "dense": [], "mixed": []}
+    for covariate in dict.fromkeys(covariates):
+        if covariate in options["covariates_mixed"]:
+            covariates_rewards["mixed"].append(covariate)
+        elif covariate in options["covariates_dense"] or covariate in dense_columns:
+            covariates_rewards["dense"].append(covariate)
+        else:
+            covariates_rewards["core"].append(covariate)
+
+    options["covariates_rewards"] = covariates_rewards
+
+    return options
+
+
+def _add_state_space_path(options, optim_paras):
+    """Add the directory of the state space artifact to the options.
+
+    The name of the directory contains a hash of all model features which determine the
+    structure of the state space. Thus, models with the same structure, but different
+    parameter values, share the state space stored in the directory.
+
+    """
+    choices = optim_paras["choices"]
+    structure = {
+        "version": STATE_SPACE_ARTIFACT_VERSION,
+        "choices": [
+            [
+                choice,
+                sorted(int(exp) for exp in choices[choice].get("start", [])),
+                int(choices[choice].get("max", -1)),
+            ]
+            for choice in choices
+        ],
+        "choices_w_exp": optim_paras["choices_w_exp"],
+        "choices_w_wage": optim_paras["choices_w_wage"],
+        "n_lagged_choices": int(optim_paras["n_lagged_choices"]),
+        "n_types": int(optim_paras["n_types"]),
+        "observables": {
+            name: [str(level) for level in levels]
+            for name, levels in optim_paras["observables"].items()
+        },
+        "exogenous_processes": {
+            name: [str(level) for level in levels]
+            for name, levels in optim_paras["exogenous_processes"].items()
+        },
+        # Formulas are combined with "or" and might be added multiple times if the
+        # options are processed again.
+        "negative_choice_set": {
+            choice: sorted(set(formulas))
+            for choice, formulas in options["negative_choice_set"].items()
+        },
+        **{
+            option: options[option]
+            for option in [
+                "n_periods",
+                "core_state_space_filters",
+                "covariates_core",
+                "covariates_dense",
+                "covariates_all",
+                "covariates_rewards",
+                "solution_draws",
+                "solution_seed",
+                "solution_antithetic",
+                "solution_integration",
+                "solution_quadrature_order",
+                "monte_carlo_sequence",
+                "cache_compression",
+                "cache_backend",
+            ]
+        },
+    }
+    hash_ = hashlib.sha256(
+        json.dumps(structure, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+    options["state_space_path"] = options["cache_path"] / f"state_space_{hash_[:16]}"
+
+    return options
+
+
+def _parse_parallel_options(options):
+    """Parse the options for the parallelization across dense dimensions.
+
+    ``options["parallel"]`` can be the name of a backend or a dictionary with the keys
+    ``"backend"``, ``"n_jobs"`` and ``"task_size"``. The backends are
+
+    - ``"serial"``: Execute the dense dimensions one after another.
+    - ``"threads"``: Use a thread pool which is effective if the work is done in Numba
+      functions releasing the GIL.
+    - ``"processes"``: Use a pool of processes which is kept alive between calls.
+    - ``"loky"``: Use the reusable pool of processes of joblib.
+
+    If the number of jobs is not given, all cores are used except for the serial
+    backend. The task size is the number of array elements which parallel backends
+    group into one task (see :func:`respy.parallelization._schedule_dense_keys`). It
+    defaults to ``"auto"``.
+
+    Examples
+    --------
+    >>> _parse_parallel_options({"parallel": "threads"})
+    {'parallel': {'backend': 'threads', 'n_jobs': -1, 'task_size': 'auto'}}
+    >>> _parse_parallel_options({"parallel": {"backend": "loky", "n_jobs": 2}})
+    {'parallel': {'backend': 'loky', 'n_jobs': 2, 'task_size': 'auto'}}
+
+    """
+    parallel = options["parallel"]
+    if isinstance(parallel, str):
+        parallel = {"backend": parallel}
+
+    backend = parallel.get("backend", "serial")
+    n_jobs = parallel.get("n_jobs", 1 if backend == "serial" else -1)
+    task_size = parallel.get("task_size", "auto")
+    options["parallel"] = {"backend": backend, "n_jobs": n_jobs, "task_size": task_size}
+
+    return options
+
+
 def _parse_cache_directory(options):
     """Parse the location of the cache."""
     path = Path(options.get("cache_path", ".respy"))
@@ -4,18 +4,33 @@ This module should only import from other packages or modules of respy which als
 import from respy itself. This is to prevent circular imports.
 
 """
+import ast
+import io
+import math
+import pickle
 import shutil
+import tokenize
+from collections import OrderedDict
+from collections.abc import Mapping
 
 import chaospy as cp
 import numba as nb
 import numpy as np
 import pandas as pd
+from numba.typed import Dict
 
 from respy._numba import array_to_tuple
+from respy.config import INDEXER_MIN_LOOKUP_SIZE
 from respy.config import MAX_LOG_FLOAT
+from respy.config import MAX_N_STATE_STORES
 from respy.config import MIN_LOG_FLOAT
 from respy.parallelization import parallelize_across_dense_dimensions
 
+_STATE_STORES = OrderedDict()
+"""collections.OrderedDict : State stores loaded in this process."""
+_OBJECTS_IN_MEMORY = {}
+"""dict : Objects like transition probabilities which are kept in memory."""
+
 
 @nb.njit
 def aggregate_keane_wolpin_utility(wage, nonpec, continuation_value, draw, delta):
@@ -55,12 +70,18 @@ def aggregate_keane_wolpin_utility(wage, nonpec, continuation_value, draw, delta
     return alternative_specific_value_function, flow_utility
 
 
-def create_base_draws(shape, seed, monte_carlo_sequence):
+def create_base_draws(shape, seed, monte_carlo_sequence, antithetic=False):
     """Create a set of draws from the standard normal distribution.
 
     The draws are either drawn randomly or from quasi-random low-discrepancy sequences,
     i.e., Sobol or Halton.
 
+    If ``antithetic`` is true, only half of the draws along the second to last axis is
+    sampled and each draw is followed by its negation (see 9.2.3 in [1]_). Thus, every
+    prefix with an even number of draws consists of antithetic pairs. Since the maximum
+    of value functions is monotonic in the shocks, the errors of an antithetic pair are
+    negatively correlated and partially cancel out in the Monte Carlo integration.
+
     `"random"` is used to draw random standard normal shocks for the Monte Carlo
     integrations or because individuals face random shocks in the simulation.
 
@@ -85,6 +106,8 @@ def create_base_draws(shape, seed, monte_carlo_sequence):
         Seed to control randomness.
     monte_carlo_sequence : {"random", "halton", "sobol"}
         Name of the sequence.
+    antithetic : bool, default False
+        Whether the draws are antithetic pairs.
 
     Returns
     -------
@@ -105,6 +128,16 @@ def create_base_draws(shape, seed, monte_carlo_sequence):
             Verlag New York.*
 
     """
+    if antithetic:
+        n_draws = shape[-2]
+        half_shape = (*shape[:-2], (n_draws + 1) // 2, shape[-1])
+        draws = create_base_draws(half_shape, seed, monte_carlo_sequence)
+        draws = np.stack((draws, -draws), axis=-2).reshape(
+            *half_shape[:-2], -1, shape[-1]
+        )[..., :n_draws, :]
+
+        return draws
+
     n_choices = shape[-1]
     n_points = np.prod(shape[:-1])
 
@@ -127,6 +160,58 @@ def create_base_draws(shape, seed, monte_carlo_sequence):
     return draws
 
 
+def create_base_quadrature(n_choices, order, rule):
+    """Create nodes and weights of a quadrature rule for standard normal shocks.
+
+    In contrast to the equally weighted draws of :func:`create_base_draws`, the nodes
+    of Gauss-Hermite quadrature come with weights. The one-dimensional rule with
+    ``order + 1`` nodes integrates polynomials up to degree ``2 * order + 1`` exactly.
+
+    `"gauss_hermite"` is the tensor product of the one-dimensional rule with ``(order +
+    1) ** n_choices`` nodes. `"sparse_grid"` combines tensor products of lower orders
+    with Smolyak's algorithm (see [1]_) and needs fewer nodes if there are more than
+    three choices. Some weights of the sparse grid are negative. Sparse grids are exact
+    for smooth integrands, but the maximum over value functions has kinks. Thus,
+    prefer the tensor product for the expected value functions.
+
+    Like the draws, the nodes are transformed to the distribution of the shocks in
+    :func:`transform_base_draws_with_cholesky_factor`.
+
+    Parameters
+    ----------
+    n_choices : int
+        Number of choices which is the dimension of the integral.
+    order : int
+        Order of the one-dimensional rule.
+    rule : {"gauss_hermite", "sparse_grid"}
+        Name of the rule.
+
+    Returns
+    -------
+    nodes : numpy.ndarray
+        Array with shape (n_nodes, n_choices).
+    weights : numpy.ndarray
+        Array with shape (n_nodes,) which sums to one.
+
+    References
+    ----------
+    .. [1] Heiss, F. and Winschel, V. (2008). `Likelihood Approximation by Numerical
+           Integration on Sparse Grids
+           <https://doi.org/10.1016/j.jeconom.2007.12.004>`_. *Journal of
+           Econometrics*, 144(1): 62-80.
+
+    """
+    if rule not in ["gauss_hermite", "sparse_grid"]:
+        raise ValueError(f"Unknown quadrature rule {rule!r}.")
+
+    distribution = cp.Iid(cp.Normal(0, 1), n_choices)
+    nodes, weights = cp.generate_quadrature(
+        order, distribution, rule="gaussian", sparse=rule == "sparse_grid"
+    )
+
+    return nodes.T, weights
+
+
 @parallelize_across_dense_dimensions
 def transform_base_draws_with_cholesky_factor(
     draws, choice_set, shocks_cholesky, optim_paras
@@ -139,7 +224,9 @@ def transform_base_draws_with_cholesky_factor(
 
     This function relates to :func:`create_base_draws` in the sense that it transforms
     the unchanging standard normal draws to the distribution with the
-    variance-covariance matrix specified by the parameters.
+    variance-covariance matrix specified by the parameters. The nodes of
+    :func:`create_base_quadrature` are transformed in the same way and keep their
+    weights.
 
     References
     ----------
@@ -312,6 +399,200 @@ def compute_covariates(df, definitions, check_nans=False, raise_errors=True):
     return df
 
 
+class CompiledFormula:
+    """Vectorized predicate compiled from a formula for :meth:`pandas.DataFrame.eval`.
+
+    The formula is parsed once and translated to an expression of NumPy operations on
+    the columns it uses. The syntax follows the default parser of
+    :func:`pandas.eval`. ``&`` and ``|`` have the precedence of ``and`` and ``or``,
+    and all boolean operations are element-wise. Formulas which cannot be translated
+    are evaluated with :meth:`pandas.DataFrame.eval`.
+
+    Parameters
+    ----------
+    formula : str
+        The formula, e.g., ``"period > 0 & exp_a == 0"``.
+
+    Attributes
+    ----------
+    variables : set or None
+        Names of the columns required by the formula or None if the formula cannot be
+        parsed.
+
+    Examples
+    --------
+    >>> df = pd.DataFrame({"period": [0, 1, 2], "exp_a": [0, 0, 1]})
+    >>> formula = CompiledFormula("period > 0 & exp_a == 0")
+    >>> formula(df)
+    array([False,  True, False])
+    >>> formula.variables == {"period", "exp_a"}
+    True
+
+    """
+
+    def __init__(self, formula):
+        self.formula = formula
+        try:
+            tree = ast.parse(
+                _replace_bitwise_with_boolean_operators(formula), mode="eval"
+            )
+        except SyntaxError:
+            self.variables = None
+            self._code = None
+        else:
+            functions = {
+                node.func for node in ast.walk(tree) if isinstance(node, ast.Call)
+            }
+            self.variables = {
+                node.id
+                for node in ast.walk(tree)
+                if isinstance(node, ast.Name) and node not in functions
+            }
+            try:
+                source = _translate_formula_node(tree.body)
+            except NotImplementedError:
+                self._code = None
+            else:
+                self._code = compile(source, "<formula>", "eval")
+
+    def is_defined_for(self, df):
+        """Check whether all variables of the formula are columns of the DataFrame.
+
+        If the formula cannot be parsed, the variables are resolved by
+        :meth:`pandas.DataFrame.eval` on an empty DataFrame with the same columns.
+
+        """
+        if self.variables is None:
+            try:
+                df.iloc[:0].eval(self.formula)
+            except pd.core.computation.ops.UndefinedVariableError:
+                is_defined = False
+            else:
+                is_defined = True
+        else:
+            is_defined = self.variables.issubset(df.columns)
+
+        return is_defined
+
+    def __call__(self, df):
+        """Evaluate the formula for each row of the DataFrame."""
+        if self._code is None:
+            out = df.eval(self.formula)
+        else:
+            columns = {variable: df[variable].to_numpy() for variable in self.variables}
+            out = eval(self._code, {"np": np}, {"_columns": columns})
+
+        return np.broadcast_to(np.asarray(out, dtype=np.bool_), (len(df),))
+
+    def __reduce__(self):
+        """Pickle only the formula as code objects cannot be pickled."""
+        return (CompiledFormula, (self.formula,))
+
+
+def _replace_bitwise_with_boolean_operators(formula):
+    """Replace ``&`` with ``and`` and ``|`` with ``or`` like :func:`pandas.eval`.
+
+    Examples
+    --------
+    >>> _replace_bitwise_with_boolean_operators("period == 4 & exp_b == 4")
+    'period ==4 and exp_b ==4 '
+
+    """
+    tokens = []
+    for token in tokenize.generate_tokens(io.StringIO(formula).readline):
+        if token.type == tokenize.OP and token.string == "&":
+            tokens.append((tokenize.NAME, "and"))
+        elif token.type == tokenize.OP and token.string == "|":
+            tokens.append((tokenize.NAME, "or"))
+        else:
+            tokens.append((token.type, token.string))
+
+    return tokenize.untokenize(tokens)
+
+
+_BINARY_OPERATORS = {
+    ast.Add: "+",
+    ast.Sub: "-",
+    ast.Mult: "*",
+    ast.Div: "/",
+    ast.FloorDiv: "//",
+    ast.Mod: "%",
+    ast.Pow: "**",
+}
+_COMPARISON_OPERATORS = {
+    ast.Eq: "==",
+    ast.NotEq: "!=",
+    ast.Lt: "<",
+    ast.LtE: "<=",
+    ast.Gt: ">",
+    ast.GtE: ">=",
+}
+
+
+def _translate_formula_node(node):
+    """Translate a node of a parsed formula to an expression with NumPy operations."""
+    if isinstance(node, ast.BoolOp):
+        function = "np.logical_and" if isinstance(node.op, ast.And) else "np.logical_or"
+        values = [_translate_formula_node(value) for value in node.values]
+        out = values[0]
+        for value in values[1:]:
+            out = f"{function}({out}, {value})"
+
+    elif isinstance(node, ast.UnaryOp):
+        operand = _translate_formula_node(node.operand)
+        if isinstance(node.op, ast.Not):
+            out = f"np.logical_not({operand})"
+        elif isinstance(node.op, ast.Invert):
+            out = f"np.invert({operand})"
+        elif isinstance(node.op, ast.USub):
+            out = f"(-{operand})"
+        else:
+            out = operand
+
+    elif isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        left = _translate_formula_node(node.left)
+        right = _translate_formula_node(node.right)
+        out = f"({left} {_BINARY_OPERATORS[type(node.op)]} {right})"
+
+    elif isinstance(node, ast.Compare):
+        comparisons = []
+        left = _translate_formula_node(node.left)
+        for operator, comparator in zip(node.ops, node.comparators):
+            right = _translate_formula_node(comparator)
+            if type(operator) in _COMPARISON_OPERATORS:
+                comparison = f"({left} {_COMPARISON_OPERATORS[type(operator)]} {right})"
+            elif isinstance(operator, ast.In):
+                comparison = f"np.isin({left}, {right})"
+            elif isinstance(operator, ast.NotIn):
+                comparison = f"np.isin({left}, {right}, invert=True)"
+            else:
+                raise NotImplementedError
+            comparisons.append(comparison)
+            left = right
+
+        out = comparisons[0]
+        for comparison in comparisons[1:]:
+            out = f"np.logical_and({out}, {comparison})"
+
+    elif isinstance(node, ast.Name):
+        out = f"_columns[{node.id!r}]"
+
+    elif isinstance(node, (ast.List, ast.Tuple)):
+        elements = [_translate_formula_node(element) for element in node.elts]
+        out = f"[{', '.join(elements)}]"
+
+    elif isinstance(node, ast.Constant) and isinstance(node.value, (bool, int, float)):
+        out = repr(node.value)
+
+    elif isinstance(node, (ast.Num, ast.NameConstant)):
+        out = repr(node.n if isinstance(node, ast.Num) else node.value)
+
+    else:
+        raise NotImplementedError
+
+    return out
+
+
 def convert_labeled_variables_to_codes(df, optim_paras):
     """Convert labeled variables to codes.
 
@@ -433,7 +714,10 @@ def create_state_space_columns(optim_paras):
 
 
 @nb.guvectorize(
-    ["f8[:], f8[:], f8[:], f8[:, :], f8, f8[:]"],
+    [
+        "f4[:], f4[:], f4[:], f4[:, :], f4, f8[:]",
+        "f8[:], f8[:], f8[:], f8[:, :], f8, f8[:]",
+    ],
     "(n_choices), (n_choices), (n_choices), (n_draws, n_choices), () -> ()",
     nopython=True,
     target="parallel",
@@ -455,6 +739,10 @@ def calculate_expected_value_functions(
     this setting, one wants to approximate the expected maximum utility of the current
     state.
 
+    The inputs can be single-precision if ``options["precision"]`` is ``"float32"``.
+    Then, the value functions are computed in single precision, but the sum over draws
+    is accumulated in double precision.
+
     Note that ``wages`` have the same length as ``nonpecs`` despite that wages are only
     available in some choices. Missing choices are filled with ones. In the case of a
     choice with wage and without wage, flow utilities are
@@ -486,11 +774,404 @@ def calculate_expected_value_functions(
     """
     n_draws, n_choices = draws.shape
 
-    expected_value_functions[0] = 0
+    expected_value_function = 0.0
+
+    for i in range(n_draws):
+
+        max_value_functions = 0.0
+
+        for j in range(n_choices):
+            value_function, _ = aggregate_keane_wolpin_utility(
+                wages[j], nonpecs[j], continuation_values[j], draws[i, j], delta
+            )
+
+            if value_function > max_value_functions:
+                max_value_functions = value_function
+
+        expected_value_function += max_value_functions
+
+    expected_value_functions[0] = expected_value_function / n_draws
+
+
+@nb.guvectorize(
+    [
+        "f4[:], f4[:], f4[:], f4[:, :], f4, f8, i8, f8[:], i8[:]",
+        "f8[:], f8[:], f8[:], f8[:, :], f8, f8, i8, f8[:], i8[:]",
+    ],
+    "(n_choices), (n_choices), (n_choices), (n_draws, n_choices), (), (), () -> (), ()",
+    nopython=True,
+    target="parallel",
+)
+def calculate_expected_value_functions_adaptively(
+    wages,
+    nonpecs,
+    continuation_values,
+    draws,
+    delta,
+    tolerance,
+    block_size,
+    expected_value_functions,
+    n_draws_used,
+):
+    """Calculate the expected maximum of value functions with adaptive numbers of draws.
+
+    The Monte Carlo integration of :func:`calculate_expected_value_functions` processes
+    the draws in blocks of ``block_size`` draws. After each block, the standard error of
+    the running mean is computed from sums of the maximum of value functions which are
+    shifted by the first maximum to avoid cancellation. The integration stops if the
+    standard error relative to the absolute value of the mean is below ``tolerance`` or
+    all draws are used. Since the draws are fixed, the number of draws is deterministic
+    for given parameters.
+
+    Parameters
+    ----------
+    wages : numpy.ndarray
+        Array with shape (n_choices,) containing wages.
+    nonpecs : numpy.ndarray
+        Array with shape (n_choices,) containing non-pecuniary rewards.
+    continuation_values : numpy.ndarray
+        Array with shape (n_choices,) containing expected maximum utility for each
+        choice in the subsequent period.
+    draws : numpy.ndarray
+        Array with shape (n_draws, n_choices).
+    delta : float
+        The discount factor.
+    tolerance : float
+        Tolerance for the relative standard error of the mean.
+    block_size : int
+        Number of draws processed between two checks of the tolerance.
+
+    Returns
+    -------
+    expected_value_functions : float
+        Expected maximum utility of an agent.
+    n_draws_used : int
+        Number of draws used for the expected maximum utility.
+
+    """
+    n_draws, n_choices = draws.shape
+
+    shift = 0.0
+    for j in range(n_choices):
+        value_function, _ = aggregate_keane_wolpin_utility(
+            wages[j], nonpecs[j], continuation_values[j], draws[0, j], delta
+        )
+        if value_function > shift:
+            shift = value_function
+
+    sum_of_deviations = 0.0
+    sum_of_squared_deviations = 0.0
+    n_processed = 0
+
+    while n_processed < n_draws:
+        end = min(n_processed + block_size, n_draws)
+
+        for i in range(n_processed, end):
+
+            max_value_functions = 0.0
+
+            for j in range(n_choices):
+                value_function, _ = aggregate_keane_wolpin_utility(
+                    wages[j], nonpecs[j], continuation_values[j], draws[i, j], delta
+                )
+
+                if value_function > max_value_functions:
+                    max_value_functions = value_function
+
+            deviation = max_value_functions - shift
+            sum_of_deviations += deviation
+            sum_of_squared_deviations += deviation * deviation
+
+        n_processed = end
+
+        if 1 < n_processed < n_draws:
+            variance = (
+                sum_of_squared_deviations
+                - sum_of_deviations * sum_of_deviations / n_processed
+            ) / (n_processed - 1)
+            standard_error = np.sqrt(max(variance, 0.0) / n_processed)
+            mean = shift + sum_of_deviations / n_processed
+            if standard_error <= tolerance * abs(mean):
+                break
+
+    expected_value_functions[0] = shift + sum_of_deviations / n_processed
+    n_draws_used[0] = n_processed
+
+
+@nb.guvectorize(
+    [
+        "f4[:], f4[:], f4[:], f4[:, :], f8[:], f4, f8[:]",
+        "f8[:], f8[:], f8[:], f8[:, :], f8[:], f8, f8[:]",
+    ],
+    "(n_choices), (n_choices), (n_choices), (n_draws, n_choices), (n_draws), () -> ()",
+    nopython=True,
+    target="parallel",
+)
+def calculate_weighted_expected_value_functions(
+    wages, nonpecs, continuation_values, nodes, weights, delta, expected_value_functions
+):
+    """Calculate the expected maximum of value functions with a quadrature rule.
+
+    The function is the same as :func:`calculate_expected_value_functions` except that
+    the maximum of value functions at each node is weighted with the weights of the
+    quadrature rule instead of averaging over equally weighted draws. See
+    :func:`create_base_quadrature` for the rules.
+
+    Parameters
+    ----------
+    wages : numpy.ndarray
+        Array with shape (n_choices,) containing wages.
+    nonpecs : numpy.ndarray
+        Array with shape (n_choices,) containing non-pecuniary rewards.
+    continuation_values : numpy.ndarray
+        Array with shape (n_choices,) containing expected maximum utility for each
+        choice in the subsequent period.
+    nodes : numpy.ndarray
+        Array with shape (n_nodes, n_choices) containing the transformed nodes.
+    weights : numpy.ndarray
+        Array with shape (n_nodes,) containing the weights of the nodes.
+    delta : float
+        The discount factor.
+
+    Returns
+    -------
+    expected_value_functions : float
+        Expected maximum utility of an agent.
+
+    """
+    n_nodes, n_choices = nodes.shape
+
+    expected_value_function = 0.0
+
+    for i in range(n_nodes):
+
+        max_value_functions = 0.0
+
+        for j in range(n_choices):
+            value_function, _ = aggregate_keane_wolpin_utility(
+                wages[j], nonpecs[j], continuation_values[j], nodes[i, j], delta
+            )
+
+            if value_function > max_value_functions:
+                max_value_functions = value_function
+
+        expected_value_function += weights[i] * max_value_functions
+
+    expected_value_functions[0] = expected_value_function
+
+
+@nb.guvectorize(
+    [
+        "f4[:], f4[:], f4[:], f8[:], f8[:, :], f4, f8[:]",
+        "f8[:], f8[:], f8[:], f8[:], f8[:, :], f8, f8[:]",
+    ],
+    "(n_choices), (n_choices), (n_choices), (n_choices), (n_choices, n_choices), () "
+    "-> ()",
+    nopython=True,
+    target="parallel",
+)
+def calculate_expected_value_functions_with_clark(
+    wages,
+    nonpecs,
+    continuation_values,
+    expected_shocks,
+    shocks_covariance,
+    delta,
+    expected_value_functions,
+):
+    r"""Approximate the expected maximum of value functions in closed form.
+
+    The approximation of [1]_ computes the expected maximum of normal random variables
+    without draws. The maximum of two normal variables :math:`X_1` and :math:`X_2`
+    with means :math:`\mu_i`, variances :math:`\sigma^2_i` and covariance
+    :math:`\sigma_{12}` has the first two moments
+
+    .. math::
+
+        E[\max] &= \mu_1 \Phi(\alpha) + \mu_2 \Phi(-\alpha)
+            + \theta \phi(\alpha) \\
+        E[\max^2] &= (\sigma^2_1 + \mu^2_1) \Phi(\alpha)
+            + (\sigma^2_2 + \mu^2_2) \Phi(-\alpha)
+            + (\mu_1 + \mu_2) \theta \phi(\alpha)
+
+    where :math:`\theta^2 = \sigma^2_1 + \sigma^2_2 - 2 \sigma_{12}` and
+    :math:`\alpha = (\mu_1 - \mu_2) / \theta`. The covariance of the maximum and a
+    third variable :math:`X_3` is :math:`\sigma_{13} \Phi(\alpha) + \sigma_{23}
+    \Phi(-\alpha)`. The maximum is treated as a normal variable with these moments
+    and compared with the value function of the next choice. Thus, the computation
+    costs :math:`O(n_{choices}^2)` per state.
+
+    The value functions of choices with wages are log-normal. They enter the
+    approximation with their exact means and covariances which are computed by
+    :func:`~respy.interpolate._compute_covariance_of_shocks`. Like the Monte Carlo
+    integration in :func:`calculate_expected_value_functions`, the maximum starts at
+    zero. The approximation is exact for the maximum of two normal variables, but its
+    error grows with the skewness of log-normal wages, i.e., with the variance of the
+    wage shocks.
+
+    Parameters
+    ----------
+    wages : numpy.ndarray
+        Array with shape (n_choices,) containing wages.
+    nonpecs : numpy.ndarray
+        Array with shape (n_choices,) containing non-pecuniary rewards.
+    continuation_values : numpy.ndarray
+        Array with shape (n_choices,) containing expected maximum utility for each
+        choice in the subsequent period.
+    expected_shocks : numpy.ndarray
+        Array with shape (n_choices,) containing the expected value of the shocks.
+    shocks_covariance : numpy.ndarray
+        Array with shape (n_choices, n_choices) containing the covariance matrix of the
+        shocks.
+    delta : float
+        The discount factor.
+
+    Returns
+    -------
+    expected_value_functions : float
+        Expected maximum utility of an agent.
+
+    References
+    ----------
+    .. [1] Clark, C. E. (1961). `The Greatest of a Finite Set of Random Variables
+           <https://doi.org/10.1287/opre.9.2.145>`_. *Operations Research*, 9(2):
+           145-162.
+
+    """
+    n_choices = wages.shape[0]
+
+    mean = 0.0
+    variance = 0.0
+    covariances = np.zeros(n_choices)
+
+    for j in range(n_choices):
+        mean_j, _ = aggregate_keane_wolpin_utility(
+            wages[j], nonpecs[j], continuation_values[j], expected_shocks[j], delta
+        )
+        variance_j = wages[j] * wages[j] * shocks_covariance[j, j]
+        theta_squared = variance + variance_j - 2 * covariances[j]
+
+        if theta_squared <= 0:
+            # The difference is deterministic and the maximum is the larger variable.
+            if mean_j > mean:
+                mean = mean_j
+                variance = variance_j
+                for k in range(j + 1, n_choices):
+                    covariances[k] = wages[j] * wages[k] * shocks_covariance[j, k]
+            continue
+
+        theta = np.sqrt(theta_squared)
+        difference = mean - mean_j
+        alpha = difference / theta
+        cdf = 0.5 * (1 + math.erf(alpha / np.sqrt(2)))
+        pdf = np.exp(-0.5 * alpha * alpha) / np.sqrt(2 * np.pi)
+
+        # The moments are computed relative to ``mean_j`` to avoid cancellation.
+        shifted_mean = difference * cdf + theta * pdf
+        shifted_second_moment = (
+            (variance + difference * difference) * cdf
+            + variance_j * (1 - cdf)
+            + difference * theta * pdf
+        )
+
+        for k in range(j + 1, n_choices):
+            covariances[k] = covariances[k] * cdf + wages[j] * wages[k] * (
+                shocks_covariance[j, k] * (1 - cdf)
+            )
+        mean = mean_j + shifted_mean
+        variance = max(shifted_second_moment - shifted_mean * shifted_mean, 0.0)
+
+    expected_value_functions[0] = mean
+
+
+@nb.guvectorize(
+    [
+        "f4[:], f4[:], f4[:], f4[:, :], f8[:], f4, f8[:]",
+        "f8[:], f8[:], f8[:], f8[:, :], f8[:], f8, f8[:]",
+    ],
+    "(n_choices), (n_choices), (n_choices), (n_draws, n_choices), (n_choices), () "
+    "-> ()",
+    nopython=True,
+    target="parallel",
+)
+def calculate_expected_value_functions_with_control_variate(
+    wages,
+    nonpecs,
+    continuation_values,
+    draws,
+    expected_shocks,
+    delta,
+    expected_value_functions,
+):
+    r"""Calculate the expected maximum of value functions with a control variate.
+
+    The function computes the same Monte Carlo integral as
+    :func:`calculate_expected_value_functions`, but reduces its variance with a control
+    variate (see 9.3 in [1]_). The control variate is the value function of the choice
+    which has the maximum value function at the expected shocks. The value function is
+    linear in the shock. Thus, the expected value of the control variate is known and
+    equal to the maximum over value functions at the expected shocks which is computed
+    by :func:`~respy.interpolate._compute_rhs_variables` for the interpolation.
+
+    The estimate is
+
+    .. math::
+
+        \hat{E}[\max_j V_j] = \bar{Y} - \hat{\beta} (\bar{X} - E[X])
+
+    where :math:`Y` is the maximum of value functions, :math:`X` the control variate,
+    and :math:`\hat{\beta}` the ratio of the sample covariance of :math:`Y` and
+    :math:`X` and the sample variance of :math:`X`. Both variables are centered at
+    :math:`E[X]` to avoid the cancellation of large numbers.
+
+    Parameters
+    ----------
+    wages : numpy.ndarray
+        Array with shape (n_choices,) containing wages.
+    nonpecs : numpy.ndarray
+        Array with shape (n_choices,) containing non-pecuniary rewards.
+    continuation_values : numpy.ndarray
+        Array with shape (n_choices,) containing expected maximum utility for each
+        choice in the subsequent period.
+    draws : numpy.ndarray
+        Array with shape (n_draws, n_choices).
+    expected_shocks : numpy.ndarray
+        Array with shape (n_choices,) containing the expected value of the shocks.
+    delta : float
+        The discount factor.
+
+    Returns
+    -------
+    expected_value_functions : float
+        Expected maximum utility of an agent.
+
+    References
+    ----------
+    .. [1] Glasserman, P. (2004). Monte Carlo Methods in Financial Engineering. *New
+           York: Springer Verlag New York.*
+
+    """
+    n_draws, n_choices = draws.shape
+
+    control_choice = 0
+    control_mean = -np.inf
+    for j in range(n_choices):
+        value_function, _ = aggregate_keane_wolpin_utility(
+            wages[j], nonpecs[j], continuation_values[j], expected_shocks[j], delta
+        )
+        if value_function > control_mean:
+            control_choice = j
+            control_mean = value_function
+
+    sum_y = 0.0
+    sum_x = 0.0
+    sum_xx = 0.0
+    sum_xy = 0.0
 
     for i in range(n_draws):
 
-        max_value_functions = 0
+        max_value_functions = 0.0
+        control_variate = 0.0
 
         for j in range(n_choices):
             value_function, _ = aggregate_keane_wolpin_utility(
@@ -500,9 +1181,23 @@ def calculate_expected_value_functions(
             if value_function > max_value_functions:
                 max_value_functions = value_function
 
-        expected_value_functions[0] += max_value_functions
+            if j == control_choice:
+                control_variate = value_function
+
+        y = max_value_functions - control_mean
+        x = control_variate - control_mean
+        sum_y += y
+        sum_x += x
+        sum_xx += x * x
+        sum_xy += x * y
 
-    expected_value_functions[0] /= n_draws
+    mean_y = sum_y / n_draws
+    mean_x = sum_x / n_draws
+    variance = sum_xx / n_draws - mean_x * mean_x
+    covariance = sum_xy / n_draws - mean_x * mean_y
+    beta = covariance / variance if variance > 0 else 0.0
+
+    expected_value_functions[0] = control_mean + mean_y - beta * mean_x
 
 
 def convert_dictionary_keys_to_dense_indices(dictionary):
@@ -617,7 +1312,6 @@ def map_observations_to_states(states, state_space, optim_paras):
     return dense_key, core_index
 
 
-@nb.njit
 def map_states_to_core_key_and_core_index(states, indexer):
     """Map states to the core key and core index.
 
@@ -625,8 +1319,8 @@ def map_states_to_core_key_and_core_index(states, indexer):
     ----------
     states : numpy.ndarray
         Multidimensional array containing only core dimensions of states.
-    indexer : numba.typed.Dict
-        A dictionary with core states as keys and the core key and core index as values.
+    indexer : StateIndexer
+        Maps core states to the core key and core index.
 
     Returns
     -------
@@ -636,51 +1330,604 @@ def map_states_to_core_key_and_core_index(states, indexer):
         An array containing the core index. See :ref:`core_indices`.
 
     """
-    n_states = states.shape[0]
-    core_key = np.zeros(n_states, dtype=np.int64)
-    core_index = np.zeros(n_states, dtype=np.int64)
-
-    for i in range(n_states):
-        core_key_, core_index_ = indexer[array_to_tuple(indexer, states[i])]
-        core_key[i] = core_key_
-        core_index[i] = core_index_
+    values = indexer.lookup(states)
+    core_key = values[:, 0]
+    core_index = values[:, 1]
 
     return core_key, core_index
 
 
-@nb.njit
 def _map_observations_to_dense_index(
     dense,
-    core_index,
+    core_key,
     dense_covariates_to_dense_index,
     core_key_and_dense_index_to_dense_key,
 ):
-    n_observations = dense.shape[0]
-    dense_key = np.zeros(n_observations, dtype=np.int64)
-
-    for i in range(n_observations):
-        dense_index = dense_covariates_to_dense_index[
-            array_to_tuple(dense_covariates_to_dense_index, dense[i])
-        ]
-        dense_key_ = core_key_and_dense_index_to_dense_key[(core_index[i], dense_index)]
-        dense_key[i] = dense_key_
+    dense_index = dense_covariates_to_dense_index.lookup(dense)
+    dense_key = core_key_and_dense_index_to_dense_key.lookup(
+        np.column_stack((core_key, dense_index))
+    )
 
     return dense_key
 
 
+class StateIndexer(Mapping):
+    """Map tuples of bounded integers to integer values.
+
+    Each dimension of a key is a bounded integer, e.g., the period, an experience or a
+    lagged choice. Shifting each dimension by its minimum turns a key into the digits of
+    a mixed-radix number, the code, with radices equal to the range of each dimension
+    (see :func:`numpy.ravel_multi_index`).
+
+    If the number of possible codes is small relative to the number of keys, the values
+    are stored in a lookup array indexed by the code. Otherwise, the codes are stored in
+    a compact open-addressing hash table with linear probing. If the codes cannot be
+    represented by 64-bit integers, the indexer falls back to a
+    :class:`numba.typed.Dict`.
+
+    The indexer behaves like a read-only dictionary with tuples as keys. Use
+    :meth:`lookup` to map many keys at once.
+
+    Parameters
+    ----------
+    keys : numpy.ndarray
+        Array with shape ``(n_keys, n_dimensions)`` containing unique keys.
+    values : numpy.ndarray
+        Array with shape ``(n_keys,)`` or ``(n_keys, n_values)`` containing non-negative
+        integers. If the array is one-dimensional, scalars are returned instead of
+        tuples.
+
+    Examples
+    --------
+    >>> indexer = StateIndexer(np.array([[0, 1], [1, 3]]), np.array([[0, 0], [1, 0]]))
+    >>> indexer[0, 1]
+    (0, 0)
+    >>> indexer.lookup(np.array([[1, 3], [0, 1]]))
+    array([[1, 0],
+           [0, 0]])
+    >>> (1, 1) in indexer
+    False
+
+    """
+
+    def __init__(self, keys, values):
+        keys = np.asarray(keys, dtype=np.int64)
+        values = np.asarray(values, dtype=np.int64)
+
+        self._is_scalar = values.ndim == 1
+        values = values.reshape(-1, 1) if self._is_scalar else values
+        self._n_values = values.shape[1]
+
+        self.n_dimensions = keys.shape[1]
+        self._n_keys = keys.shape[0]
+
+        if self._n_keys:
+            minimum = keys.min(axis=0)
+            radices = keys.max(axis=0) - minimum + 1
+        else:
+            minimum = np.zeros(self.n_dimensions, dtype=np.int64)
+            radices = np.ones(self.n_dimensions, dtype=np.int64)
+
+        # Compute the number of codes with Python integers which cannot overflow.
+        n_codes = 1
+        for radix in radices.tolist():
+            n_codes *= radix
+
+        self._minimum = minimum
+        self._radices = radices
+        self._typed_dict = None
+        self._shift = -1
+
+        if n_codes >= _MAX_N_CODES:
+            self._strides = np.zeros(self.n_dimensions, dtype=np.int64)
+            self._codes = np.zeros(0, dtype=np.int64)
+            self._values = np.zeros((0, values.shape[1]), dtype=np.int64)
+            self._typed_dict = _create_typed_dict(keys, values)
+
+        else:
+            self._strides = np.ones(self.n_dimensions, dtype=np.int64)
+            self._strides[:-1] = np.cumprod(radices[::-1])[::-1][1:]
+            codes = (keys - minimum).dot(self._strides)
+
+            if n_codes <= max(INDEXER_MIN_LOOKUP_SIZE, 4 * self._n_keys):
+                self._codes = np.zeros(0, dtype=np.int64)
+                self._values = np.full((n_codes, values.shape[1]), -1, dtype=np.int64)
+                self._values[codes] = values
+            else:
+                n_bits = max(int(np.ceil(np.log2(2 * self._n_keys))), 1)
+                self._shift = 64 - n_bits
+                self._codes = np.full(2 ** n_bits, -1, dtype=np.int64)
+                self._values = np.full((2 ** n_bits, values.shape[1]), -1, np.int64)
+                _insert_codes_into_hash_table(
+                    codes, values, self._shift, self._codes, self._values
+                )
+
+        # Python objects speed up single lookups via :meth:`__getitem__`.
+        self._bounds = list(zip(minimum.tolist(), radices.tolist()))
+        self._stride_list = self._strides.tolist()
+
+    def lookup(self, states):
+        """Map multiple keys to their values.
+
+        Parameters
+        ----------
+        states : numpy.ndarray
+            Array with shape ``(n_states, n_dimensions)``.
+
+        Returns
+        -------
+        values : numpy.ndarray
+            Array with shape ``(n_states,)`` or ``(n_states, n_values)``.
+
+        Raises
+        ------
+        KeyError
+            If a state is not stored in the indexer.
+
+        """
+        states = np.ascontiguousarray(states, dtype=np.int64).reshape(
+            -1, self.n_dimensions
+        )
+        if states.shape[0] == 0:
+            values = np.zeros((0, self._n_values), dtype=np.int64)
+        elif self._typed_dict is None:
+            values = _lookup_codes(
+                states,
+                self._minimum,
+                self._radices,
+                self._strides,
+                self._shift,
+                self._codes,
+                self._values,
+            )
+        else:
+            values = _lookup_typed_dict(states, self._typed_dict)
+
+        return values[:, 0] if self._is_scalar else values
+
+    def __getitem__(self, key):
+        if np.isscalar(key):
+            key = (key,)
+
+        if self._typed_dict is not None:
+            value = self._typed_dict[tuple(int(i) for i in key)]
+            return value[0] if self._is_scalar else value
+
+        if len(key) != self.n_dimensions:
+            raise KeyError(key)
+
+        code = 0
+        for digit, (minimum, radix), stride in zip(
+            key, self._bounds, self._stride_list
+        ):
+            digit = int(digit) - minimum
+            if not 0 <= digit < radix:
+                raise KeyError(key)
+            code += digit * stride
+
+        if self._shift == -1:
+            slot = code
+        else:
+            mask = len(self._codes) - 1
+            slot = ((code * _HASH_MULTIPLIER) & _UINT64_MASK) >> self._shift
+            while self._codes[slot] != code:
+                if self._codes[slot] == -1:
+                    raise KeyError(key)
+                slot = (slot + 1) & mask
+
+        value = self._values[slot].tolist()
+        if value[0] < 0:
+            raise KeyError(key)
+
+        return value[0] if self._is_scalar else tuple(value)
+
+    def __iter__(self):
+        if self._typed_dict is not None:
+            yield from self._typed_dict.keys()
+        else:
+            if self._shift == -1:
+                codes = np.flatnonzero(self._values[:, 0] >= 0)
+            else:
+                codes = self._codes[self._codes >= 0]
+            keys = codes.reshape(-1, 1) // self._strides % self._radices + self._minimum
+            yield from map(tuple, keys.tolist())
+
+    def __len__(self):
+        return self._n_keys
+
+    def __getstate__(self):
+        # A :class:`numba.typed.Dict` cannot be pickled. Store its items as arrays.
+        state = self.__dict__.copy()
+        if self._typed_dict is not None:
+            state["_typed_dict"] = (
+                np.array(list(self._typed_dict.keys()), dtype=np.int64),
+                np.array(list(self._typed_dict.values()), dtype=np.int64),
+            )
+        return state
+
+    def __setstate__(self, state):
+        if state["_typed_dict"] is not None:
+            state["_typed_dict"] = _create_typed_dict(*state["_typed_dict"])
+        self.__dict__.update(state)
+
+
+_MAX_N_CODES = 2 ** 62
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_UINT64_MASK = 2 ** 64 - 1
+# The same Fibonacci hashing multiplier for wrapping multiplications with int64.
+_HASH_MULTIPLIER_INT64 = _HASH_MULTIPLIER - 2 ** 64
+
+
+@nb.njit
+def _insert_codes_into_hash_table(codes, values, shift, table_codes, table_values):
+    """Insert codes and values into an open-addressing hash table."""
+    mask = table_codes.shape[0] - 1
+    for i in range(codes.shape[0]):
+        slot = ((codes[i] * _HASH_MULTIPLIER_INT64) >> shift) & mask
+        while table_codes[slot] != -1:
+            slot = (slot + 1) & mask
+        table_codes[slot] = codes[i]
+        table_values[slot] = values[i]
+
+
+@nb.njit
+def _lookup_codes(states, minimum, radices, strides, shift, table_codes, table_values):
+    """Look up the values of states in a lookup array or hash table."""
+    n_states, n_dimensions = states.shape
+    mask = table_codes.shape[0] - 1
+    values = np.empty((n_states, table_values.shape[1]), dtype=np.int64)
+
+    for i in range(n_states):
+        code = 0
+        for j in range(n_dimensions):
+            digit = states[i, j] - minimum[j]
+            if digit < 0 or digit >= radices[j]:
+                raise KeyError("State is not stored in the indexer.")
+            code += digit * strides[j]
+
+        if shift == -1:
+            slot = code
+        else:
+            slot = ((code * _HASH_MULTIPLIER_INT64) >> shift) & mask
+            while table_codes[slot] != code:
+                if table_codes[slot] == -1:
+                    raise KeyError("State is not stored in the indexer.")
+                slot = (slot + 1) & mask
+
+        if table_values[slot, 0] < 0:
+            raise KeyError("State is not stored in the indexer.")
+        values[i] = table_values[slot]
+
+    return values
+
+
+def _create_typed_dict(keys, values):
+    """Create a :class:`numba.typed.Dict` from keys and values."""
+    typed_dict = Dict.empty(
+        key_type=nb.types.UniTuple(nb.types.int64, keys.shape[1]),
+        value_type=nb.types.UniTuple(nb.types.int64, values.shape[1]),
+    )
+    for key, value in zip(keys.tolist(), values.tolist()):
+        typed_dict[tuple(key)] = tuple(value)
+
+    return typed_dict
+
+
+@nb.njit
+def _lookup_typed_dict(states, typed_dict):
+    """Look up the values of states in a :class:`numba.typed.Dict`."""
+    n_states = states.shape[0]
+    n_values = len(typed_dict[array_to_tuple(typed_dict, states[0])])
+    values = np.empty((n_states, n_values), dtype=np.int64)
+
+    for i in range(n_states):
+        value = typed_dict[array_to_tuple(typed_dict, states[i])]
+        for j in range(n_values):
+            values[i, j] = value[j]
+
+    return values
+
+
+class DenseKeyStore(dict):
+    """Arrays of dense keys stored in one contiguous buffer per period.
+
+    Attributes of the state space like wages, non-pecuniary rewards or expected value
+    functions consist of one array per dense key. Instead of allocating each array
+    separately, the arrays of all dense keys in one period are stored in a flat buffer
+    and an offset table locates the array of each dense key in its buffer. Dense keys
+    may share the same location, e.g., the child indices of dense keys with the same
+    core key.
+
+    The store is a dictionary which maps dense keys to views on the buffers such that
+    it can be used wherever a dictionary of arrays is expected. Modifying a view
+    modifies the buffer. :meth:`get_period` returns the store of a single period
+    without copying or scanning the dense keys.
+
+    Parameters
+    ----------
+    buffers : dict
+        Maps periods to one-dimensional arrays.
+    locations : dict
+        Maps dense keys to a tuple of the period, the offset of the array in the buffer
+        of the period and the shape of the array.
+
+    Examples
+    --------
+    >>> store = DenseKeyStore.from_arrays(
+    ...     {0: np.zeros((2, 2)), 1: np.ones(3), 2: np.full(2, 2.0)}, {0: 0, 1: 0, 2: 1}
+    ... )
+    >>> store[1]
+    array([1., 1., 1.])
+    >>> store.buffers[0]
+    array([0., 0., 0., 0., 1., 1., 1.])
+    >>> store.get_period(1)
+    {2: array([2., 2.])}
+
+    """
+
+    def __init__(self, buffers, locations):
+        super().__init__(
+            (key, buffers[period][offset : offset + _prod(shape)].reshape(shape))
+            for key, (period, offset, shape) in locations.items()
+        )
+        self.buffers = buffers
+        self.locations = locations
+        self._period_to_store = None
+
+    @classmethod
+    def from_arrays(cls, arrays, dense_key_to_period, dtype=None):
+        """Copy a dictionary of arrays into a store.
+
+        Parameters
+        ----------
+        arrays : dict
+            Maps dense keys to arrays which have the same dtype or can be cast safely to
+            a common dtype.
+        dense_key_to_period : dict
+            Maps dense keys to periods.
+        dtype : numpy.dtype, optional
+            The dtype of the buffers. By default, the common dtype of the arrays.
+
+        """
+        if dtype is None:
+            dtype = np.result_type(*arrays.values()) if arrays else np.float64
+        locations, pointer_to_location, sizes = _create_locations_of_arrays(
+            arrays, dense_key_to_period
+        )
+
+        buffers = {
+            period: np.empty(size, dtype=dtype) for period, size in sizes.items()
+        }
+        for location, array in pointer_to_location.values():
+            period, offset, shape = location
+            buffers[period][offset : offset + array.size] = array.ravel()
+
+        return cls(buffers, locations)
+
+    @classmethod
+    def zeros(cls, shapes, dense_key_to_period, dtype=np.float64):
+        """Create a store with arrays of zeros.
+
+        Parameters
+        ----------
+        shapes : dict
+            Maps dense keys to the shapes of arrays.
+        dense_key_to_period : dict
+            Maps dense keys to periods.
+        dtype : numpy.dtype
+
+        """
+        locations = {}
+        sizes = {}
+        for key, shape in shapes.items():
+            period = dense_key_to_period[key]
+            offset = sizes.get(period, 0)
+            locations[key] = (period, offset, tuple(shape))
+            sizes[period] = offset + _prod(shape)
+
+        buffers = {
+            period: np.zeros(size, dtype=dtype) for period, size in sizes.items()
+        }
+
+        return cls(buffers, locations)
+
+    def get_period(self, period):
+        """Get the store of all dense keys in a period.
+
+        The stores of all periods are created once and share the buffers with this
+        store.
+
+        """
+        if self._period_to_store is None:
+            period_to_locations = {period: {} for period in self.buffers}
+            for key, location in self.locations.items():
+                period_to_locations[location[0]][key] = location
+            self._period_to_store = {
+                period: DenseKeyStore({period: self.buffers[period]}, locations)
+                for period, locations in period_to_locations.items()
+            }
+
+        if period in self._period_to_store:
+            store = self._period_to_store[period]
+        else:
+            store = DenseKeyStore({}, {})
+
+        return store
+
+    def __reduce__(self):
+        """Pickle the buffers and offsets instead of the views."""
+        return (DenseKeyStore, (self.buffers, self.locations))
+
+
+def _create_locations_of_arrays(arrays, dense_key_to_period):
+    """Create the locations of arrays in the buffers of their periods.
+
+    Arrays which are views on the same memory, e.g., the same array shared by multiple
+    dense keys, are stored only once.
+
+    """
+    locations = {}
+    pointer_to_location = {}
+    sizes = {}
+    for key, array in arrays.items():
+        array = np.asarray(array)
+        pointer = (
+            array.__array_interface__["data"][0],
+            array.shape,
+            array.strides,
+            array.dtype.str,
+        )
+        if pointer not in pointer_to_location:
+            period = dense_key_to_period[key]
+            offset = sizes.get(period, 0)
+            pointer_to_location[pointer] = ((period, offset, array.shape), array)
+            sizes[period] = offset + array.size
+
+        locations[key] = pointer_to_location[pointer][0]
+
+    return locations, pointer_to_location, sizes
+
+
+def _prod(shape):
+    """Compute the number of elements of an array with the given shape."""
+    size = 1
+    for length in shape:
+        size *= length
+
+    return size
+
+
 def dump_objects(objects, topic, complex_, options):
-    """Dump states."""
+    """Dump states.
+
+    With the ``"parquet"`` backend, every object is written to its own file. With the
+    ``"memory"`` and ``"mmap"`` backends, states are written to temporary files which
+    are merged into a single state store by :func:`consolidate_objects`. Other topics
+    like transition probabilities are kept in memory.
+
+    """
     file_name = _create_file_name_from_complex_index(topic, complex_)
-    objects.to_parquet(
-        options["cache_path"] / file_name, compression=options["cache_compression"],
-    )
+
+    if options["cache_backend"] == "parquet":
+        objects.to_parquet(
+            options["state_space_path"] / file_name,
+            compression=options["cache_compression"],
+        )
+    elif topic == "states":
+        np.save(
+            options["state_space_path"] / f"_{file_name}.npy",
+            _convert_dataframe_to_structured_array(objects),
+        )
+    else:
+        _OBJECTS_IN_MEMORY.setdefault(str(options["state_space_path"]), {})[
+            file_name
+        ] = objects
 
 
 def load_objects(topic, complex_, options):
     """Load states."""
     file_name = _create_file_name_from_complex_index(topic, complex_)
-    directory = options["cache_path"]
-    return pd.read_parquet(directory / file_name)
+    directory = options["state_space_path"]
+
+    if options["cache_backend"] == "parquet":
+        out = pd.read_parquet(directory / file_name)
+    elif topic == "states":
+        array, offsets = _load_state_store(topic, options)
+        start, stop = offsets[file_name]
+        out = pd.DataFrame(array[start:stop]).set_index("_index")
+        out.index.name = None
+    else:
+        out = _OBJECTS_IN_MEMORY[str(directory)][file_name]
+
+    return out
+
+
+def consolidate_objects(topic, options):
+    """Merge the objects of a topic into a single state store.
+
+    The state store is a structured array which contains the objects of all complex
+    indices in one contiguous block and an offset table which maps file names of complex
+    indices to the rows of the objects. The array is written with
+    :func:`numpy.lib.format.open_memmap` such that only one object has to be held in
+    memory at a time.
+
+    """
+    if options["cache_backend"] == "parquet":
+        return
+
+    directory = options["state_space_path"]
+    paths = sorted(directory.glob(f"_{topic}_*.npy"))
+    arrays = [np.load(path, mmap_mode="r") for path in paths]
+
+    names = arrays[0].dtype.names
+    dtype = [
+        (name, np.result_type(*[array.dtype[name] for array in arrays]))
+        for name in names
+    ]
+    n_rows = sum(len(array) for array in arrays)
+
+    store = np.lib.format.open_memmap(
+        directory / f"{topic}.npy", mode="w+", dtype=dtype, shape=(n_rows,)
+    )
+    offsets = {}
+    start = 0
+    for path, array in zip(paths, arrays):
+        stop = start + len(array)
+        store[start:stop] = array
+        offsets[path.name[1:-4]] = (start, stop)
+        start = stop
+
+    store.flush()
+    del store, arrays
+
+    with open(directory / f"{topic}_offsets.pickle", "wb") as file:
+        pickle.dump(offsets, file)
+
+    for path in paths:
+        path.unlink()
+
+
+def _load_state_store(topic, options):
+    """Load a state store and its offset table.
+
+    State stores are loaded once per process. The most recently used stores are kept
+    and with the ``"mmap"`` backend, the array is memory-mapped instead of being read
+    into memory.
+
+    """
+    directory = options["state_space_path"]
+    key = (str(directory), topic, options["cache_backend"])
+
+    if key in _STATE_STORES:
+        _STATE_STORES.move_to_end(key)
+    else:
+        mmap_mode = "r" if options["cache_backend"] == "mmap" else None
+        array = np.load(directory / f"{topic}.npy", mmap_mode=mmap_mode)
+        with open(directory / f"{topic}_offsets.pickle", "rb") as file:
+            offsets = pickle.load(file)
+
+        _STATE_STORES[key] = (array, offsets)
+        if len(_STATE_STORES) > MAX_N_STATE_STORES:
+            _STATE_STORES.popitem(last=False)
+
+    return _STATE_STORES[key]
+
+
+def _convert_dataframe_to_structured_array(df):
+    """Convert a DataFrame with numeric columns to a structured array.
+
+    The index is stored in the field ``"_index"``.
+
+    """
+    dtype = [("_index", df.index.dtype)] + [
+        (str(column), df[column].dtype) for column in df.columns
+    ]
+    array = np.empty(len(df), dtype=dtype)
+    array["_index"] = df.index
+    for column in df.columns:
+        array[str(column)] = df[column].to_numpy()
+
+    return array
 
 
 def _create_file_name_from_complex_index(topic, complex_):
@@ -702,7 +1949,10 @@ def prepare_cache_directory(options):
     The directory contains the parts of the state space.
 
     """
-    directory = options["cache_path"]
+    directory = options["state_space_path"]
+
+    # Memory-mapped files cannot be deleted on Windows.
+    release_cache_directory(directory)
     if directory.exists():
         shutil.rmtree(directory)
 
@@ -711,6 +1961,13 @@ def prepare_cache_directory(options):
     return directory
 
 
+def release_cache_directory(directory):
+    """Release the objects and state stores of a cache directory kept in memory."""
+    _OBJECTS_IN_MEMORY.pop(str(directory), None)
+    for key in [key for key in _STATE_STORES if key[0] == str(directory)]:
+        del _STATE_STORES[key]
+
+
 def select_valid_choices(choices, choice_set):
     """Select valid choices.
 
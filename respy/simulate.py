@@ -10,6 +10,7 @@ from respy.config import DTYPE_STATES
 from respy.parallelization import parallelize_across_dense_dimensions
 from respy.parallelization import split_and_combine_df
 from respy.pre_processing.model_processing import process_params_and_options
+from respy.pre_processing.model_processing import process_params_with_plan
 from respy.shared import apply_law_of_motion_for_core
 from respy.shared import calculate_value_functions_and_flow_utilities
 from respy.shared import compute_covariates
@@ -80,6 +81,7 @@ def get_simulate_func(
     df = _process_input_df_for_simulation(df, method, options, optim_paras)
 
     solve = get_solve_func(params, options)
+    parameter_plan = solve.keywords["parameter_plan"]
 
     # We draw shocks for all observations and for all choices although some choices
     # might not be available. Later, only the relevant shocks are selected.
@@ -106,6 +108,7 @@ def get_simulate_func(
         n_simulation_periods=n_simulation_periods,
         solve=solve,
         options=options,
+        parameter_plan=parameter_plan,
     )
 
     return simulate_function
@@ -120,6 +123,7 @@ def simulate(
     n_simulation_periods,
     solve,
     options,
+    parameter_plan=None,
 ):
     """Perform a simulation.
 
@@ -168,6 +172,9 @@ def simulate(
         Function which creates the solution of the model with new parameters.
     options : dict
         Contains model options.
+    parameter_plan : dict, optional
+        Plan to process the parameters created by
+        :func:`~respy.pre_processing.model_processing.create_parameter_plan`.
 
     Returns
     -------
@@ -179,7 +186,7 @@ def simulate(
     df = df.copy()
     is_n_step_ahead = method != "one_step_ahead"
 
-    optim_paras, options = process_params_and_options(params, options)
+    optim_paras, options = process_params_with_plan(params, options, parameter_plan)
     state_space = solve(params)
     # Prepare simulation.
     df = _extend_data_with_sampled_characteristics(df, optim_paras, options)
@@ -206,6 +213,9 @@ def simulate(
             current_df, state_space, optim_paras
         )
 
+        if optim_paras["exogenous_processes"]:
+            current_df["draw_dense_key_next_period"] = np.random.rand(len(current_df))
+
         wages = state_space.get_attribute_from_period("wages", period)
         nonpecs = state_space.get_attribute_from_period("nonpecs", period)
         index_to_complex = state_space.get_attribute_from_period(
@@ -449,18 +459,28 @@ def _simulate_single_period(
     # Check if there is an exogenous process
     if optim_paras["exogenous_processes"]:
         df["dense_key_next_period"] = draw_dense_key_next_period(
-            complex_tuple, df["core_index"], options
+            complex_tuple,
+            df["core_index"],
+            df.pop("draw_dense_key_next_period").to_numpy(),
+            options,
         )
     return df
 
 
-def draw_dense_key_next_period(complex_tuple, core_index, options):
+def draw_dense_key_next_period(complex_tuple, core_index, draws, options):
     """For exogenous processes draw the dense key for next period.
 
+    The dense keys are drawn by inverting the cumulative transition probabilities with
+    uniform draws which are created before the periods are simulated across dense keys.
+    Thus, the simulation does not depend on the order or the process in which the dense
+    keys are simulated.
+
     Parameters
     ----------
     complex_tuple
     core_index
+    draws : numpy.ndarray
+        Uniform draws with one draw per individual.
     options
 
     Returns
@@ -469,16 +489,17 @@ def draw_dense_key_next_period(complex_tuple, core_index, options):
         A pandas Series containing the dense keys in the next period for all keys.
 
     """
-    dense_key_next_period = core_index.copy(deep=True)
     transition_mat = load_objects("transition", complex_tuple, options)
-    core_index_counts = core_index.value_counts()
-    for index, count in core_index_counts.items():
-        draws = np.random.choice(
-            transition_mat.columns.values,
-            size=count,
-            p=transition_mat.iloc[index].to_numpy(),
-        )
-        dense_key_next_period.loc[core_index == index] = draws.astype(int)
+    cumulative_probabilities = transition_mat.to_numpy().cumsum(axis=1)[
+        core_index.to_numpy()
+    ]
+    positions = (cumulative_probabilities < draws.reshape(-1, 1)).sum(axis=1)
+    positions = np.minimum(positions, transition_mat.shape[1] - 1)
+
+    dense_key_next_period = pd.Series(
+        transition_mat.columns.values[positions].astype(int), index=core_index.index
+    )
+
     return dense_key_next_period
 
 
@@ -1,20 +1,41 @@
 """Everything related to the solution of a structural model."""
 import functools
+import hashlib
+import pickle
+from collections import OrderedDict
 
+import numba as nb
 import numpy as np
+import pandas as pd
 
 from respy.exogenous_processes import compute_transition_probabilities
+from respy.interpolate import _compute_covariance_of_shocks
+from respy.interpolate import _compute_expected_shocks
 from respy.interpolate import kw_94_interpolation
 from respy.parallelization import parallelize_across_dense_dimensions
+from respy.pre_processing.model_processing import _read_params
+from respy.pre_processing.model_processing import create_parameter_plan
 from respy.pre_processing.model_processing import process_params_and_options
+from respy.pre_processing.model_processing import process_params_with_plan
+from respy.shared import DenseKeyStore
+from respy.shared import aggregate_keane_wolpin_utility
 from respy.shared import calculate_expected_value_functions
+from respy.shared import calculate_expected_value_functions_adaptively
+from respy.shared import calculate_expected_value_functions_with_clark
+from respy.shared import calculate_expected_value_functions_with_control_variate
+from respy.shared import calculate_weighted_expected_value_functions
 from respy.shared import dump_objects
 from respy.shared import load_objects
-from respy.shared import pandas_dot
-from respy.shared import select_valid_choices
 from respy.shared import transform_base_draws_with_cholesky_factor
 from respy.state_space import create_state_space_class
 
+_SOLUTIONS = OrderedDict()
+"""collections.OrderedDict : Solutions cached in this process."""
+_SOLUTION_IRRELEVANT_CATEGORIES = (
+    r"^(initial_exp_|lagged_choice_|observable_|type_[0-9]+$|meas_error$)"
+)
+"""str : Regex of parameter categories which do not affect the solution."""
+
 
 def get_solve_func(params, options):
     """Get the solve function.
@@ -42,49 +63,175 @@ def get_solve_func(params, options):
     >>> solve = rp.get_solve_func(params, options)
     >>> state_space = solve(params)
 
+    If ``options["solution_cache_size"]`` is positive, the solutions of the most
+    recently used parameters are kept in memory and returned without solving the model
+    again. The cache is shared by all functions built from models with the same state
+    space, e.g., the simulation and likelihood functions of one model. Parameters
+    which only affect the simulation or the likelihood, like measurement errors or
+    type probabilities, do not invalidate a cached solution.
+
     """
     optim_paras, options = process_params_and_options(params, options)
 
     state_space = create_state_space_class(optim_paras, options)
-    solve_function = functools.partial(solve, options=options, state_space=state_space)
+    parameter_plan = create_parameter_plan(params, options)
+    solve_function = functools.partial(
+        solve, options=options, state_space=state_space, parameter_plan=parameter_plan
+    )
 
     return solve_function
 
 
-def solve(params, options, state_space):
-    """Solve the model."""
-    optim_paras, options = process_params_and_options(params, options)
+def solve(params, options, state_space, parameter_plan=None):
+    """Solve the model.
+
+    If a plan from :func:`~respy.pre_processing.model_processing.create_parameter_plan`
+    is passed, the new parameters are inserted into the parsed model instead of
+    processing the parameters and options from scratch.
+
+    """
+    optim_paras, options = process_params_with_plan(params, options, parameter_plan)
+
+    # Continuation values of the previous solution are invalid for the new parameters.
+    state_space.clear_continuation_values()
+
+    key = _create_solution_key(params, optim_paras, options)
+    if key in _SOLUTIONS:
+        _SOLUTIONS.move_to_end(key)
+        return _restore_solution(state_space, _SOLUTIONS[key])
 
     transit_keys = None
     if hasattr(state_space, "dense_key_to_transit_keys"):
         transit_keys = state_space.dense_key_to_transit_keys
 
+    reward_coefficients = _create_reward_coefficients(optim_paras, options)
+    core_rewards = _create_core_rewards(
+        state_space.reward_covariates_core,
+        parallel=options["parallel"],
+        bypass={"reward_coefficients": reward_coefficients["core"]},
+    )
+
     wages, nonpecs = _create_param_specific_objects(
         state_space.dense_key_to_complex,
         state_space.dense_key_to_choice_set,
+        state_space.dense_key_to_core_key,
+        state_space.reward_covariates_dense,
+        state_space.reward_covariates_mixed,
         optim_paras,
         options,
         transit_keys=transit_keys,
         bypass={
-            "dense_key_to_dense_covariates": state_space.dense_key_to_dense_covariates
+            "dense_key_to_dense_covariates": state_space.dense_key_to_dense_covariates,
+            "core_rewards": core_rewards,
+            "reward_coefficients": reward_coefficients,
         },
     )
 
-    state_space.wages = wages
-    state_space.nonpecs = nonpecs
+    dense_key_to_period = state_space.dense_key_to_period
+    dtype = options["precision"]
+    state_space.wages = DenseKeyStore.from_arrays(wages, dense_key_to_period, dtype)
+    state_space.nonpecs = DenseKeyStore.from_arrays(nonpecs, dense_key_to_period, dtype)
 
     state_space = _solve_with_backward_induction(state_space, optim_paras, options)
 
+    if key is not None:
+        _store_solution(key, state_space, options)
+
     return state_space
 
 
+def _create_solution_key(params, optim_paras, options):
+    """Create the key of a solution in the cache.
+
+    The key consists of the directory of the state space, which identifies the
+    structure of the model and the draws, options which affect the solution, and a hash
+    of all parameters except those which do not affect the solution.
+
+    Models with exogenous processes store transition probabilities outside of the state
+    space and interpolated models advance the seed of the interpolation points with
+    every solution. Both are not cached and the key is ``None``.
+
+    """
+    if (
+        options["solution_cache_size"] == 0
+        or optim_paras["exogenous_processes"]
+        or options["interpolation_points"] != -1
+    ):
+        key = None
+    else:
+        params = _read_params(params)
+        categories = params.index.get_level_values("category")
+        params = params[~categories.str.match(_SOLUTION_IRRELEVANT_CATEGORIES)]
+        params_hash = hashlib.sha256(
+            pickle.dumps((params.index.tolist(), params.to_numpy(dtype=float)))
+        ).hexdigest()
+
+        key = (
+            str(options["state_space_path"]),
+            options["precision"],
+            options["solution_control_variate"],
+            options["solution_adaptive_tolerance"],
+            options["solution_adaptive_block_size"],
+            params_hash,
+        )
+
+    return key
+
+
+def _store_solution(key, state_space, options):
+    """Store copies of the solution in the cache and evict the least recently used."""
+    statistics = state_space.__dict__.get("adaptive_draws_statistics")
+    _SOLUTIONS[key] = {
+        "wages": _copy_dense_key_store(state_space.wages),
+        "nonpecs": _copy_dense_key_store(state_space.nonpecs),
+        "expected_value_functions": _copy_dense_key_store(
+            state_space.expected_value_functions
+        ),
+        "adaptive_draws_statistics": None if statistics is None else statistics.copy(),
+    }
+    while len(_SOLUTIONS) > options["solution_cache_size"]:
+        _SOLUTIONS.popitem(last=False)
+
+
+def _restore_solution(state_space, solution):
+    """Restore a cached solution in the state space.
+
+    The expected value functions are copied into the existing buffers because the
+    continuation values are views on them.
+
+    """
+    state_space.wages = _copy_dense_key_store(solution["wages"])
+    state_space.nonpecs = _copy_dense_key_store(solution["nonpecs"])
+    for period, buffer in solution["expected_value_functions"].buffers.items():
+        state_space.expected_value_functions.buffers[period][:] = buffer
+
+    statistics = solution["adaptive_draws_statistics"]
+    state_space.adaptive_draws_statistics = (
+        None if statistics is None else statistics.copy()
+    )
+
+    return state_space
+
+
+def _copy_dense_key_store(store):
+    """Copy the buffers of a store."""
+    buffers = {period: buffer.copy() for period, buffer in store.buffers.items()}
+
+    return DenseKeyStore(buffers, store.locations)
+
+
 @parallelize_across_dense_dimensions
 def _create_param_specific_objects(
     complex_,
     choice_set,
+    core_key,
+    reward_covariates_dense,
+    reward_covariates_mixed,
     optim_paras,
     options,
     dense_key_to_dense_covariates,
+    core_rewards,
+    reward_coefficients,
     transit_keys=None,
 ):
     """Create param specific objects.
@@ -96,10 +243,16 @@ def _create_param_specific_objects(
     on disk directly!
     For objects that we store on disk we will just return the prefix of the location.
     """
-    states = load_objects("states", complex_, options)
-    wages, nonpecs = _create_choice_rewards(states, choice_set, optim_paras)
+    wages, nonpecs = _create_choice_rewards(
+        core_rewards[core_key],
+        reward_covariates_dense,
+        reward_covariates_mixed,
+        choice_set,
+        reward_coefficients,
+    )
 
     if optim_paras["exogenous_processes"]:
+        states = load_objects("states", complex_, options)
         transition_probabilities = compute_transition_probabilities(
             states, transit_keys, optim_paras, dense_key_to_dense_covariates
         )
@@ -108,23 +261,74 @@ def _create_param_specific_objects(
     return wages, nonpecs
 
 
-def _create_choice_rewards(states, choice_set, optim_paras):
-    """Create wage and non-pecuniary reward for each state and choice."""
-    n_choices = sum(choice_set)
-    choices = select_valid_choices(optim_paras["choices"], choice_set)
+def _create_reward_coefficients(optim_paras, options):
+    """Pack the coefficients of wages and non-pecuniary rewards into matrices.
 
-    n_states = states.shape[0]
+    Returns
+    -------
+    reward_coefficients : dict of numpy.ndarray
+        For each group of covariates in ``options["covariates_rewards"]``, an array with
+        shape ``(n_covariates, 2 * n_choices)``. The rows follow the covariates of the
+        group. The first ``n_choices`` columns contain the coefficients of log wages and
+        the remaining columns the coefficients of non-pecuniary rewards. Coefficients of
+        missing parameters are zero.
 
-    wages = np.ones((n_states, n_choices))
-    nonpecs = np.zeros((n_states, n_choices))
+    """
+    choices = list(optim_paras["choices"])
+    n_choices = len(choices)
+
+    reward_coefficients = {}
+    for group, covariates in options["covariates_rewards"].items():
+        coefficients = np.zeros((len(covariates), 2 * n_choices))
+        for i, choice in enumerate(choices):
+            for j, category in enumerate([f"wage_{choice}", f"nonpec_{choice}"]):
+                if category in optim_paras:
+                    params = optim_paras[category]
+                    params = params[params.index.isin(covariates)]
+                    rows = [covariates.index(covariate) for covariate in params.index]
+                    coefficients[rows, i + j * n_choices] = params.to_numpy()
+
+        reward_coefficients[group] = coefficients
+
+    return reward_coefficients
+
+
+@parallelize_across_dense_dimensions
+def _create_core_rewards(reward_covariates_core, reward_coefficients):
+    """Create the part of the rewards of all choices which stems from core covariates.
+
+    The part is computed once per core key and shared by all dense vectors.
+
+    """
+    return reward_covariates_core @ reward_coefficients
+
+
+def _create_choice_rewards(
+    core_rewards,
+    reward_covariates_dense,
+    reward_covariates_mixed,
+    choice_set,
+    reward_coefficients,
+):
+    """Create wage and non-pecuniary reward for each state and choice.
+
+    The rewards are the sum of the rewards from core covariates, a shift due to the
+    dense covariates and, if the model has them, the rewards from mixed covariates.
+    Choices without wage parameters have a log wage of zero and, thus, a wage of one.
+
+    """
+    n_choices = sum(choice_set)
+    is_available = np.tile(np.array(choice_set, dtype=np.bool_), 2)
 
-    for i, choice in enumerate(choices):
-        if f"wage_{choice}" in optim_paras:
-            log_wage = pandas_dot(states, optim_paras[f"wage_{choice}"])
-            wages[:, i] = np.exp(log_wage)
+    rewards = core_rewards[:, is_available]
+    rewards += reward_covariates_dense @ reward_coefficients["dense"][:, is_available]
+    if reward_covariates_mixed.shape[1] > 0:
+        rewards += (
+            reward_covariates_mixed @ reward_coefficients["mixed"][:, is_available]
+        )
 
-        if f"nonpec_{choice}" in optim_paras:
-            nonpecs[:, i] = pandas_dot(states, optim_paras[f"nonpec_{choice}"])
+    wages = np.exp(rewards[:, :n_choices])
+    nonpecs = rewards[:, n_choices:]
 
     return wages, nonpecs
 
@@ -138,6 +342,19 @@ def _solve_with_backward_induction(state_space, optim_paras, options):
     2. If there are more states in the period than interpolation points.
     3. If there are at least two interpolation points per `dense_index`.
 
+    If ``options["solution_engine"]`` is ``"horizon"`` and no period is interpolated,
+    the whole backward induction is performed by :func:`_solve_whole_horizon`. Models
+    with exogenous processes or myopic agents and solutions with a control variate, a
+    quadrature rule, the closed-form approximation or adaptive numbers of draws are
+    always solved period by period.
+
+    If ``options["solution_adaptive_tolerance"]`` is set, the Monte Carlo integration
+    of periods which are not interpolated stops for each state once the relative
+    standard error of the expected value function is below the tolerance (see
+    :func:`~respy.shared.calculate_expected_value_functions_adaptively`). Statistics on
+    the number of draws used per period are stored in
+    ``state_space.adaptive_draws_statistics``.
+
     Parameters
     ----------
     state_space : :class:`~respy.state_space.StateSpace`
@@ -154,76 +371,410 @@ def _solve_with_backward_induction(state_space, optim_paras, options):
     """
     n_periods = options["n_periods"]
 
-    # Can we move that up to the other function? Then we have everything at one point
-    # that is params specific?
-    draws_emax_risk = transform_base_draws_with_cholesky_factor(
-        state_space.base_draws_sol,
-        state_space.dense_key_to_choice_set,
-        optim_paras["shocks_cholesky"],
-        optim_paras,
+    # The closed-form approximation of Clark (1961) does not need draws.
+    draws_emax_risk = (
+        None
+        if options["solution_integration"] == "clark"
+        else _transform_base_draws_of_solution(state_space, optim_paras, options)
     )
 
+    is_interpolated = [
+        _is_period_interpolated(state_space, period, options)
+        for period in range(n_periods)
+    ]
+    if (
+        options["solution_engine"] == "horizon"
+        and not any(is_interpolated)
+        and not optim_paras["exogenous_processes"]
+        and optim_paras["delta"] != 0
+        and not options["solution_control_variate"]
+        and options["solution_integration"] == "monte_carlo"
+        and options["solution_adaptive_tolerance"] is None
+    ):
+        _solve_whole_horizon(state_space, draws_emax_risk, optim_paras)
+        return state_space
+
+    is_adaptive = options["solution_adaptive_tolerance"] is not None
+    period_to_n_draws = {}
+
     for period in reversed(range(n_periods)):
         dense_keys_in_period = state_space.get_dense_keys_from_period(period)
 
-        period_draws_emax_risk = {
-            dense_index: draws_emax_risk[dense_index]
-            for dense_index in dense_keys_in_period
-        }
-
-        n_states_in_period = sum(
-            len(state_space.dense_key_to_core_indices[dense_index])
-            for dense_index in dense_keys_in_period
-        )
-
-        # See docstring for note on interpolation.
-        any_interpolated = options[
-            "interpolation_points"
-        ] < n_states_in_period and options["interpolation_points"] >= 2 * len(
-            dense_keys_in_period
+        period_draws_emax_risk = (
+            None
+            if draws_emax_risk is None
+            else {
+                dense_index: draws_emax_risk[dense_index]
+                for dense_index in dense_keys_in_period
+            }
         )
 
         # Handle myopic individuals. Check interpolation!
         if optim_paras["delta"] == 0:
             period_expected_value_functions = {k: 0 for k in dense_keys_in_period}
 
-        elif any_interpolated:
+        elif is_interpolated[period]:
             period_expected_value_functions = kw_94_interpolation(
                 state_space, period_draws_emax_risk, period, optim_paras, options,
             )
 
+        elif is_adaptive:
+            (
+                period_expected_value_functions,
+                period_to_n_draws[period],
+            ) = _full_solution_with_adaptive_draws(
+                state_space.get_attribute_from_period("wages", period),
+                state_space.get_attribute_from_period("nonpecs", period),
+                state_space.get_continuation_values(period),
+                period_draws_emax_risk,
+                optim_paras,
+                options["solution_adaptive_tolerance"],
+                options["solution_adaptive_block_size"],
+                parallel=options["parallel"],
+            )
+
         else:
 
             wages = state_space.get_attribute_from_period("wages", period)
             nonpecs = state_space.get_attribute_from_period("nonpecs", period)
             continuation_values = state_space.get_continuation_values(period)
+            dense_key_to_choice_set_in_period = {
+                key: state_space.dense_key_to_choice_set[key] for key in wages
+            }
+            period_expected_shocks = (
+                _compute_expected_shocks(dense_key_to_choice_set_in_period, optim_paras)
+                if options["solution_control_variate"]
+                or options["solution_integration"] == "clark"
+                else None
+            )
+            period_shocks_covariance = (
+                _compute_covariance_of_shocks(
+                    dense_key_to_choice_set_in_period, optim_paras
+                )
+                if options["solution_integration"] == "clark"
+                else None
+            )
+            period_weights = (
+                None
+                if state_space.base_weights_sol is None
+                else state_space.get_attribute_from_period("base_weights_sol", period)
+            )
             period_expected_value_functions = _full_solution(
-                wages, nonpecs, continuation_values, period_draws_emax_risk, optim_paras
+                wages,
+                nonpecs,
+                continuation_values,
+                period_draws_emax_risk,
+                period_expected_shocks,
+                period_shocks_covariance,
+                period_weights,
+                optim_paras,
+                parallel=options["parallel"],
             )
 
         state_space.set_attribute_from_keys(
             "expected_value_functions", period_expected_value_functions
         )
 
+    state_space.adaptive_draws_statistics = (
+        _compute_adaptive_draws_statistics(period_to_n_draws, options)
+        if is_adaptive
+        else None
+    )
+
     return state_space
 
 
-@parallelize_across_dense_dimensions
+def _compute_adaptive_draws_statistics(period_to_n_draws, options):
+    """Compute statistics on the number of draws used per state in each period.
+
+    Returns
+    -------
+    statistics : pandas.DataFrame
+        The index contains the periods solved with adaptive numbers of draws and the
+        columns the number of states, the mean, minimum and maximum number of draws
+        per state, and the share of states which used all draws.
+
+    """
+    statistics = {}
+    for period, dense_key_to_n_draws in sorted(period_to_n_draws.items()):
+        n_draws = np.concatenate(list(dense_key_to_n_draws.values()))
+        statistics[period] = {
+            "n_states": n_draws.shape[0],
+            "mean_draws": n_draws.mean(),
+            "min_draws": n_draws.min(),
+            "max_draws": n_draws.max(),
+            "share_of_states_at_cap": (n_draws == options["solution_draws"]).mean(),
+        }
+
+    statistics = pd.DataFrame.from_dict(statistics, orient="index")
+    statistics.index.name = "period"
+
+    return statistics
+
+
+def _is_period_interpolated(state_space, period, options):
+    """Check whether the expected value functions of a period are interpolated.
+
+    See :func:`_solve_with_backward_induction` for the conditions.
+
+    """
+    dense_keys_in_period = state_space.get_dense_keys_from_period(period)
+    n_states_in_period = sum(
+        len(state_space.dense_key_to_core_indices[dense_index])
+        for dense_index in dense_keys_in_period
+    )
+
+    return options["interpolation_points"] < n_states_in_period and options[
+        "interpolation_points"
+    ] >= 2 * len(dense_keys_in_period)
+
+
+def _transform_base_draws_of_solution(state_space, optim_paras, options):
+    """Transform the base draws of the solution once per period and choice set.
+
+    All dense keys with the same period and number of choices receive the same base
+    draws (see :meth:`~respy.state_space.StateSpace.create_draws`) which are stored once
+    in :attr:`~respy.state_space.StateSpace.base_draws_sol`. The transformation only
+    depends on the draws and the choice set. Thus, the draws are transformed for one
+    dense key per period and choice set and the result is shared by reference with all
+    other dense keys of the group. The transformed draws are stored with the precision
+    of ``options["precision"]``.
+
+    Returns
+    -------
+    draws_emax_risk : dict
+        Maps dense keys to transformed draws. Dense keys of the same group share the
+        same array.
+
+    """
+    base_draws_sol = state_space.base_draws_sol
+
+    group_to_dense_keys = {}
+    for dense_key, location in base_draws_sol.locations.items():
+        choice_set = state_space.dense_key_to_choice_set[dense_key]
+        group_to_dense_keys.setdefault((location, choice_set), []).append(dense_key)
+    representatives = [dense_keys[0] for dense_keys in group_to_dense_keys.values()]
+
+    transformed_draws = transform_base_draws_with_cholesky_factor(
+        {key: base_draws_sol[key] for key in representatives},
+        {key: state_space.dense_key_to_choice_set[key] for key in representatives},
+        optim_paras["shocks_cholesky"],
+        optim_paras,
+        parallel=options["parallel"],
+    )
+
+    dtype = options["precision"]
+    draws_emax_risk = {}
+    for dense_keys in group_to_dense_keys.values():
+        draws = transformed_draws[dense_keys[0]].astype(dtype, copy=False)
+        for dense_key in dense_keys:
+            draws_emax_risk[dense_key] = draws
+
+    return draws_emax_risk
+
+
+def _solve_whole_horizon(state_space, draws_emax_risk, optim_paras):
+    """Solve the model for all periods with a single compiled routine.
+
+    Rewards, draws and expected value functions of all dense keys are concatenated into
+    flat arrays following :meth:`~respy.state_space.StateSpace.get_flat_layout`. The
+    continuation values are gathered with the child pointers of the layout. Thus, no
+    Python code is executed between periods.
+
+    """
+    layout = state_space.get_flat_layout()
+    dense_keys = layout["dense_keys"]
+
+    wages = np.concatenate([state_space.wages[key].ravel() for key in dense_keys])
+    nonpecs = np.concatenate([state_space.nonpecs[key].ravel() for key in dense_keys])
+
+    # Dense keys which share transformed draws also share their location in ``draws``.
+    unique_draws = {}
+    draws_offsets = np.zeros(len(dense_keys), dtype=np.int64)
+    offset = 0
+    for position, key in enumerate(dense_keys):
+        array = draws_emax_risk[key]
+        if id(array) not in unique_draws:
+            unique_draws[id(array)] = (offset, array)
+            offset += array.size
+        draws_offsets[position] = unique_draws[id(array)][0]
+    draws = np.concatenate([array.ravel() for _, array in unique_draws.values()])
+    n_draws = draws_emax_risk[dense_keys[0]].shape[0]
+
+    expected_value_functions = np.zeros(layout["period_starts"][-1])
+    _solve_whole_horizon_with_compiled_loops(
+        layout["period_starts"],
+        layout["state_to_position"],
+        layout["state_offsets"],
+        layout["n_choices"],
+        layout["choice_offsets"],
+        layout["child_pointers"],
+        draws_offsets,
+        wages,
+        nonpecs,
+        draws,
+        n_draws,
+        optim_paras["delta"],
+        expected_value_functions,
+    )
+
+    period_starts = layout["period_starts"]
+    for period, buffer in state_space.expected_value_functions.buffers.items():
+        buffer[:] = expected_value_functions[
+            period_starts[period] : period_starts[period + 1]
+        ]
+
+
+@nb.njit(parallel=True)
+def _solve_whole_horizon_with_compiled_loops(
+    period_starts,
+    state_to_position,
+    state_offsets,
+    n_choices,
+    choice_offsets,
+    child_pointers,
+    draws_offsets,
+    wages,
+    nonpecs,
+    draws,
+    n_draws,
+    delta,
+    expected_value_functions,
+):
+    """Compute the expected value functions of all states with backward induction.
+
+    The periods are processed sequentially and the states within a period in parallel.
+    The computation of a single state is the same as in
+    :func:`~respy.shared.calculate_expected_value_functions`.
+
+    """
+    n_periods = period_starts.shape[0] - 1
+
+    for period in range(n_periods - 1, -1, -1):
+        for state in nb.prange(period_starts[period], period_starts[period + 1]):
+            position = state_to_position[state]
+            n_choices_ = n_choices[position]
+            row = state - state_offsets[position]
+            start = choice_offsets[position] + row * n_choices_
+            draws_start = draws_offsets[position]
+
+            expected_value_function = 0.0
+            for i in range(n_draws):
+
+                max_value_functions = 0.0
+
+                for j in range(n_choices_):
+                    child = child_pointers[start + j]
+                    continuation_value = (
+                        expected_value_functions[child] if child >= 0 else 0.0
+                    )
+                    value_function, _ = aggregate_keane_wolpin_utility(
+                        wages[start + j],
+                        nonpecs[start + j],
+                        continuation_value,
+                        draws[draws_start + i * n_choices_ + j],
+                        delta,
+                    )
+
+                    if value_function > max_value_functions:
+                        max_value_functions = value_function
+
+                expected_value_function += max_value_functions
+
+            expected_value_functions[state] = expected_value_function / n_draws
+
+
+@parallelize_across_dense_dimensions(
+    split_rows=["wages", "nonpecs", "continuation_values"]
+)
 def _full_solution(
-    wages, nonpecs, continuation_values, period_draws_emax_risk, optim_paras
+    wages,
+    nonpecs,
+    continuation_values,
+    period_draws_emax_risk,
+    period_expected_shocks,
+    period_shocks_covariance,
+    period_weights,
+    optim_paras,
 ):
     """Calculate the full solution of the model.
 
     In contrast to approximate solution, the Monte Carlo integration is done for each
-    state and not only a subset of states.
+    state and not only a subset of states. If weights are given, the draws are the nodes
+    of a quadrature rule. If the covariance of the shocks is given, the expected value
+    functions are approximated in closed form. If only the expected shocks are given,
+    the variance of the integration is reduced with a control variate.
 
     """
-    period_expected_value_functions = calculate_expected_value_functions(
+    if period_weights is not None:
+        period_expected_value_functions = calculate_weighted_expected_value_functions(
+            wages,
+            nonpecs,
+            continuation_values,
+            period_draws_emax_risk,
+            period_weights,
+            optim_paras["delta"],
+        )
+    elif period_shocks_covariance is not None:
+        period_expected_value_functions = calculate_expected_value_functions_with_clark(
+            wages,
+            nonpecs,
+            continuation_values,
+            period_expected_shocks,
+            period_shocks_covariance,
+            optim_paras["delta"],
+        )
+    elif period_expected_shocks is None:
+        period_expected_value_functions = calculate_expected_value_functions(
+            wages,
+            nonpecs,
+            continuation_values,
+            period_draws_emax_risk,
+            optim_paras["delta"],
+        )
+    else:
+        period_expected_value_functions = (
+            calculate_expected_value_functions_with_control_variate(
+                wages,
+                nonpecs,
+                continuation_values,
+                period_draws_emax_risk,
+                period_expected_shocks,
+                optim_paras["delta"],
+            )
+        )
+
+    return period_expected_value_functions
+
+
+@parallelize_across_dense_dimensions(
+    split_rows=["wages", "nonpecs", "continuation_values"]
+)
+def _full_solution_with_adaptive_draws(
+    wages,
+    nonpecs,
+    continuation_values,
+    period_draws_emax_risk,
+    optim_paras,
+    tolerance,
+    block_size,
+):
+    """Calculate the full solution with adaptive numbers of draws per state.
+
+    Returns
+    -------
+    period_expected_value_functions : numpy.ndarray
+        Array with shape (n_states,) containing the expected value functions.
+    n_draws : numpy.ndarray
+        Array with shape (n_states,) containing the number of draws used per state.
+
+    """
+    return calculate_expected_value_functions_adaptively(
         wages,
         nonpecs,
         continuation_values,
         period_draws_emax_risk,
         optim_paras["delta"],
+        tolerance,
+        block_size,
     )
-
-    return period_expected_value_functions
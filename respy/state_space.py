@@ -1,33 +1,163 @@
 """Everything related to the state space of a structural model."""
+import filecmp
 import itertools
+import pickle
+import shutil
+import uuid
 
 import numba as nb
 import numpy as np
 import pandas as pd
-from numba.typed import Dict
 
-from respy._numba import sum_over_numba_boolean_unituple
+from respy.config import DTYPE_STATES
+from respy.config import STATE_SPACE_ARTIFACT_NAME
+from respy.config import STATE_SPACE_ARTIFACT_VERSION
 from respy.exogenous_processes import create_transit_choice_set
 from respy.exogenous_processes import create_transition_objects
 from respy.exogenous_processes import weight_continuation_values
 from respy.parallelization import parallelize_across_dense_dimensions
-from respy.shared import apply_law_of_motion_for_core
+from respy.shared import DenseKeyStore
+from respy.shared import StateIndexer
 from respy.shared import compute_covariates
+from respy.shared import consolidate_objects
 from respy.shared import convert_dictionary_keys_to_dense_indices
 from respy.shared import create_base_draws
+from respy.shared import create_base_quadrature
 from respy.shared import create_core_state_space_columns
 from respy.shared import create_dense_state_space_columns
 from respy.shared import downcast_to_smallest_dtype
 from respy.shared import dump_objects
 from respy.shared import load_objects
-from respy.shared import map_states_to_core_key_and_core_index
 from respy.shared import prepare_cache_directory
+from respy.shared import release_cache_directory
 from respy.shared import return_core_dense_key
 
 
 def create_state_space_class(optim_paras, options):
-    """Create the state space of the model."""
-    prepare_cache_directory(options)
+    """Create the state space of the model.
+
+    If ``options["cache_state_space"]`` is true, the structural parts of the state space
+    are stored as an artifact in ``options["state_space_path"]`` whose name contains a
+    hash of all model features determining the structure of the state space. Later
+    builds of models with the same structure load the artifact instead of creating the
+    state space from scratch. Otherwise, the parts of the state space are still written
+    to ``options["state_space_path"]``, but no artifact is stored.
+
+    The cache is disabled by default. Artifacts are only invalidated by changes to the
+    model features in the hash and to
+    :data:`~respy.config.STATE_SPACE_ARTIFACT_VERSION`. Delete the directory
+    ``options["cache_path"]`` to remove all artifacts.
+
+    """
+    state_space = None
+    if options["cache_state_space"]:
+        state_space = _load_state_space(optim_paras, options)
+
+    if state_space is None:
+        state_space = _create_and_store_state_space(optim_paras, options)
+
+    return state_space
+
+
+def _create_and_store_state_space(optim_paras, options):
+    """Create the state space and store it as an artifact if it is cached.
+
+    The state space is created in a temporary directory which is renamed to the final
+    location at the end. Thus, processes which build the same state space concurrently
+    never see an incomplete artifact.
+
+    """
+    directory = options["state_space_path"]
+    temporary_directory = directory.with_name(f"{directory.name}-{uuid.uuid4().hex}")
+    temporary_options = {**options, "state_space_path": temporary_directory}
+
+    prepare_cache_directory(temporary_options)
+    state_space = _create_state_space(optim_paras, temporary_options)
+    state_space.options = options
+
+    excluded_attributes = [
+        "optim_paras",
+        "options",
+        "expected_value_functions",
+        "_continuation_values",
+    ]
+    if options["cache_state_space"]:
+        attributes = {
+            key: value
+            for key, value in vars(state_space).items()
+            if key not in excluded_attributes
+        }
+        artifact = {"version": STATE_SPACE_ARTIFACT_VERSION, "attributes": attributes}
+        with open(temporary_directory / STATE_SPACE_ARTIFACT_NAME, "wb") as file:
+            pickle.dump(artifact, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    release_cache_directory(temporary_directory)
+    try:
+        temporary_directory.rename(directory)
+    except OSError:
+        # Another process stored the artifact in the meantime or the directory contains
+        # the same state space, e.g., if the model is built again without caching. The
+        # existing files are kept as they might be memory-mapped. Otherwise, the
+        # directory contains the leftovers of a different state space.
+        if (directory / STATE_SPACE_ARTIFACT_NAME).exists() or _contains_same_files(
+            temporary_directory, directory
+        ):
+            shutil.rmtree(temporary_directory)
+        else:
+            release_cache_directory(directory)
+            shutil.rmtree(directory)
+            temporary_directory.rename(directory)
+
+    return state_space
+
+
+def _contains_same_files(directory, other_directory):
+    """Check whether the files of a directory have byte-identical copies in another."""
+    names = [path.name for path in directory.iterdir()]
+    match, _, _ = filecmp.cmpfiles(directory, other_directory, names, shallow=False)
+
+    return len(match) == len(names)
+
+
+def _load_state_space(optim_paras, options):
+    """Load the state space from an artifact.
+
+    Returns
+    -------
+    state_space : StateSpace or None
+        The state space or None if no valid artifact exists.
+
+    """
+    path = options["state_space_path"] / STATE_SPACE_ARTIFACT_NAME
+
+    if path.exists():
+        with open(path, "rb") as file:
+            artifact = pickle.load(file)
+    else:
+        artifact = {}
+
+    if artifact.get("version") == STATE_SPACE_ARTIFACT_VERSION:
+        state_space = StateSpace.__new__(StateSpace)
+        state_space.__dict__.update(artifact["attributes"])
+        state_space.optim_paras = optim_paras
+        state_space.options = options
+        state_space.create_arrays_for_expected_value_functions()
+
+        # Advance the seeds as if the draws had been created.
+        if options["solution_integration"] == "monte_carlo":
+            n_choices_in_sets = set(
+                map(sum, state_space.dense_key_to_choice_set.values())
+            )
+            for _ in n_choices_in_sets:
+                next(options["solution_seed_startup"])
+    else:
+        state_space = None
+
+    return state_space
+
+
+def _create_state_space(optim_paras, options):
+    """Create the state space from scratch."""
     core = _create_core_state_space(optim_paras, options)
     dense_grid = _create_dense_state_space_grid(optim_paras)
     # Downcast after calculations or be aware of silent integer overflows.
@@ -47,6 +177,7 @@ def create_state_space_class(optim_paras, options):
     dense_period_choice = _create_dense_period_choice(
         core, dense, core_key_to_core_indices, core_key_to_complex, optim_paras, options
     )
+    consolidate_objects("states", options)
 
     state_space = StateSpace(
         core,
@@ -74,6 +205,19 @@ class StateSpace:
         experiences, lagged choices and periods.
     dense_key_to_core_indices : Dict[int, Array[int]]
         A mapping from dense keys to ``.loc`` locations in the ``core``.
+    expected_value_functions : DenseKeyStore
+        A mapping from dense keys to the expected value functions of the states. Like
+        ``base_draws_sol``, ``child_indices``, ``reward_covariates_mixed``, ``wages``
+        and ``nonpecs``, the arrays are stored contiguously per period. See
+        :class:`~respy.shared.DenseKeyStore`.
+    reward_covariates_core : DenseKeyStore
+        A mapping from core keys to the design matrices of the core covariates of wages
+        and non-pecuniary rewards with shape ``(n_states, n_core_covariates)``.
+    reward_covariates_dense : dict
+        A mapping from dense keys to the values of the dense covariates of rewards.
+    reward_covariates_mixed : DenseKeyStore
+        A mapping from dense keys to the design matrices of covariates which depend on
+        core and dense information with shape ``(n_states, n_mixed_covariates)``.
 
     """
 
@@ -97,7 +241,7 @@ class StateSpace:
         ----------
         core : pandas.DataFrame
             DataFrame containing one core state per row.
-        indexer : numba.typed.Dict
+        indexer : StateIndexer
             Maps states (rows of core) into tuples containing core key and
             core index. i : state -> (core_key, core_index)
         dense : dict
@@ -121,12 +265,18 @@ class StateSpace:
         self.options = options
         self.n_periods = options["n_periods"]
         self._create_conversion_dictionaries()
-        self.base_draws_sol = self.create_draws(options)
+        self.base_draws_sol, self.base_weights_sol = self.create_draws(options)
+        (
+            self.reward_covariates_core,
+            self.reward_covariates_dense,
+            self.reward_covariates_mixed,
+        ) = self.create_reward_covariates(options)
         self.create_arrays_for_expected_value_functions()
 
         if len(self.optim_paras["exogenous_processes"]) > 0:
             self.create_objects_for_exogenous_processes()
         self.child_indices = self.collect_child_indices()
+        self.child_pointers = self.collect_child_pointers()
 
     def _create_conversion_dictionaries(self):
         """Create mappings between state space location indices and properties.
@@ -147,21 +297,28 @@ class StateSpace:
             i: self.dense_key_to_complex[i][1] for i in self.dense_key_to_complex
         }
 
+        self.dense_key_to_period = {
+            i: self.dense_key_to_complex[i][0] for i in self.dense_key_to_complex
+        }
+
+        self.period_to_dense_keys = {period: [] for period in range(self.n_periods)}
+        for dense_key, period in self.dense_key_to_period.items():
+            self.period_to_dense_keys[period].append(dense_key)
+
         self.dense_key_to_core_indices = {
             i: np.array(self.core_key_to_core_indices[self.dense_key_to_core_key[i]])
             for i in self.dense_key_to_complex
         }
 
-        self.core_key_and_dense_index_to_dense_key = Dict.empty(
-            key_type=nb.types.UniTuple(nb.types.int64, 2), value_type=nb.types.int64,
-        )
-
-        for i in self.dense_key_to_complex:
-            self.core_key_and_dense_index_to_dense_key[
+        self.core_key_and_dense_index_to_dense_key = StateIndexer(
+            [
                 return_core_dense_key(
                     self.dense_key_to_core_key[i], *self.dense_key_to_complex[i][2:],
                 )
-            ] = i
+                for i in self.dense_key_to_complex
+            ],
+            list(self.dense_key_to_complex),
+        )
 
         if self.dense is False:
             self.dense_covariates_to_dense_index = {}
@@ -170,13 +327,9 @@ class StateSpace:
             }
 
         else:
-            n_dense = len(create_dense_state_space_columns(self.optim_paras))
-            self.dense_covariates_to_dense_index = Dict.empty(
-                key_type=nb.types.UniTuple(nb.types.int64, n_dense),
-                value_type=nb.types.int64,
+            self.dense_covariates_to_dense_index = StateIndexer(
+                list(self.dense), np.arange(len(self.dense))
             )
-            for i, k in enumerate(self.dense):
-                self.dense_covariates_to_dense_index[k] = i
 
             self.dense_key_to_dense_covariates = {
                 i: list(self.dense.keys())[self.dense_key_to_complex[i][2]]
@@ -185,11 +338,13 @@ class StateSpace:
 
     def create_arrays_for_expected_value_functions(self):
         """Create a container for expected value functions."""
-        self.expected_value_functions = Dict.empty(
-            key_type=nb.types.int64, value_type=nb.types.float64[:]
+        shapes = {
+            key: (len(indices),)
+            for key, indices in self.dense_key_to_core_indices.items()
+        }
+        self.expected_value_functions = DenseKeyStore.zeros(
+            shapes, self.dense_key_to_period, dtype=self.options["precision"]
         )
-        for index, indices in self.dense_key_to_core_indices.items():
-            self.expected_value_functions[index] = np.zeros(len(indices))
 
     def create_objects_for_exogenous_processes(self):
         """Create mappings for the implementation of the exogenous processes."""
@@ -207,6 +362,7 @@ class StateSpace:
             self.dense_key_to_core_key,
             self.exogenous_grid,
             n_exog,
+            parallel=self.options["parallel"],
             bypass={
                 "dense_covariates_to_dense_index": self.dense_covariates_to_dense_index,
                 "core_key_and_dense_index_to_dense_key": self.core_key_and_dense_index_to_dense_key,  # noqa: E501
@@ -222,42 +378,79 @@ class StateSpace:
         The function takes the expected value functions from the previous periods and
         then uses the indices of child states to put these expected value functions in
         the correct format. If period is equal to self.n_periods - 1 the function
-        returns arrays of zeros since we are in terminal states. Otherwise we retrieve
-        expected value functions for next period and call
-        :func:`_get_continuation_values` to assign continuation values to all choices
-        within a period. (The object `subset_expected_value_functions` is required
-        because we need a Numba typed dict but the function
-        :meth:`StateSpace.get_attribute_from_period` just returns a normal dict)
+        returns arrays of zeros since we are in terminal states. Otherwise, the
+        continuation values of all dense keys in the period are gathered at once from
+        the buffer of expected value functions of the next period with the pointers
+        created by :meth:`StateSpace.collect_child_pointers`.
+
+        The continuation values only depend on the expected value functions of the next
+        period. Thus, they are cached once computed such that the continuation values
+        from the backward induction are reused by the simulation and the likelihood. The
+        cache is cleared by :meth:`StateSpace.clear_continuation_values` at the start of
+        every solution and entries are discarded if the expected value functions of the
+        next period are set with :meth:`StateSpace.set_attribute_from_keys`. Each entry
+        also keeps a copy of the expected value functions of the next period and is
+        computed again if they were modified in-place otherwise.
 
         Returns
         -------
-        continuation_values : numba.typed.Dict
+        continuation_values : dict
             The continuation values for each dense key in a :class:`numpy.ndarray`.
 
         See also
         --------
-        _get_continuation_values
+        collect_child_pointers
             A more theoretical explanation can be found here: See :ref:`get continuation
             values <get_continuation_values>`.
 
+        """
+        cache = self.__dict__.setdefault("_continuation_values", {})
+        if period == self.n_periods - 1:
+            children = None
+        else:
+            children = self.expected_value_functions.buffers[period + 1]
+
+        if period in cache:
+            continuation_values, children_ = cache[period]
+            if children is not None and not np.array_equal(children, children_):
+                del cache[period]
+
+        if period not in cache:
+            cache[period] = (
+                self._compute_continuation_values(period),
+                None if children is None else children.copy(),
+            )
+
+        return cache[period][0]
+
+    def clear_continuation_values(self):
+        """Clear the cache of continuation values."""
+        self._continuation_values = {}
+
+    def _compute_continuation_values(self, period):
+        """Compute the continuation values of a period.
+
+        See :meth:`StateSpace.get_continuation_values`.
+
         """
         if period == self.n_periods - 1:
             shapes = self.get_attribute_from_period("base_draws_sol", period)
             states = self.get_attribute_from_period("dense_key_to_core_indices", period)
+            dtype = self.expected_value_functions.buffers[period].dtype
             continuation_values = {
-                key: np.zeros((states[key].shape[0], shapes[key].shape[1]))
+                key: np.zeros((states[key].shape[0], shapes[key].shape[1]), dtype)
                 for key in shapes
             }
         else:
-            child_indices = self.get_attribute_from_period("child_indices", period)
-            expected_value_functions = self.get_attribute_from_period(
-                "expected_value_functions", period + 1
+            child_pointers = self.child_pointers.get_period(period)
+            continuation_values = DenseKeyStore(
+                {
+                    period: self.expected_value_functions.buffers[period + 1][
+                        child_pointers.buffers[period]
+                    ]
+                },
+                child_pointers.locations,
             )
-            subset_expected_value_functions = Dict.empty(
-                key_type=nb.types.int64, value_type=nb.types.float64[:]
-            )
-            for key, value in expected_value_functions.items():
-                subset_expected_value_functions[key] = value
 
             transit_choice_sets = (
                 "transit_key_to_choice_set"
@@ -265,15 +458,6 @@ class StateSpace:
                 else "dense_key_to_choice_set"
             )
 
-            continuation_values = _get_continuation_values(
-                self.get_attribute_from_period("dense_key_to_complex", period),
-                self.get_attribute_from_period(transit_choice_sets, period),
-                self.get_attribute_from_period("dense_key_to_core_indices", period),
-                child_indices,
-                self.core_key_and_dense_index_to_dense_key,
-                bypass={"expected_value_functions": subset_expected_value_functions},
-            )
-
             if len(self.optim_paras["exogenous_processes"]) > 0:
                 continuation_values = weight_continuation_values(
                     self.get_attribute_from_period("dense_key_to_complex", period),
@@ -306,61 +490,226 @@ class StateSpace:
             child_indices = None
 
         else:
-            dense_key_to_complex_except_last_period = {
-                k: v
-                for k, v in self.dense_key_to_complex.items()
-                if v[0] < self.n_periods - 1
-            }
-
             transit_choice_sets = (
                 "transit_key_to_choice_set"
                 if hasattr(self, "transit_key_to_choice_set")
                 else "dense_key_to_choice_set"
             )
+            core_columns = ["period"] + create_core_state_space_columns(
+                self.optim_paras
+            )
 
-            dense_key_to_choice_set_except_last_period = {
-                k: getattr(self, transit_choice_sets)[k]
-                for k in dense_key_to_complex_except_last_period
-            }
+            # Child indices only depend on the core states and the choice set. Thus,
+            # compute them once and share them across dense keys.
+            cache = {}
+            child_indices = {}
+            for dense_key, complex_ in self.dense_key_to_complex.items():
+                if complex_[0] == self.n_periods - 1:
+                    continue
+
+                core_key = self.dense_key_to_core_key[dense_key]
+                choice_set = tuple(
+                    bool(i) for i in getattr(self, transit_choice_sets)[dense_key]
+                )
+
+                if (core_key, choice_set) not in cache:
+                    states = self.core.loc[
+                        self.core_key_to_core_indices[core_key], core_columns
+                    ].to_numpy(dtype=np.int64)
+                    cache[core_key, choice_set] = _collect_child_indices(
+                        states, choice_set, self.indexer, self.optim_paras
+                    )
+
+                child_indices[dense_key] = cache[core_key, choice_set]
 
-            child_indices = _collect_child_indices(
-                dense_key_to_complex_except_last_period,
-                dense_key_to_choice_set_except_last_period,
-                self.indexer,
-                self.optim_paras,
-                self.options,
+            child_indices = DenseKeyStore.from_arrays(
+                child_indices, self.dense_key_to_period
             )
 
         return child_indices
 
+    def collect_child_pointers(self):
+        """Collect for each state and choice the position of the child state.
+
+        The child indices map each state and choice to a core key and core index. Here,
+        they are converted once to positions in the buffer of expected value functions
+        of the next period such that continuation values are a simple gather without
+        dictionary lookups.
+
+        """
+        if self.n_periods == 1:
+            child_pointers = None
+
+        else:
+            locations = self.expected_value_functions.locations
+
+            dense_key_to_offset = np.full(
+                max(self.dense_key_to_complex) + 1, -1, dtype=np.int64
+            )
+            for dense_key, (_, offset, _) in locations.items():
+                dense_key_to_offset[dense_key] = offset
+
+            child_pointers = {}
+            for dense_key, indices in self.child_indices.items():
+                complex_ = self.dense_key_to_complex[dense_key]
+                dense_index = complex_[2] if len(complex_) == 3 else 0
+
+                flat_indices = indices.reshape(-1, 2)
+                child_dense_keys = self.core_key_and_dense_index_to_dense_key.lookup(
+                    np.column_stack(
+                        (flat_indices[:, 0], np.full(len(flat_indices), dense_index))
+                    )
+                )
+                child_pointers[dense_key] = (
+                    dense_key_to_offset[child_dense_keys] + flat_indices[:, 1]
+                ).reshape(indices.shape[:-1])
+
+            child_pointers = DenseKeyStore.from_arrays(
+                child_pointers, self.dense_key_to_period
+            )
+
+        return child_pointers
+
     def create_draws(self, options):
-        """Get draws."""
+        """Get draws.
+
+        If ``options["solution_integration"]`` is a quadrature rule, the draws are the
+        nodes of the rule which are the same in every period and the weights are
+        returned as well. Otherwise, the weights are None. The closed-form approximation
+        of ``"clark"`` does not integrate over draws and only receives a single node of
+        zeros per period which records the number of choices.
+
+        """
         n_choices_in_sets = list(set(map(sum, self.dense_key_to_choice_set.values())))
         shocks_sets = []
+        weights_sets = []
 
         for n_choices in n_choices_in_sets:
-            draws = create_base_draws(
-                (options["n_periods"], options["solution_draws"], n_choices),
-                next(options["solution_seed_startup"]),
-                options["monte_carlo_sequence"],
-            )
+            if options["solution_integration"] == "monte_carlo":
+                draws = create_base_draws(
+                    (options["n_periods"], options["solution_draws"], n_choices),
+                    next(options["solution_seed_startup"]),
+                    options["monte_carlo_sequence"],
+                    options["solution_antithetic"],
+                )
+            elif options["solution_integration"] == "clark":
+                draws = np.zeros((options["n_periods"], 1, n_choices))
+            else:
+                nodes, weights = create_base_quadrature(
+                    n_choices,
+                    options["solution_quadrature_order"],
+                    options["solution_integration"],
+                )
+                # Copies per period keep the arrays of each period in its own buffer.
+                draws = np.tile(nodes, (options["n_periods"], 1, 1))
+                weights_sets.append(np.tile(weights, (options["n_periods"], 1)))
             shocks_sets.append(draws)
         draws = {}
+        weights = {}
         for dense_idx, complex_ix in self.dense_key_to_complex.items():
             period = complex_ix[0]
             n_choices = sum(complex_ix[1])
             idx = n_choices_in_sets.index(n_choices)
             draws[dense_idx] = shocks_sets[idx][period]
+            if weights_sets:
+                weights[dense_idx] = weights_sets[idx][period]
+
+        draws = DenseKeyStore.from_arrays(draws, self.dense_key_to_period)
+        weights = (
+            DenseKeyStore.from_arrays(weights, self.dense_key_to_period)
+            if weights
+            else None
+        )
+
+        return draws, weights
 
-        return draws
+    def create_reward_covariates(self, options):
+        """Create the design matrices of wages and non-pecuniary rewards.
+
+        The covariates of rewards are separated into core, dense and mixed covariates.
+        Core covariates are collected once per core key and dense covariates once per
+        dense vector. Only the few mixed covariates are collected from the states of
+        each dense key. Thus, the core part of the rewards is computed once for all
+        dense vectors and the dense part is a shift of the rewards of each dense key.
+
+        """
+        columns = options["covariates_rewards"]
+
+        reward_covariates_core = {
+            core_key: self.core.loc[indices, columns["core"]].to_numpy(np.float64)
+            for core_key, indices in self.core_key_to_core_indices.items()
+        }
+        reward_covariates_core = DenseKeyStore.from_arrays(
+            reward_covariates_core,
+            {key: complex_[0] for key, complex_ in self.core_key_to_complex.items()},
+        )
+
+        reward_covariates_dense = {}
+        reward_covariates_mixed = {}
+        for dense_key, complex_ in self.dense_key_to_complex.items():
+            dense_covariates = self.dense_key_to_dense_covariates[dense_key]
+            reward_covariates_dense[dense_key] = np.array(
+                [self.dense[dense_covariates][cov] for cov in columns["dense"]],
+                dtype=np.float64,
+            )
+
+            if columns["mixed"]:
+                states = load_objects("states", complex_, options)
+                reward_covariates_mixed[dense_key] = states[columns["mixed"]].to_numpy(
+                    np.float64
+                )
+            else:
+                n_states = len(self.dense_key_to_core_indices[dense_key])
+                reward_covariates_mixed[dense_key] = np.zeros((n_states, 0))
+
+        reward_covariates_mixed = DenseKeyStore.from_arrays(
+            reward_covariates_mixed, self.dense_key_to_period
+        )
+
+        return reward_covariates_core, reward_covariates_dense, reward_covariates_mixed
+
+    def get_flat_layout(self):
+        """Get the layout of all states of the model in flat arrays.
+
+        The states of all dense keys are ordered like the buffers of
+        :attr:`expected_value_functions`, i.e., by period and by the offset within the
+        buffer of the period. Arrays with one value per state and choice like wages
+        concatenate the flattened arrays of the dense keys in the same order. The child
+        pointers map each state and choice to the position of the child state in the
+        flat array of expected value functions such that continuation values are a
+        simple gather. The layout only depends on the structure of the state space and
+        is created once.
+
+        Returns
+        -------
+        layout : dict
+            - ``"dense_keys"``: Dense keys in the order of the layout.
+            - ``"period_starts"``: The states of period ``t`` are between
+              ``period_starts[t]`` and ``period_starts[t + 1]``.
+            - ``"state_offsets"``, ``"n_states"``, ``"n_choices"``: Position of the
+              first state, number of states and number of choices per dense key.
+            - ``"choice_offsets"``: Position of the first state-choice combination per
+              dense key.
+            - ``"state_to_position"``: Maps each state to the position of its dense key
+              in ``"dense_keys"``.
+            - ``"child_pointers"``: Position of the child state for each state and
+              choice or -1 in the last period.
+
+        """
+        if getattr(self, "_flat_layout", None) is None:
+            self._flat_layout = _create_flat_layout(
+                self.expected_value_functions,
+                self.dense_key_to_complex,
+                self.dense_key_to_choice_set,
+                self.child_pointers,
+                self.n_periods,
+            )
+
+        return self._flat_layout
 
     def get_dense_keys_from_period(self, period):
         """Get dense indices from one period."""
-        return [
-            dense_index
-            for dense_index, complex_ in self.dense_key_to_complex.items()
-            if complex_[0] == period
-        ]
+        return self.period_to_dense_keys.get(period, [])
 
     def get_attribute_from_period(self, attribute, period):
         """Get an attribute of the state space sliced to a given period.
@@ -372,13 +721,26 @@ class StateSpace:
         period : int
             Attribute is retrieved from this period.
 
+        Returns
+        -------
+        attribute : dict
+            If the attribute is a :class:`~respy.shared.DenseKeyStore`, the store of the
+            period is returned which shares the memory with the attribute.
+
         """
-        dense_indices_in_period = self.get_dense_keys_from_period(period)
-        return {
-            dense_index: attr
-            for dense_index, attr in getattr(self, attribute).items()
-            if dense_index in dense_indices_in_period
-        }
+        attribute = getattr(self, attribute)
+
+        if isinstance(attribute, DenseKeyStore):
+            out = attribute.get_period(period)
+        else:
+            dense_indices_in_period = set(self.get_dense_keys_from_period(period))
+            out = {
+                dense_index: attr
+                for dense_index, attr in attribute.items()
+                if dense_index in dense_indices_in_period
+            }
+
+        return out
 
     def set_attribute_from_keys(self, attribute, value):
         """Set attributes by keys.
@@ -401,6 +763,11 @@ class StateSpace:
         for key in value:
             getattr(self, attribute)[key][:] = value[key]
 
+        if attribute == "expected_value_functions":
+            cache = self.__dict__.get("_continuation_values", {})
+            for key in value:
+                cache.pop(self.dense_key_to_period[key] - 1, None)
+
 
 def _create_core_state_space(optim_paras, options):
     """Create the core state space.
@@ -433,25 +800,18 @@ def _create_core_state_space(optim_paras, options):
       periods. Using this approach, we ran into the Python recursion limit and runtime
       problems, but it might be feasible.
 
-      These two approaches build the frame for thinking about a solution to this problem
-      where filtering is, first, applied after creating a massive amount of candidate
-      states, or, secondly, before creating states. A practical solution must take into
-      account that some restrictions to the state space are more important than others
-      and should be applied earlier. Others can be delayed.
-
-      As a compromise, we built on the former approach in
-      :func:`~respy.tests._former_code._create_state_space_kw94` which loops over
-      choices and possible experience values. Thus, it incorporates some fundamental
-      restrictions like time limits and needs less filtering.
-
-    - The former implementation,
-      :func:`~respy.tests._former_code._create_state_space_kw94`, had four hard-coded
-      choices and a loop for every choice with experience accumulation. Thus, this
-      function is useless if the model requires additional or less choices. For each
-      number of choices with and without experience, a new function had to be
-      programmed. The following approach uses the same loops over choices with
-      experiences, but they are dynamically created by the recursive function
-      :func:`_create_core_state_space_per_period`.
+    - The current implementation enumerates states directly. For each period, the number
+      of admissible experience vectors, i.e., vectors whose additional experience is
+      bounded by the maximum experience and whose sum does not exceed the period, is
+      counted in advance by :func:`_count_admissible_experiences`. Then,
+      :func:`_enumerate_core_states` writes exactly these vectors combined with all
+      lagged choices into a preallocated array. No candidate is created which is
+      discarded afterwards for violating the time constraint.
+
+    - Initial experiences are folded into the enumerated states by
+      :func:`_fold_initial_experiences_into_core_states`. Since different initial
+      experiences can lead to the same state, a state is only written once which makes
+      a deduplication of the state space unnecessary.
 
     - There are characteristics of the state space which are independent from all other
       state space attributes like types (and almost lagged choices). These attributes
@@ -461,7 +821,6 @@ def _create_core_state_space(optim_paras, options):
     See also
     --------
     _create_core_from_choice_experiences
-    _create_core_state_space_per_period
     _filter_core_state_space
     _add_initial_experiences_to_core_state_space
     _create_indexer
@@ -469,19 +828,15 @@ def _create_core_state_space(optim_paras, options):
     """
     core = _create_core_from_choice_experiences(optim_paras)
 
-    core = _add_lagged_choice_to_core_state_space(core, optim_paras)
-
     core = _filter_core_state_space(core, options)
 
     core = _add_initial_experiences_to_core_state_space(core, optim_paras)
 
-    core = core.sort_values("period").reset_index(drop=True)
-
     return core
 
 
 def _create_core_from_choice_experiences(optim_paras):
-    """Create the core state space from choice experiences.
+    """Create the core state space from choice experiences and lagged choices.
 
     The core state space abstracts from initial experiences and uses the maximum range
     between initial experiences and maximum experiences to cover the whole range. The
@@ -490,49 +845,42 @@ def _create_core_from_choice_experiences(optim_paras):
 
     See also
     --------
-    _create_core_state_space_per_period
+    _enumerate_core_states
 
     """
     choices_w_exp = list(optim_paras["choices_w_exp"])
     minimal_initial_experience = np.array(
         [min(optim_paras["choices"][choice]["start"]) for choice in choices_w_exp],
-        dtype=np.uint8,
+        dtype=np.int64,
     )
     maximum_exp = np.array(
         [optim_paras["choices"][choice]["max"] for choice in choices_w_exp],
-        dtype=np.uint8,
+        dtype=np.int64,
     )
 
     additional_exp = maximum_exp - minimal_initial_experience
 
-    exp_cols = [f"exp_{choice}" for choice in choices_w_exp]
-
-    container = []
-    for period in np.arange(optim_paras["n_periods"], dtype=np.uint8):
-        data = _create_core_state_space_per_period(
-            period,
-            additional_exp,
-            optim_paras)
-        df_ = pd.DataFrame(data=data, columns=exp_cols)
-        df_.insert(0, "period", period)
-        container.append(df_)
+    states = _enumerate_core_states(
+        optim_paras["n_periods"],
+        additional_exp,
+        len(optim_paras["choices"]),
+        optim_paras["n_lagged_choices"],
+    )
 
-    df = pd.concat(container, axis="rows", sort=False)
+    columns = ["period"] + create_core_state_space_columns(optim_paras)
+    df = pd.DataFrame(data=states, columns=columns).astype(np.int64)
 
     return df
 
 
-def _create_core_state_space_per_period_alt(
-    period, additional_exp, optim_paras, experiences, pos=0
-):
-    """Create core state space per period.
-
-    First, this function returns a state combined with all possible lagged choices and
-    types.
+@nb.njit
+def _count_admissible_experiences(period, additional_exp):
+    """Count the experience vectors which are admissible in a period.
 
-    Secondly, if there exists a choice with experience in ``additional_exp[pos]``, loop
-    over all admissible experiences, update the state and pass it to the same function,
-    but moving to the next choice which accumulates experience.
+    An experience vector is admissible if each experience does not exceed the additional
+    experience of the choice and if the sum of experiences does not exceed the period.
+    The number is computed by convolving the number of ways to reach a sum of
+    experiences choice by choice.
 
     Parameters
     ----------
@@ -540,83 +888,111 @@ def _create_core_state_space_per_period_alt(
         Number of period.
     additional_exp : numpy.ndarray
         Array with shape (n_choices_w_exp,) containing integers representing the
-        additional experience per choice which is admissible. This is the difference
-        between the maximum experience and minimum of initial experience per choice.
-    experiences : None or numpy.ndarray, default None
-        Array with shape (n_choices_w_exp,) which contains current experience of state.
-    pos : int, default 0
-        Index for current choice with experience. If index is valid for array
-        ``experiences``, then loop over all admissible experience levels of this choice.
-        Otherwise, ``experiences[pos]`` would lead to an :exc:`IndexError`.
+        additional experience per choice which is admissible.
+
+    Returns
+    -------
+    n_experiences : int
+        Number of admissible experience vectors.
 
     """
-    # Return experiences combined with lagged choices and types.
-    yield experiences
-
-    # Check if there is an additional choice left to start another loop.
-    if pos < experiences.shape[0]:
-        # Upper bound of additional experience is given by the remaining time or the
-        # maximum experience which can be accumulated in experience[pos].
-        remaining_time = period - experiences.sum()
-        max_experience = additional_exp[pos]
-
-        # +1 is necessary so that the remaining time or max_experience is exhausted.
-        for i in np.arange(min(remaining_time, max_experience) + 1, dtype=np.uint8):
-            # Update experiences and call the same function with the next choice.
-            updated_experiences = experiences.copy()
-            updated_experiences[pos] += i
-            yield from _create_core_state_space_per_period(
-                period, additional_exp, optim_paras, updated_experiences, pos + 1
-            )
+    ways_to_reach_sum = np.zeros(period + 1, dtype=np.int64)
+    ways_to_reach_sum[0] = 1
 
+    for max_experience in additional_exp:
+        updated_ways_to_reach_sum = np.zeros(period + 1, dtype=np.int64)
+        for sum_ in range(period + 1):
+            if ways_to_reach_sum[sum_] > 0:
+                for exp in range(min(max_experience, period - sum_) + 1):
+                    updated_ways_to_reach_sum[sum_ + exp] += ways_to_reach_sum[sum_]
+        ways_to_reach_sum = updated_ways_to_reach_sum
 
-def _create_core_state_space_per_period(
-    period, additional_exp, optim_paras
-):
-    """Create core state space per period.
+    return ways_to_reach_sum.sum()
+
+
+@nb.njit
+def _enumerate_core_states(n_periods, additional_exp, n_choices, n_lagged_choices):
+    """Enumerate all states of the core state space without initial experiences.
 
-    First, this function returns a state combined with all possible lagged choices and
-    types.
+    For each period, the admissible experience vectors are generated in lexicographic
+    order like an odometer. A position is incremented if the additional experience of
+    the choice and the remaining time allow it. Otherwise, the position is reset and the
+    next position to the left is incremented. Each experience vector is combined with
+    all combinations of lagged choices.
 
-    Secondly, if there exists a choice with experience in ``additional_exp[pos]``, loop
-    over all admissible experiences, update the state and pass it to the same function,
-    but moving to the next choice which accumulates experience.
+    As the number of states is known in advance, see
+    :func:`_count_admissible_experiences`, the states are directly written to a
+    preallocated array.
 
     Parameters
     ----------
-    period : int
-        Number of period.
+    n_periods : int
+        Number of periods.
     additional_exp : numpy.ndarray
         Array with shape (n_choices_w_exp,) containing integers representing the
         additional experience per choice which is admissible. This is the difference
         between the maximum experience and minimum of initial experience per choice.
-    experiences : None or numpy.ndarray, default None
-        Array with shape (n_choices_w_exp,) which contains current experience of state.
-    pos : int, default 0
-        Index for current choice with experience. If index is valid for array
-        ``experiences``, then loop over all admissible experience levels of this choice.
-        Otherwise, ``experiences[pos]`` would lead to an :exc:`IndexError`.
-
-    """
-    set_choices = [list(range(x + 1)) for x in additional_exp]
-    list_comb = list(itertools.product(*set_choices))
-    out = np.concatenate([np.array(x) for x in list_comb]).reshape(len(list_comb),len(additional_exp))
-    check = out.sum(axis=1)
-    filter_out = check <= period
-    return out[filter_out]
+    n_choices : int
+        Number of choices which are the possible values of lagged choices.
+    n_lagged_choices : int
+        Number of lagged choices.
 
+    Returns
+    -------
+    states : numpy.ndarray
+        Array with shape (n_states, 1 + n_choices_w_exp + n_lagged_choices) containing
+        the period, experiences and lagged choices of each state sorted by period.
 
-def _add_lagged_choice_to_core_state_space(df, optim_paras):
-    container = []
-    for lag in range(1, optim_paras["n_lagged_choices"] + 1):
-        for choice_code in range(len(optim_paras["choices"])):
-            df_ = df.copy()
-            df_[f"lagged_choice_{lag}"] = choice_code
-            container.append(df_)
+    """
+    n_choices_w_exp = additional_exp.shape[0]
+    n_lagged_choice_combinations = n_choices ** n_lagged_choices
 
-    df = pd.concat(container, axis="rows", sort=False) if container else df
+    n_states = 0
+    for period in range(n_periods):
+        n_states += _count_admissible_experiences(period, additional_exp)
+    n_states *= n_lagged_choice_combinations
 
-    return df
+    states = np.empty(
+        (n_states, 1 + n_choices_w_exp + n_lagged_choices), dtype=DTYPE_STATES
+    )
+    experiences = np.zeros(n_choices_w_exp, dtype=np.int64)
+
+    row = 0
+    for period in range(n_periods):
+        experiences[:] = 0
+        sum_experiences = 0
+
+        while True:
+            for combination in range(n_lagged_choice_combinations):
+                states[row, 0] = period
+                for i in range(n_choices_w_exp):
+                    states[row, 1 + i] = experiences[i]
+
+                # Decode the combination into lagged choices where the first lag is the
+                # most significant digit.
+                remainder = combination
+                for lag in range(n_lagged_choices - 1, -1, -1):
+                    states[row, 1 + n_choices_w_exp + lag] = remainder % n_choices
+                    remainder //= n_choices
+
+                row += 1
+
+            # Find the next admissible experience vector.
+            pos = n_choices_w_exp - 1
+            while pos >= 0:
+                if experiences[pos] < additional_exp[pos] and sum_experiences < period:
+                    experiences[pos] += 1
+                    sum_experiences += 1
+                    break
+                else:
+                    sum_experiences -= experiences[pos]
+                    experiences[pos] = 0
+                    pos -= 1
+
+            if pos < 0:
+                break
+
+    return states
 
 
 def _filter_core_state_space(df, options):
@@ -635,49 +1011,146 @@ def _filter_core_state_space(df, options):
     options : dict
 
     """
-    for definition in options["core_state_space_filters"]:
-        df = df.loc[~df.eval(definition)]
+    is_filtered = np.zeros(len(df), dtype=np.bool_)
+    for filter_ in options["compiled_core_state_space_filters"]:
+        is_filtered |= filter_(df)
 
-    return df
+    return df.loc[~is_filtered]
 
 
 def _add_initial_experiences_to_core_state_space(df, optim_paras):
     """Add initial experiences to core state space.
 
     As the core state space abstracts from differences in initial experiences, this
-    function loops through all combinations from initial experiences and adds them to
-    existing experiences. After that, we need to check whether the maximum in
-    experiences is still binding.
+    function adds all combinations of initial experiences to the existing experiences.
+    After that, we need to check whether the maximum in experiences is still binding.
+
+    Because the same state can be reached with different initial experiences, the
+    combinations are folded into the state space with
+    :func:`_fold_initial_experiences_into_core_states` which writes each state only
+    once.
 
     """
     choices = optim_paras["choices"]
-    # Create combinations of starting values
-    initial_experiences_combinations = itertools.product(
-        *[choices[choice]["start"] for choice in optim_paras["choices_w_exp"]]
+    choices_w_exp = optim_paras["choices_w_exp"]
+
+    start_experiences = [choices[choice]["start"] for choice in choices_w_exp]
+    initial_experiences = np.array(
+        list(itertools.product(*start_experiences)), dtype=np.int64
+    ).reshape(-1, len(choices_w_exp))
+    maximum_exp = np.array([choices[choice]["max"] for choice in choices_w_exp])
+
+    states = _fold_initial_experiences_into_core_states(
+        np.ascontiguousarray(df.to_numpy(dtype=np.int64)),
+        initial_experiences,
+        maximum_exp.astype(np.int64),
+        len(choices),
+        optim_paras["n_lagged_choices"],
     )
 
-    maximum_exp = np.array(
-        [choices[choice]["max"] for choice in optim_paras["choices_w_exp"]]
-    )
+    df = pd.DataFrame(data=states, columns=df.columns).astype(np.int64)
 
-    exp_cols = df.filter(like="exp_").columns.tolist()
+    return df
 
-    container = []
 
-    for initial_exp in initial_experiences_combinations:
-        df_ = df.copy()
+@nb.njit
+def _fold_initial_experiences_into_core_states(
+    states, initial_experiences, maximum_exp, n_choices, n_lagged_choices
+):
+    """Fold combinations of initial experiences into the core states.
 
-        # Add initial experiences.
-        df_[exp_cols] += initial_exp
+    Every state is combined with every combination of initial experiences as long as the
+    maximum experience is not exceeded. To ensure that every state is written only once,
+    states within a period are marked in a dense array which is addressed by the
+    experiences relative to the minimum initial experience and the lagged choices. Only
+    unmarked states are written to the output.
 
-        # Check that max_experience is still fulfilled.
-        df_ = df_.loc[df_[exp_cols].le(maximum_exp).all(axis="columns")].copy()
+    The function runs twice over the states. The first pass counts the number of unique
+    states to preallocate the output and the second pass fills it.
 
-        container.append(df_)
+    Parameters
+    ----------
+    states : numpy.ndarray
+        Array with shape (n_states, 1 + n_choices_w_exp + n_lagged_choices) containing
+        states sorted by period.
+    initial_experiences : numpy.ndarray
+        Array with shape (n_combinations, n_choices_w_exp) containing all combinations
+        of initial experiences.
+    maximum_exp : numpy.ndarray
+        Array with shape (n_choices_w_exp,) containing the maximum experiences.
+    n_choices : int
+        Number of choices.
+    n_lagged_choices : int
+        Number of lagged choices.
 
-    df = pd.concat(container, axis="rows", sort=False).drop_duplicates()
+    Returns
+    -------
+    out : numpy.ndarray
+        Array with shape (n_unique_states, 1 + n_choices_w_exp + n_lagged_choices)
+        containing states sorted by period.
 
-    return df
+    """
+    n_states, n_columns = states.shape
+    n_combinations, n_choices_w_exp = initial_experiences.shape
+
+    minimal_initial_experience = np.zeros(n_choices_w_exp, dtype=np.int64)
+    for i in range(n_choices_w_exp):
+        minimal_initial_experience[i] = initial_experiences[:, i].min()
+
+    # Compute the strides to address a state within a period in the dense array.
+    n_dimensions = n_columns - 1
+    radices = np.full(n_dimensions, n_choices, dtype=np.int64)
+    radices[:n_choices_w_exp] = maximum_exp - minimal_initial_experience + 1
+    strides = np.ones(n_dimensions, dtype=np.int64)
+    for i in range(n_dimensions - 2, -1, -1):
+        strides[i] = strides[i + 1] * radices[i + 1]
+    size = strides[0] * radices[0] if n_dimensions else 1
+    is_written = np.zeros(size, dtype=np.bool_)
+
+    out = np.empty((0, n_columns), dtype=DTYPE_STATES)
+    for pass_ in range(2):
+        row = 0
+        start = 0
+        while start < n_states:
+            period = states[start, 0]
+            end = start
+            while end < n_states and states[end, 0] == period:
+                end += 1
+
+            for i in range(start, end):
+                for j in range(n_combinations):
+                    position = 0
+                    is_admissible = True
+                    for k in range(n_choices_w_exp):
+                        exp = states[i, 1 + k] + initial_experiences[j, k]
+                        if exp > maximum_exp[k]:
+                            is_admissible = False
+                            break
+                        position += (exp - minimal_initial_experience[k]) * strides[k]
+                    if not is_admissible:
+                        continue
+                    for k in range(n_choices_w_exp, n_dimensions):
+                        position += states[i, 1 + k] * strides[k]
+
+                    if not is_written[position]:
+                        is_written[position] = True
+                        if pass_ == 1:
+                            out[row, 0] = period
+                            for k in range(n_choices_w_exp):
+                                out[row, 1 + k] = (
+                                    states[i, 1 + k] + initial_experiences[j, k]
+                                )
+                            for k in range(n_choices_w_exp, n_dimensions):
+                                out[row, 1 + k] = states[i, 1 + k]
+                        row += 1
+
+            is_written[:] = False
+            start = end
+
+        if pass_ == 0:
+            out = np.empty((row, n_columns), dtype=DTYPE_STATES)
+
+    return out
 
 
 def _create_dense_state_space_grid(optim_paras):
@@ -732,12 +1205,13 @@ def create_is_inadmissible(df, optim_paras, options):
     df = df.copy()
 
     for choice in optim_paras["choices"]:
-        df[f"_{choice}"] = False
-        for formula in options["negative_choice_set"][choice]:
-            try:
-                df[f"_{choice}"] |= df.eval(formula)
-            except pd.core.computation.ops.UndefinedVariableError:
-                pass
+        is_inadmissible = np.zeros(len(df), dtype=np.bool_)
+        for formula in options["compiled_negative_choice_set"][choice]:
+            # Formulas might refer to variables which are not part of the states, e.g.,
+            # dense variables while the choice sets of the core states are computed.
+            if formula.is_defined_for(df):
+                is_inadmissible |= formula(df)
+        df[f"_{choice}"] = is_inadmissible
 
     return df
 
@@ -747,23 +1221,22 @@ def _create_indexer(core, core_key_to_core_indices, optim_paras):
 
     Returns
     -------
-    indexer :  numba.typed.Dict
+    indexer : StateIndexer
         Maps a row of the core state space into its position within the
         period_choice_cores. c: core_state -> (core_key,core_index)
 
     """
     core_columns = ["period"] + create_core_state_space_columns(optim_paras)
-    n_core_state_variables = len(core_columns)
 
-    indexer = Dict.empty(
-        key_type=nb.types.UniTuple(nb.types.int64, n_core_state_variables),
-        value_type=nb.types.UniTuple(nb.types.int64, 2),
-    )
+    indices = [np.asarray(indices) for indices in core_key_to_core_indices.values()]
+    n_states_per_core_key = [len(i) for i in indices]
+    indices = np.concatenate(indices)
+    core_keys = np.repeat(list(core_key_to_core_indices), n_states_per_core_key)
+    core_indices = np.concatenate([np.arange(n) for n in n_states_per_core_key])
+
+    states = core.loc[indices, core_columns].to_numpy(dtype=np.int64)
+    indexer = StateIndexer(states, np.column_stack((core_keys, core_indices)))
 
-    for core_idx, indices in core_key_to_core_indices.items():
-        states = core.loc[indices, core_columns].to_numpy()
-        for i, state in enumerate(states):
-            indexer[tuple(state)] = (core_idx, i)
     return indexer
 
 
@@ -813,146 +1286,198 @@ def _create_dense_period_choice(
             )
         dense_period_choice = {k: i for i, k in core_key_to_complex.items()}
     else:
-        choices = [f"_{choice}" for choice in optim_paras["choices"]]
+        core_key_to_core_positions = {
+            core_key: core.index.get_indexer(indices)
+            for core_key, indices in core_key_to_core_indices.items()
+        }
+        dense_index_to_dense_vector = dict(enumerate(dense.values()))
+
+        dense_index_to_choice_sets = _create_choice_sets_for_dense_vector(
+            dense_index_to_dense_vector,
+            {i: i for i in dense_index_to_dense_vector},
+            optim_paras,
+            options,
+            bypass={
+                "core": core,
+                "core_key_to_complex": core_key_to_complex,
+                "core_key_to_core_positions": core_key_to_core_positions,
+            },
+        )
+
         dense_period_choice = {}
-        for dense_idx, (_, dense_vec) in enumerate(dense.items()):
-            states = core.copy()
-            for key in dense_vec.keys():
-                states[key] = dense_vec[key]
-            states = core.copy().assign(**dense_vec)
-            states = compute_covariates(states, options["covariates_all"])
-
-            states = create_is_inadmissible(states, optim_paras, options)
-            for core_idx, indices in core_key_to_core_indices.items():
-                df = states.copy().loc[indices]
-                for key in dense_vec.keys():
-                    df[key] = dense_vec[key]
-                for choice in choices:
-                    df[choice] = df[choice].replace({True:False, False:True})
-                
-                unique_combinations = df.drop_duplicates(subset=choices)[choices]
-                choice_combs = []
-                for ix in unique_combinations.index:
-                    choice_combs.append(unique_combinations.loc[ix,choices].values)
-                grouper = {}
-                
-                for comb in choice_combs:
-                    filter_ = (df[choices] == comb).all(axis=1)
-                    grouper[tuple(comb)] = list(df[filter_].index)
-
-                if not len(grouper) == 1:
-                    raise ValueError(
-                        "Choice restrictions cannot interact between core and dense "
-                        "information such that heterogeneous choice sets within a "
-                        "period are created. Use penalties in the utility functions "
-                        "for that."
-                    )
-                period_choice = {
-                    (core_key_to_complex[core_idx][0], idx, dense_idx): core_idx
-                    for idx, indices in grouper.items()
-                }
-
-                dense_period_choice = {**dense_period_choice, **period_choice}
-                idx = list(grouper.keys())[0]
-                dump_objects(
-                    df,
-                    "states",
-                    (core_key_to_complex[core_idx][0], idx, dense_idx),
-                    options,
-                )
+        for dense_idx in dense_index_to_dense_vector:
+            choice_sets = dense_index_to_choice_sets[dense_idx]
+            for core_key, choice_set in zip(core_key_to_complex, choice_sets):
+                period = core_key_to_complex[core_key][0]
+                dense_period_choice[period, tuple(choice_set), dense_idx] = core_key
 
     return dense_period_choice
 
 
 @parallelize_across_dense_dimensions
-def _get_continuation_values(
-    dense_complex_index,
-    choice_set,
-    core_indices,
-    child_indices,
-    core_index_and_dense_vector_to_dense_index,
-    expected_value_functions,
+def _create_choice_sets_for_dense_vector(
+    dense_vector,
+    dense_idx,
+    optim_paras,
+    options,
+    core,
+    core_key_to_complex,
+    core_key_to_core_positions,
 ):
-    """Get continuation values from child states.
+    """Create the choice sets of all core keys for one dense vector.
 
-    The continuation values are the discounted expected value functions from child
-    states. This method allows to retrieve continuation values that were obtained in the
-    model solution. In particular the function assigns continuation values to state
-    choice combinations by using the child indices created in
-    :func:`_collect_child_indices`.
+    The choice restrictions are evaluated once for the whole core state space combined
+    with the dense vector. Afterwards, the choice set of each core key is obtained by
+    reducing the admissible choices over its states. The states of each combination of
+    core key and dense vector are stored on disk.
 
     Returns
     -------
-    continuation_values : numpy.ndarray
-        Array with shape ``(n_states, n_choices)``. Maps core_key and choice into
-        continuation value.
+    choice_sets : numpy.ndarray
+        Boolean array with shape ``(n_core_keys, n_choices)`` which contains the choice
+        set of each core key in the order of ``core_key_to_complex``.
 
     """
-    if len(dense_complex_index) == 3:
-        period, _, dense_idx = dense_complex_index
-    elif len(dense_complex_index) == 2:
-        period, _ = dense_complex_index
-        dense_idx = 0
+    choices = [f"_{choice}" for choice in optim_paras["choices"]]
+
+    states = core.assign(**dense_vector)
+    states = compute_covariates(states, options["covariates_all"])
+    states = create_is_inadmissible(states, optim_paras, options)
+    states[choices] = ~states[choices]
+
+    is_admissible = states[choices].to_numpy()
+
+    choice_sets = np.zeros((len(core_key_to_complex), len(choices)), dtype=np.bool_)
+    for i, core_key in enumerate(core_key_to_complex):
+        positions = core_key_to_core_positions[core_key]
+        is_admissible_for_core_key = is_admissible[positions]
+        choice_set = is_admissible_for_core_key.all(axis=0)
+
+        if not (choice_set == is_admissible_for_core_key.any(axis=0)).all():
+            raise ValueError(
+                "Choice restrictions cannot interact between core and dense "
+                "information such that heterogeneous choice sets within a "
+                "period are created. Use penalties in the utility functions "
+                "for that."
+            )
+
+        choice_sets[i] = choice_set
+        dump_objects(
+            states.iloc[positions],
+            "states",
+            (core_key_to_complex[core_key][0], tuple(choice_set), dense_idx),
+            options,
+        )
 
-    n_choices = sum_over_numba_boolean_unituple(choice_set)
+    return choice_sets
 
-    n_states = core_indices.shape[0]
 
-    continuation_values = np.zeros((len(core_indices), n_choices))
-    for i in range(n_states):
-        for j in range(n_choices):
-            core_idx, row_idx = child_indices[i, j]
-            idx = (core_idx, dense_idx)
-            dense_choice = core_index_and_dense_vector_to_dense_index[idx]
+def _create_flat_layout(
+    expected_value_functions,
+    dense_key_to_complex,
+    dense_key_to_choice_set,
+    child_pointers,
+    n_periods,
+):
+    """Create the layout of all states in flat arrays.
 
-            continuation_values[i, j] = expected_value_functions[dense_choice][row_idx]
+    See :meth:`StateSpace.get_flat_layout` for a description of the layout.
 
-    return continuation_values
+    """
+    locations = expected_value_functions.locations
+    buffers = expected_value_functions.buffers
 
+    period_starts = np.zeros(n_periods + 1, dtype=np.int64)
+    period_starts[1:] = np.cumsum(
+        [buffers[p].size if p in buffers else 0 for p in range(n_periods)]
+    )
 
-@parallelize_across_dense_dimensions
-def _collect_child_indices(complex_, choice_set, indexer, optim_paras, options):
+    dense_keys = sorted(locations, key=lambda key: locations[key][:2])
+    n_states = np.array([locations[key][2][0] for key in dense_keys], dtype=np.int64)
+    n_choices = np.array(
+        [sum(dense_key_to_choice_set[key]) for key in dense_keys], dtype=np.int64
+    )
+    state_offsets = np.array(
+        [period_starts[locations[key][0]] + locations[key][1] for key in dense_keys],
+        dtype=np.int64,
+    )
+    choice_offsets = np.zeros(len(dense_keys), dtype=np.int64)
+    choice_offsets[1:] = np.cumsum(n_states * n_choices)[:-1]
+    state_to_position = np.repeat(np.arange(len(dense_keys)), n_states)
+
+    # Shift the pointers into the buffers of the next period to the flat array.
+    flat_child_pointers = np.full((n_states * n_choices).sum(), -1, dtype=np.int64)
+    for position, dense_key in enumerate(dense_keys):
+        period = dense_key_to_complex[dense_key][0]
+        if period == n_periods - 1:
+            continue
+
+        pointers = child_pointers[dense_key].ravel()
+        start = choice_offsets[position]
+        flat_child_pointers[start : start + len(pointers)] = (
+            period_starts[period + 1] + pointers
+        )
+
+    return {
+        "dense_keys": dense_keys,
+        "period_starts": period_starts,
+        "state_offsets": state_offsets,
+        "n_states": n_states,
+        "n_choices": n_choices,
+        "choice_offsets": choice_offsets,
+        "state_to_position": state_to_position,
+        "child_pointers": flat_child_pointers,
+    }
+
+
+def _collect_child_indices(states, choice_set, indexer, optim_paras):
     """Collect child indices for states.
 
-    The function takes the states of one dense key, applies the law of motion for each
-    available choice and maps the resulting states to core keys and core indices.
+    The function takes the core states of one core key, applies the law of motion for
+    each available choice and maps the resulting states to core keys and core indices.
+    Instead of :func:`~respy.shared.apply_law_of_motion_for_core`, the law of motion is
+    applied to an integer array which holds the states of all choices at once.
 
     Parameters
     ----------
-    complex_ : tuple
-        See :ref:`complex`.
+    states : numpy.ndarray
+        Array with shape ``(n_states, n_core_columns)`` containing the period,
+        experiences and lagged choices of the states.
     choice_set : tuple
         Tuple representing admissible choices
-    indexer : numba.typed.Dict
-        A dictionary with core states as keys and the core key and core index as values.
+    indexer : StateIndexer
+        Maps core states to the core key and core index.
     optim_paras : dict
         Contains model parameters.
-    options : dict
-        Contains model options.
 
     Returns
     -------
     indices : numpy.ndarray
-        Array with shape ``(n_states, n_choices * 2)``. Represents the mapping
-        (core_index, choice) -> (dense_key, core_index).
+        Array with shape ``(n_states, n_choices, 2)``. Represents the mapping
+        (core_index, choice) -> (core_key, core_index).
 
     """
-    core_columns = create_core_state_space_columns(optim_paras)
-    states = load_objects("states", complex_, options)
+    n_choices_w_exp = len(optim_paras["choices_w_exp"])
+    n_lagged_choices = optim_paras["n_lagged_choices"]
+    n_states, n_columns = states.shape
 
-    n_choices = sum(choice_set)
-    indices = np.full((states.shape[0], n_choices, 2), -1, dtype=np.int64)
+    valid_choices = np.flatnonzero(choice_set)
+    n_choices = valid_choices.shape[0]
 
-    indices_valid_choices = [i for i, is_valid in enumerate(choice_set) if is_valid]
-    for i, choice in enumerate(indices_valid_choices):
-        states_ = states.copy(deep=True)
+    children = np.repeat(states[:, np.newaxis, :], n_choices, axis=1)
 
-        states_["choice"] = choice
-        states_ = apply_law_of_motion_for_core(states_, optim_paras)
-        states_ = states_[["period"] + core_columns]
+    children[:, :, 0] += 1
 
-        indices[:, i, 0], indices[:, i, 1] = map_states_to_core_key_and_core_index(
-            states_.to_numpy(), indexer
-        )
+    is_choice_w_exp = valid_choices < n_choices_w_exp
+    children[:, is_choice_w_exp, 1 + valid_choices[is_choice_w_exp]] += 1
+
+    if n_lagged_choices:
+        position = 1 + n_choices_w_exp
+        children[:, :, position + 1 :] = children[:, :, position:-1]
+        children[:, :, position] = valid_choices
+
+    indices = indexer.lookup(children.reshape(-1, n_columns)).reshape(
+        n_states, n_choices, 2
+    )
 
     return indices
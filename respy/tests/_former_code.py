@@ -1,4 +1,7 @@
+import itertools
+
 import numpy as np
+import pandas as pd
 from numba import njit
 
 from respy.config import INDEXER_DTYPE
@@ -488,3 +491,67 @@ def _create_state_space_kw97_extended(n_periods, n_types, edu_starts, edu_max):
     states = np.array(data)
 
     return states, indexer
+
+
+def _create_core_state_space_with_product(optim_paras, options):
+    """Create the core state space from the Cartesian product of experiences.
+
+    This is the former implementation of
+    :func:`respy.state_space._create_core_state_space`. For each period, all
+    combinations of experiences are created with :func:`itertools.product` and states
+    whose sum of experiences exceeds the period are discarded afterwards. Initial
+    experiences are added by copying the state space for every combination of initial
+    experiences and dropping duplicates.
+
+    """
+    choices = optim_paras["choices"]
+    choices_w_exp = list(optim_paras["choices_w_exp"])
+    minimal_initial_experience = np.array(
+        [min(choices[choice]["start"]) for choice in choices_w_exp], dtype=np.uint8
+    )
+    maximum_exp = np.array(
+        [choices[choice]["max"] for choice in choices_w_exp], dtype=np.uint8
+    )
+    additional_exp = maximum_exp - minimal_initial_experience
+    exp_cols = [f"exp_{choice}" for choice in choices_w_exp]
+
+    container = []
+    for period in np.arange(optim_paras["n_periods"], dtype=np.uint8):
+        set_choices = [list(range(x + 1)) for x in additional_exp]
+        list_comb = list(itertools.product(*set_choices))
+        data = np.array(list_comb).reshape(len(list_comb), len(additional_exp))
+        data = data[data.sum(axis=1) <= period]
+
+        df_ = pd.DataFrame(data=data, columns=exp_cols)
+        df_.insert(0, "period", period)
+        container.append(df_)
+
+    df = pd.concat(container, axis="rows", sort=False)
+
+    container = []
+    for lag in range(1, optim_paras["n_lagged_choices"] + 1):
+        for choice_code in range(len(choices)):
+            df_ = df.copy()
+            df_[f"lagged_choice_{lag}"] = choice_code
+            container.append(df_)
+
+    df = pd.concat(container, axis="rows", sort=False) if container else df
+
+    for definition in options["core_state_space_filters"]:
+        df = df.loc[~df.eval(definition)]
+
+    initial_experiences_combinations = itertools.product(
+        *[choices[choice]["start"] for choice in choices_w_exp]
+    )
+
+    container = []
+    for initial_exp in initial_experiences_combinations:
+        df_ = df.copy()
+        df_[exp_cols] += initial_exp
+        df_ = df_.loc[df_[exp_cols].le(maximum_exp).all(axis="columns")].copy()
+        container.append(df_)
+
+    df = pd.concat(container, axis="rows", sort=False).drop_duplicates()
+    df = df.sort_values("period").reset_index(drop=True)
+
+    return df
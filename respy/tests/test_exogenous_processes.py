@@ -121,3 +121,18 @@ def test_weight_continuation_values_with_inadmissible_choices(model_with_two_exo
         assert np.allclose(continuation_values[period + 5], 1.4)
         assert np.allclose(continuation_values[period + 10], 1.4)
         assert np.allclose(continuation_values[period + 15], 1.4)
+
+
+@pytest.mark.parametrize("cache_backend", ["memory", "mmap"])
+def test_cache_backends_reproduce_parquet(model_with_two_exog_proc, cache_backend):
+    """State stores yield the same simulated data as parquet files."""
+    params, options = model_with_two_exog_proc
+    options["n_periods"] = 3
+
+    simulate = get_simulate_func(params, {**options, "cache_backend": "parquet"})
+    df = simulate(params)
+
+    simulate = get_simulate_func(params, {**options, "cache_backend": cache_backend})
+    df_ = simulate(params)
+
+    pd.testing.assert_frame_equal(df, df_)
@@ -67,3 +67,25 @@ def test_logsumexp(array):
     result = _logsumexp(array)
 
     np.testing.assert_allclose(result, expected)
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("model", ["kw_94_one", "kw_97_basic"])
+def test_single_precision_likelihood_is_close_to_double_precision(model):
+    params, options = process_model_or_seed(model)
+    options["n_periods"] = 5
+
+    simulate = get_simulate_func(params, options)
+    df = simulate(params)
+
+    log_like = get_log_like_func(params, options, df, return_scalar=False)
+    expected = log_like(params)
+
+    options["precision"] = "float32"
+    log_like = get_log_like_func(params, options, df, return_scalar=False)
+    result = log_like(params)
+
+    state_space = log_like.keywords["solve"].keywords["state_space"]
+    for store in [state_space.wages, state_space.nonpecs]:
+        assert all(buffer.dtype == np.float32 for buffer in store.buffers.values())
+    np.testing.assert_allclose(result, expected, rtol=1e-5)
@@ -1,6 +1,7 @@
 """Test model generation."""
 import io
 import textwrap
+import warnings
 
 import numpy as np
 import pandas as pd
@@ -16,7 +17,11 @@ from respy.pre_processing.model_processing import _parse_initial_and_max_experie
 from respy.pre_processing.model_processing import _parse_measurement_errors
 from respy.pre_processing.model_processing import _parse_observables
 from respy.pre_processing.model_processing import _parse_shocks
+from respy.pre_processing.model_processing import create_parameter_plan
 from respy.pre_processing.model_processing import process_params_and_options
+from respy.pre_processing.model_processing import process_params_with_plan
+from respy.shared import CompiledFormula
+from respy.state_space import create_is_inadmissible
 from respy.tests.random_model import generate_random_model
 from respy.tests.random_model import simulate_truncated_data
 from respy.tests.utils import process_model_or_seed
@@ -259,3 +264,97 @@ def test_add_default_is_inadmissible(optim_paras, expected):
     options = {"negative_choice_set": {}}
     result = _add_default_is_inadmissible(options, optim_paras)
     assert result == expected
+
+
+@pytest.mark.unit
+@pytest.mark.precise
+@pytest.mark.parametrize(
+    "formula",
+    [
+        "False",
+        "period == 0",
+        "period > 0 & exp_a == 0",
+        "period > 0 and exp_a == 0 | lagged_choice_1 != 1",
+        "~(exp_a + exp_b >= period)",
+        "not 0 < exp_b <= 2",
+        "lagged_choice_1 in [0, 2]",
+        "lagged_choice_1 not in (0, 2)",
+        "exp_a ** 2 - 2 * exp_b == period % 3",
+        "abs(exp_a - exp_b) > 1",
+    ],
+)
+def test_compiled_formula_is_equal_to_pandas_eval(formula):
+    np.random.seed(0)
+    df = pd.DataFrame(
+        np.random.randint(0, 4, size=(100, 4)),
+        columns=["period", "exp_a", "exp_b", "lagged_choice_1"],
+    )
+
+    compiled_formula = CompiledFormula(formula)
+    expected = np.broadcast_to(df.eval(formula), len(df))
+
+    np.testing.assert_array_equal(compiled_formula(df), expected)
+    assert compiled_formula.is_defined_for(df)
+    assert not compiled_formula.is_defined_for(df[[]]) or formula == "False"
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "formula", ["exp_c == 0", "`exp_c` == 0", "period > 0 & `exp_c` == 0"]
+)
+def test_inadmissible_states_skip_formulas_with_missing_columns(formula):
+    df = pd.DataFrame({"period": [0, 1, 2], "exp_a": [0, 0, 1]})
+    optim_paras = {"choices": {"a": {}, "b": {}}}
+    options = {
+        "compiled_negative_choice_set": {
+            "a": [CompiledFormula(formula), CompiledFormula("`exp_a` == 0")],
+            "b": [CompiledFormula(formula)],
+        }
+    }
+
+    assert not CompiledFormula(formula).is_defined_for(df)
+
+    df = create_is_inadmissible(df, optim_paras, options)
+
+    np.testing.assert_array_equal(df["_a"], [True, True, False])
+    np.testing.assert_array_equal(df["_b"], [False, False, False])
+
+
+def _assert_nested_objects_equal(a, b):
+    assert type(a) is type(b)
+    if isinstance(a, dict):
+        assert list(a) == list(b)
+        for key in a:
+            _assert_nested_objects_equal(a[key], b[key])
+    elif isinstance(a, pd.Series):
+        pd.testing.assert_series_equal(a, b, check_exact=True)
+    elif isinstance(a, np.ndarray):
+        np.testing.assert_array_equal(a, b)
+    else:
+        assert a == b
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("model_or_seed", EXAMPLE_MODELS)
+def test_parameter_plan_is_equal_to_processing_params_and_options(model_or_seed):
+    params, options = process_model_or_seed(model_or_seed)
+    _, options = process_params_and_options(params, options)
+
+    plan = create_parameter_plan(params, options)
+
+    is_free = ~params.index.get_level_values("category").isin(["maximum_exp"])
+    is_free &= ~params.index.get_level_values("name").str.startswith("corr")
+    params.loc[is_free, "value"] *= np.random.uniform(0.9, 1.1, size=is_free.sum())
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        optim_paras, options_ = process_params_and_options(params, options)
+        optim_paras_plan, options_plan = process_params_with_plan(
+            params, options, plan
+        )
+
+    _assert_nested_objects_equal(optim_paras, optim_paras_plan)
+    assert set(options_) == set(options_plan)
+    assert next(options_["solution_seed_iteration"]) == next(
+        options_plan["solution_seed_iteration"]
+    )
@@ -1,10 +1,25 @@
+import pickle
+
 import numba as nb
+import numpy as np
+import pandas as pd
 import pytest
 from numba.typed import Dict
 
+from respy.interface import get_example_model
+from respy.likelihood import get_log_like_func
+from respy.parallelization import _ATTACHED_SEGMENTS
+from respy.parallelization import _detach_shared_arrays
+from respy.parallelization import _dumps_with_shared_memory
 from respy.parallelization import _infer_dense_keys_from_arguments
 from respy.parallelization import _is_dense_dictionary_argument
 from respy.parallelization import _is_dictionary_with_integer_keys
+from respy.parallelization import _schedule_dense_keys
+from respy.parallelization import _split_thread_budget
+from respy.parallelization import num_threads
+from respy.parallelization import set_num_threads
+from respy.shared import DenseKeyStore
+from respy.simulate import get_simulate_func
 
 
 def _typeddict_wo_integer_keys():
@@ -54,3 +69,126 @@ def test_infer_dense_keys_from_arguments(args, kwargs, expected):
 def test_is_dense_dictionary_argument(arg, dense_keys, expected):
     result = _is_dense_dictionary_argument(arg, dense_keys)
     assert result is expected
+
+
+def _get_model_with_exogenous_process():
+    params, options = get_example_model("robinson_crusoe_basic", with_data=False)
+    params.loc[("nonpec_fishing", "sick"), "value"] = -2
+    params.loc[("observable_illness_sick", "probability"), "value"] = 0.1
+    params.loc[("observable_illness_healthy", "probability"), "value"] = 0.9
+    params.loc[("exogenous_process_illness_sick", "probability"), "value"] = 0.1
+    params.loc[("exogenous_process_illness_healthy", "probability"), "value"] = 0.9
+    options["covariates"]["sick"] = "illness == 'sick'"
+
+    return params, options
+
+
+@pytest.mark.end_to_end
+@pytest.mark.parametrize("backend", ["threads", "processes", "loky"])
+@pytest.mark.parametrize(
+    "model", ["robinson_crusoe_with_observed_characteristics", "exogenous_process"]
+)
+def test_parallel_backends_reproduce_serial_execution(model, backend):
+    if model == "exogenous_process":
+        params, options = _get_model_with_exogenous_process()
+    else:
+        params, options = get_example_model(model, with_data=False)
+    options["n_periods"] = 3
+    options["simulation_agents"] = 100
+
+    results = []
+    for parallel in ["serial", {"backend": backend, "n_jobs": 2}]:
+        options["parallel"] = parallel
+        simulate = get_simulate_func(params, options)
+        df = simulate(params)
+        log_like = get_log_like_func(params, options, df)
+        results.append((df, log_like(params)))
+
+    pd.testing.assert_frame_equal(results[0][0], results[1][0])
+    assert results[0][1] == results[1][1]
+
+
+@pytest.mark.unit
+def test_large_arrays_are_shared_once_and_attached_without_copies():
+    buffer_ = np.arange(20_000, dtype=np.float64)
+    store = DenseKeyStore({0: buffer_}, {0: (0, 0, (5_000,)), 1: (0, 5_000, (15_000,))})
+    small = np.arange(3)
+    obj = {"store": store, "views": (store[0], store[1][::2]), "small": small}
+
+    segments = {}
+    payload = _dumps_with_shared_memory(obj, segments)
+    try:
+        assert len(segments) == 1
+        assert len(payload) < small.nbytes + 2_000
+
+        loaded = pickle.loads(payload)
+        for view, expected in zip(loaded["views"], obj["views"]):
+            np.testing.assert_array_equal(view, expected)
+            assert not view.flags.writeable
+        np.testing.assert_array_equal(loaded["store"][1], store[1])
+        assert np.shares_memory(loaded["store"].buffers[0], loaded["views"][1])
+        np.testing.assert_array_equal(loaded["small"], small)
+
+        del loaded, view
+        _detach_shared_arrays()
+        assert not _ATTACHED_SEGMENTS
+    finally:
+        for segment, _ in segments.values():
+            segment.close()
+            segment.unlink()
+
+
+@pytest.mark.unit
+def test_schedule_covers_every_row_of_every_dense_key_once(seed):
+    np.random.seed(seed)
+    sizes = {idx: int(size) for idx, size in enumerate(np.random.randint(1, 500, 20))}
+    n_rows = {idx: sizes[idx] // 10 for idx in sizes if idx % 2 == 0}
+
+    for task_size in ["auto", 50]:
+        tasks, statistics = _schedule_dense_keys(sizes, n_rows, task_size, n_jobs=3)
+
+        covered = {idx: np.zeros(n_rows.get(idx, 1), dtype=int) for idx in sizes}
+        for task in tasks:
+            for idx, rows in task:
+                covered[idx][slice(None) if rows is None else rows] += 1
+        assert all((counts == 1).all() for counts in covered.values())
+
+        task_sizes = [
+            sum(
+                sizes[idx]
+                if rows is None
+                else sizes[idx] * (rows.stop - rows.start) / n_rows[idx]
+                for idx, rows in task
+            )
+            for task in tasks
+        ]
+        assert task_sizes == sorted(task_sizes, reverse=True)
+        assert statistics["n_tasks"] == len(tasks)
+        assert statistics["load_imbalance"] >= 1
+
+
+@pytest.mark.unit
+def test_number_of_threads_is_restored_after_context():
+    previous = nb.get_num_threads()
+    with num_threads(1):
+        assert nb.get_num_threads() == 1
+        assert _split_thread_budget(4) == (1, 1)
+        assert _split_thread_budget(-1) == (1, 1)
+    assert nb.get_num_threads() == previous
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "budget, n_jobs, expected",
+    [(8, 2, (2, 4)), (8, -1, (8, 1)), (8, 16, (8, 1)), (6, 4, (4, 1))],
+)
+def test_split_thread_budget_between_workers_and_threads(budget, n_jobs, expected):
+    with num_threads(budget):
+        assert _split_thread_budget(n_jobs) == expected
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("n_threads", [0, -2, 1.5, "all"])
+def test_invalid_number_of_threads_raises_error(n_threads):
+    with pytest.raises(ValueError):
+        set_num_threads(n_threads)
@@ -1,3 +1,9 @@
+import functools
+import pickle
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+
 import numpy as np
 import pytest
 
@@ -5,14 +11,30 @@ from respy.config import EXAMPLE_MODELS
 from respy.config import INDEXER_INVALID_INDEX
 from respy.config import KEANE_WOLPIN_1994_MODELS
 from respy.config import KEANE_WOLPIN_1997_MODELS
+from respy.likelihood import get_log_like_func
 from respy.pre_processing.model_checking import check_model_solution
 from respy.pre_processing.model_processing import process_params_and_options
+from respy.shared import DenseKeyStore
+from respy.shared import StateIndexer
+from respy.shared import calculate_expected_value_functions
+from respy.shared import calculate_expected_value_functions_adaptively
+from respy.shared import calculate_expected_value_functions_with_clark
+from respy.shared import calculate_expected_value_functions_with_control_variate
+from respy.shared import create_base_draws
+from respy.shared import create_base_quadrature
 from respy.shared import create_core_state_space_columns
+from respy.shared import load_objects
+from respy.shared import pandas_dot
+from respy.shared import select_valid_choices
+from respy.shared import transform_base_draws_with_cholesky_factor
+from respy.simulate import get_simulate_func
+from respy.solve import _transform_base_draws_of_solution
 from respy.solve import get_solve_func
 from respy.state_space import _create_core_period_choice
 from respy.state_space import _create_core_state_space
 from respy.state_space import _create_indexer
 from respy.state_space import create_state_space_class
+from respy.tests._former_code import _create_core_state_space_with_product
 from respy.tests._former_code import _create_state_space_kw94
 from respy.tests._former_code import _create_state_space_kw97_base
 from respy.tests._former_code import _create_state_space_kw97_extended
@@ -104,6 +126,96 @@ def test_invariance_of_solution(model_or_seed):
         )
 
 
+@pytest.mark.integration
+@pytest.mark.parametrize("model_or_seed", ["kw_2000", "robinson_crusoe_basic"])
+def test_state_space_is_loaded_from_artifact(model_or_seed, monkeypatch):
+    """The second build of a state space with the same structure loads the artifact."""
+    params, options = process_model_or_seed(model_or_seed)
+    options["cache_state_space"] = True
+
+    solve = get_solve_func(params, options)
+    state_space = solve(params)
+
+    def _raise_error(*args, **kwargs):
+        raise AssertionError("The state space was created again.")
+
+    monkeypatch.setattr("respy.state_space._create_state_space", _raise_error)
+
+    params.loc[("delta", "delta"), "value"] = 0.5
+    solve = get_solve_func(params, options)
+    state_space_ = solve(params)
+
+    for attribute in ["core", "dense_key_to_core_indices", "base_draws_sol"]:
+        apply_to_attributes_of_two_state_spaces(
+            getattr(state_space, attribute),
+            getattr(state_space_, attribute),
+            np.testing.assert_array_equal,
+        )
+    assert dict(state_space.indexer) == dict(state_space_.indexer)
+
+    options["n_periods"] += 1
+    with pytest.raises(AssertionError, match="The state space was created again."):
+        get_solve_func(params, options)
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("cache_backend", ["parquet", "memory", "mmap"])
+def test_building_the_same_state_space_again_keeps_its_directory(
+    cache_backend, monkeypatch
+):
+    params, options = process_model_or_seed("robinson_crusoe_basic")
+    options["n_periods"] = 3
+    options["cache_backend"] = cache_backend
+
+    solve = get_solve_func(params, options)
+    expected = {
+        key: value.copy()
+        for key, value in solve(params).expected_value_functions.items()
+    }
+    directory = solve.keywords["options"]["state_space_path"]
+
+    removed_directories = []
+    rmtree = shutil.rmtree
+
+    def _record_and_rmtree(path, *args, **kwargs):
+        removed_directories.append(Path(path))
+        rmtree(path, *args, **kwargs)
+
+    monkeypatch.setattr(shutil, "rmtree", _record_and_rmtree)
+
+    state_space = get_solve_func(params, options)(params)
+
+    assert directory not in removed_directories
+    assert not list(directory.parent.glob(f"{directory.name}-*"))
+    for state_space_ in [state_space, solve(params)]:
+        apply_to_attributes_of_two_state_spaces(
+            state_space_.expected_value_functions,
+            expected,
+            np.testing.assert_array_equal,
+        )
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("integration", ["monte_carlo", "gauss_hermite", "clark"])
+def test_loaded_state_space_advances_seeds_like_created_state_space(
+    integration, tmp_path
+):
+    params, options = process_model_or_seed("robinson_crusoe_basic")
+    options["n_periods"] = 3
+    options["cache_state_space"] = True
+    options["cache_path"] = tmp_path
+    options["solution_integration"] = integration
+
+    seeds = []
+    for _ in range(2):
+        optim_paras, options_ = process_params_and_options(params, options)
+        create_state_space_class(optim_paras, options_)
+        seeds.append(next(options_["solution_seed_startup"]))
+
+    assert (options_["state_space_path"] / "state_space.pickle").exists()
+    assert seeds[0] == seeds[1]
+
+
 @pytest.mark.precise
 @pytest.mark.unit
 @pytest.mark.parametrize("model", KEANE_WOLPIN_1994_MODELS)
@@ -233,6 +345,506 @@ def test_create_state_space_vs_specialized_kw97(model):
             assert tuple(index) in indexer.keys()
 
 
+@pytest.mark.precise
+@pytest.mark.unit
+@pytest.mark.parametrize("model_or_seed", EXAMPLE_MODELS)
+def test_create_core_state_space_vs_former_implementation(model_or_seed):
+    """Direct enumeration yields the same states as the Cartesian product."""
+    params, options = process_model_or_seed(model_or_seed)
+    optim_paras, options = process_params_and_options(params, options)
+
+    core = _create_core_state_space(optim_paras, options)
+    core_former = _create_core_state_space_with_product(optim_paras, options)
+
+    assert core.columns.tolist() == core_former.columns.tolist()
+    assert not core.duplicated().any()
+    assert core["period"].is_monotonic_increasing
+
+    states = set(map(tuple, core.to_numpy().tolist()))
+    states_former = set(map(tuple, core_former.to_numpy().tolist()))
+    assert states == states_former
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "min_lookup_size, max_n_codes", [(2 ** 16, 2 ** 62), (0, 2 ** 62), (0, 0)]
+)
+def test_state_indexer_with_lookup_array_hash_table_and_typed_dict(
+    monkeypatch, min_lookup_size, max_n_codes
+):
+    """All storage backends of the state indexer map the core states identically."""
+    monkeypatch.setattr("respy.shared.INDEXER_MIN_LOOKUP_SIZE", min_lookup_size)
+    monkeypatch.setattr("respy.shared._MAX_N_CODES", max_n_codes)
+
+    params, options = process_model_or_seed("kw_97_basic")
+    options["n_periods"] = 10
+    optim_paras, options = process_params_and_options(params, options)
+
+    core = _create_core_state_space(optim_paras, options)
+    core_columns = ["period"] + create_core_state_space_columns(optim_paras)
+    states = core[core_columns].to_numpy()
+    values = np.column_stack((np.arange(len(core)), np.arange(len(core))[::-1]))
+
+    indexer = StateIndexer(states, values)
+
+    assert len(indexer) == len(core)
+    assert set(indexer.keys()) == set(map(tuple, states.tolist()))
+    np.testing.assert_array_equal(indexer.lookup(states[::-1]), values[::-1])
+    assert indexer[tuple(states[3])] == tuple(values[3])
+    assert (0,) * len(core_columns) not in indexer
+    with pytest.raises(KeyError):
+        indexer.lookup(np.zeros((1, len(core_columns))))
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("model_or_seed", ["kw_97_basic", "robinson_crusoe_extended"])
+def test_attributes_of_dense_keys_are_stored_contiguously_per_period(model_or_seed):
+    """Period slices of state space attributes are views on one buffer per period."""
+    params, options = process_model_or_seed(model_or_seed)
+
+    solve = get_solve_func(params, options)
+    state_space = solve(params)
+
+    for attribute in ["wages", "nonpecs", "expected_value_functions", "base_draws_sol"]:
+        store = getattr(state_space, attribute)
+        assert isinstance(store, DenseKeyStore)
+        assert set(store) == set(state_space.dense_key_to_complex)
+
+        for period in range(options["n_periods"]):
+            period_store = state_space.get_attribute_from_period(attribute, period)
+            assert list(period_store) == state_space.get_dense_keys_from_period(period)
+            for key, array in period_store.items():
+                assert np.shares_memory(array, store.buffers[period])
+                assert np.shares_memory(array, store[key])
+
+    # Dense keys with the same core key and choice set share their child indices.
+    if options["n_periods"] > 1:
+        child_indices = pickle.loads(pickle.dumps(state_space.child_indices))
+        n_elements = sum(buffer.size for buffer in child_indices.buffers.values())
+        assert n_elements <= sum(array.size for array in child_indices.values())
+        for key, array in state_space.child_indices.items():
+            np.testing.assert_array_equal(child_indices[key], array)
+
+    period = options["n_periods"] - 1
+    state_space.expected_value_functions.get_period(period)[
+        state_space.get_dense_keys_from_period(period)[0]
+    ][:] = 1
+    assert state_space.expected_value_functions.buffers[period].any()
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize(
+    "model_or_seed",
+    ["kw_94_one", "kw_2000", "robinson_crusoe_with_observed_characteristics"],
+)
+def test_whole_horizon_solution_is_equal_to_solution_by_period(model_or_seed):
+    params, options = process_model_or_seed(model_or_seed)
+    options["n_periods"] = min(options["n_periods"], 5)
+    options["interpolation_points"] = -1
+
+    state_space = get_solve_func(params, options)(params)
+
+    options["solution_engine"] = "horizon"
+    state_space_ = get_solve_func(params, options)(params)
+
+    apply_to_attributes_of_two_state_spaces(
+        state_space.expected_value_functions,
+        state_space_.expected_value_functions,
+        np.testing.assert_array_equal,
+    )
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("model_or_seed", EXAMPLE_MODELS)
+def test_rewards_from_design_matrices_are_equal_to_rewards_from_states(
+    model_or_seed,
+):
+    params, options = process_model_or_seed(model_or_seed)
+    options["n_periods"] = min(options["n_periods"], 3)
+
+    state_space = get_solve_func(params, options)(params)
+    optim_paras, options = process_params_and_options(params, options)
+
+    for dense_key, complex_ in state_space.dense_key_to_complex.items():
+        states = load_objects("states", complex_, state_space.options)
+        choices = select_valid_choices(optim_paras["choices"], complex_[1])
+
+        for i, choice in enumerate(choices):
+            if f"wage_{choice}" in optim_paras:
+                log_wage = pandas_dot(states, optim_paras[f"wage_{choice}"])
+                np.testing.assert_allclose(
+                    state_space.wages[dense_key][:, i], np.exp(log_wage)
+                )
+            else:
+                assert (state_space.wages[dense_key][:, i] == 1).all()
+
+            nonpec = (
+                pandas_dot(states, optim_paras[f"nonpec_{choice}"])
+                if f"nonpec_{choice}" in optim_paras
+                else 0
+            )
+            np.testing.assert_allclose(
+                state_space.nonpecs[dense_key][:, i], nonpec, atol=1e-10
+            )
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("model_or_seed", ["kw_94_one", "kw_97_basic"])
+def test_continuation_values_are_cached_until_next_solution(model_or_seed):
+    params, options = process_model_or_seed(model_or_seed)
+    options["n_periods"] = 4
+
+    solve = get_solve_func(params, options)
+    state_space = solve(params)
+
+    continuation_values = state_space.get_continuation_values(0)
+    assert state_space.get_continuation_values(0) is continuation_values
+
+    params.loc["delta", "value"] = 0.5
+    state_space = solve(params)
+
+    cached = state_space.get_continuation_values(0)
+    state_space.clear_continuation_values()
+    expected = state_space.get_continuation_values(0)
+
+    assert cached is not continuation_values
+    for key in expected:
+        np.testing.assert_array_equal(cached[key], expected[key])
+        assert not np.array_equal(cached[key], continuation_values[key])
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("model_or_seed", EXAMPLE_MODELS)
+def test_continuation_values_are_equal_to_expected_value_functions_of_children(
+    model_or_seed,
+):
+    params, options = process_model_or_seed(model_or_seed)
+    options["n_periods"] = min(options["n_periods"], 4)
+
+    state_space = get_solve_func(params, options)(params)
+
+    for dense_key, complex_ in state_space.dense_key_to_complex.items():
+        period = complex_[0]
+        if period == options["n_periods"] - 1 or hasattr(
+            state_space, "transit_key_to_choice_set"
+        ):
+            continue
+
+        dense_index = complex_[2] if len(complex_) == 3 else 0
+        continuation_values = state_space.get_continuation_values(period)[dense_key]
+
+        child_indices = state_space.child_indices[dense_key]
+        n_states, n_choices, _ = child_indices.shape
+        for i in range(n_states):
+            for j in range(n_choices):
+                core_key, core_index = child_indices[i, j]
+                child_dense_key = state_space.core_key_and_dense_index_to_dense_key[
+                    core_key, dense_index
+                ]
+                expected = state_space.expected_value_functions[child_dense_key][
+                    core_index
+                ]
+                assert continuation_values[i, j] == expected
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize(
+    "model_or_seed", ["kw_97_extended", "robinson_crusoe_with_observed_characteristics"]
+)
+def test_transformed_draws_are_shared_by_dense_keys_with_same_period_and_choice_set(
+    model_or_seed,
+):
+    params, options = process_model_or_seed(model_or_seed)
+    options["n_periods"] = min(options["n_periods"], 4)
+
+    state_space = get_solve_func(params, options)(params)
+    optim_paras, options = process_params_and_options(params, options)
+
+    draws = _transform_base_draws_of_solution(state_space, optim_paras, options)
+    expected = transform_base_draws_with_cholesky_factor(
+        state_space.base_draws_sol,
+        state_space.dense_key_to_choice_set,
+        optim_paras["shocks_cholesky"],
+        optim_paras,
+    )
+
+    group_to_draws = {}
+    for dense_key, complex_ in state_space.dense_key_to_complex.items():
+        np.testing.assert_array_equal(draws[dense_key], expected[dense_key])
+        group = group_to_draws.setdefault(complex_[:2], draws[dense_key])
+        assert group is draws[dense_key]
+    assert len({id(array) for array in draws.values()}) == len(group_to_draws)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("monte_carlo_sequence", ["random", "halton", "sobol"])
+@pytest.mark.parametrize("n_draws", [6, 7])
+def test_antithetic_base_draws_are_negated_pairs(monte_carlo_sequence, n_draws):
+    draws = create_base_draws((3, n_draws, 4), 0, monte_carlo_sequence, True)
+    n_pairs = n_draws // 2
+
+    assert draws.shape == (3, n_draws, 4)
+    np.testing.assert_array_equal(
+        draws[:, 1 : 2 * n_pairs : 2], -draws[:, : 2 * n_pairs : 2]
+    )
+
+
+@pytest.mark.unit
+def test_control_variate_yields_exact_expected_value_function_of_dominant_choice():
+    """The maximum equals the control variate if one choice dominates for all draws."""
+    wages = np.array([[2.0, 1.0]])
+    nonpecs = np.array([[100.0, 0.0]])
+    continuation_values = np.array([[10.0, 5.0]])
+    draws = np.column_stack((np.exp(np.linspace(-1, 1, 20)), np.linspace(-1, 1, 20)))
+    expected_shocks = np.array([[1.5, 0.0]])
+
+    expected_value_functions = calculate_expected_value_functions_with_control_variate(
+        wages, nonpecs, continuation_values, draws, expected_shocks, 0.9
+    )
+
+    np.testing.assert_allclose(expected_value_functions, 2 * 1.5 + 100 + 0.9 * 10)
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("interpolation_points", [-1, 100])
+def test_solution_with_variance_reduction_is_close_to_plain_solution(
+    interpolation_points,
+):
+    params, options = process_model_or_seed("kw_94_one")
+    options["n_periods"] = 5
+    options["interpolation_points"] = interpolation_points
+
+    state_space = get_solve_func(params, options)(params)
+
+    options["solution_antithetic"] = True
+    options["solution_control_variate"] = True
+    state_space_ = get_solve_func(params, options)(params)
+
+    apply_to_attributes_of_two_state_spaces(
+        state_space.expected_value_functions,
+        state_space_.expected_value_functions,
+        functools.partial(np.testing.assert_allclose, rtol=0.05),
+    )
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("rule", ["gauss_hermite", "sparse_grid"])
+def test_quadrature_integrates_smooth_functions_of_standard_normals_exactly(rule):
+    nodes, weights = create_base_quadrature(3, 3, rule)
+
+    np.testing.assert_allclose(weights.sum(), 1)
+    np.testing.assert_allclose(weights @ nodes ** 2, np.ones(3))
+    np.testing.assert_allclose(
+        weights @ (nodes[:, 0] ** 2 * nodes[:, 1] ** 2 + nodes[:, 2] ** 4), 4
+    )
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("interpolation_points", [-1, 100])
+def test_solution_with_gauss_hermite_quadrature_is_close_to_monte_carlo_solution(
+    interpolation_points,
+):
+    params, options = process_model_or_seed("kw_94_one")
+    options["n_periods"] = 5
+    options["interpolation_points"] = interpolation_points
+    options["solution_draws"] = 1_000
+
+    state_space = get_solve_func(params, options)(params)
+
+    options["solution_integration"] = "gauss_hermite"
+    options["solution_engine"] = "horizon"
+    state_space_ = get_solve_func(params, options)(params)
+
+    for key, draws in state_space_.base_draws_sol.items():
+        assert draws.shape == (3 ** draws.shape[1], draws.shape[1])
+        assert state_space_.base_weights_sol[key].shape == (draws.shape[0],)
+    apply_to_attributes_of_two_state_spaces(
+        state_space.expected_value_functions,
+        state_space_.expected_value_functions,
+        functools.partial(np.testing.assert_allclose, rtol=0.02),
+    )
+
+
+@pytest.mark.unit
+def test_clark_approximation_is_exact_for_the_maximum_of_two_normal_variables():
+    wages = np.ones((1, 2))
+    nonpecs = np.array([[90.0, 95.0]])
+    continuation_values = np.array([[10.0, 5.0]])
+    shocks_covariance = np.array([[4.0, 1.0], [1.0, 2.0]])
+
+    expected_value_functions = calculate_expected_value_functions_with_clark(
+        wages, nonpecs, continuation_values, np.zeros(2), shocks_covariance, 1
+    )
+
+    # The maximum of two normal variables with the same mean exceeds the mean by the
+    # standard deviation of their difference times the density at zero.
+    np.testing.assert_allclose(expected_value_functions, 100 + np.sqrt(4 / (2 * np.pi)))
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("interpolation_points", [-1, 100])
+def test_solution_with_clark_approximation_is_close_to_monte_carlo_solution(
+    interpolation_points,
+):
+    params, options = process_model_or_seed("kw_94_one")
+    options["n_periods"] = 5
+    options["interpolation_points"] = interpolation_points
+    options["solution_draws"] = 1_000
+
+    state_space = get_solve_func(params, options)(params)
+
+    options["solution_integration"] = "clark"
+    state_space_ = get_solve_func(params, options)(params)
+
+    # The closed-form approximation does not create draws.
+    assert all(draws.shape[0] == 1 for draws in state_space_.base_draws_sol.values())
+
+    apply_to_attributes_of_two_state_spaces(
+        state_space.expected_value_functions,
+        state_space_.expected_value_functions,
+        functools.partial(np.testing.assert_allclose, rtol=0.02),
+    )
+
+
+@pytest.mark.unit
+def test_adaptive_draws_stop_after_first_block_without_variance_and_use_all_draws():
+    wages = np.array([[1.0, 1.0], [1.0, 1.0]])
+    nonpecs = np.array([[10.0, 0.0], [10.0, 0.0]])
+    continuation_values = np.zeros((2, 2))
+    draws = np.column_stack((np.zeros(100), np.linspace(-1, 1, 100)))
+
+    # The first state has no variance, but the second state has the same first draw.
+    draws_ = np.stack((draws, draws[:, ::-1]))
+    expected_value_functions, n_draws = calculate_expected_value_functions_adaptively(
+        wages, nonpecs, continuation_values, draws_, 0.95, 1e-12, 10
+    )
+    expected = calculate_expected_value_functions(
+        wages, nonpecs, continuation_values, draws_, 0.95
+    )
+
+    np.testing.assert_array_equal(n_draws, [10, 100])
+    np.testing.assert_allclose(expected_value_functions, expected)
+
+
+@pytest.mark.integration
+def test_solution_with_adaptive_draws_reports_draws_per_period():
+    params, options = process_model_or_seed("kw_94_one")
+    options["n_periods"] = 5
+    options["solution_draws"] = 500
+
+    state_space = get_solve_func(params, options)(params)
+    assert state_space.adaptive_draws_statistics is None
+
+    options["solution_adaptive_tolerance"] = 0.005
+    options["solution_adaptive_block_size"] = 50
+    state_space_ = get_solve_func(params, options)(params)
+    statistics = state_space_.adaptive_draws_statistics
+
+    assert statistics.index.tolist() == list(range(5))
+    assert statistics["min_draws"].min() >= 50
+    assert statistics["max_draws"].max() <= 500
+    assert statistics["mean_draws"].min() < 500
+    apply_to_attributes_of_two_state_spaces(
+        state_space.expected_value_functions,
+        state_space_.expected_value_functions,
+        functools.partial(np.testing.assert_allclose, rtol=0.02),
+    )
+
+
+def _count_solutions(monkeypatch):
+    """Use an empty solution cache and count the solutions which are not cached."""
+    import respy.solve
+
+    monkeypatch.setattr(respy.solve, "_SOLUTIONS", OrderedDict())
+
+    n_solutions = []
+    solve_with_backward_induction = respy.solve._solve_with_backward_induction
+
+    def _solve_and_count(*args, **kwargs):
+        n_solutions.append(1)
+        return solve_with_backward_induction(*args, **kwargs)
+
+    monkeypatch.setattr(
+        respy.solve, "_solve_with_backward_induction", _solve_and_count
+    )
+
+    return n_solutions
+
+
+@pytest.mark.integration
+def test_solution_cache_returns_solutions_of_most_recently_used_params(monkeypatch):
+    n_solutions = _count_solutions(monkeypatch)
+    params, options = process_model_or_seed("kw_97_basic")
+    options["n_periods"] = 3
+
+    expected = get_solve_func(params, options)(params)
+    expected_value_functions = {
+        key: value.copy() for key, value in expected.expected_value_functions.items()
+    }
+    assert len(n_solutions) == 1
+
+    options["solution_cache_size"] = 2
+    solve = get_solve_func(params, options)
+    solve(params)
+    assert len(n_solutions) == 2
+
+    # Parameters of the simulation and the likelihood do not affect the solution.
+    params_ = params.copy()
+    params_.loc[("meas_error", "sd_blue_collar"), "value"] += 0.1
+    params_.loc[("type_2", "up_to_nine_years_school"), "value"] += 0.1
+    state_space = solve(params_)
+    assert len(n_solutions) == 2
+    apply_to_attributes_of_two_state_spaces(
+        state_space.expected_value_functions,
+        expected_value_functions,
+        np.testing.assert_array_equal,
+    )
+
+    # Solutions are evicted if the cache is full, starting with the least recently used.
+    params_wage = params.copy()
+    params_wage.loc[("wage_blue_collar", "constant"), "value"] += 0.1
+    params_delta = params.copy()
+    params_delta.loc[("delta", "delta"), "value"] -= 0.01
+    solve(params_wage)
+    solve(params)
+    solve(params_delta)
+    assert len(n_solutions) == 4
+
+    solve(params)
+    assert len(n_solutions) == 4
+    state_space = solve(params_wage)
+    assert len(n_solutions) == 5
+
+    state_space = solve(params)
+    assert len(n_solutions) == 5
+    apply_to_attributes_of_two_state_spaces(
+        state_space.expected_value_functions,
+        expected_value_functions,
+        np.testing.assert_array_equal,
+    )
+
+
+@pytest.mark.integration
+def test_solution_cache_is_shared_by_simulation_and_likelihood(monkeypatch):
+    n_solutions = _count_solutions(monkeypatch)
+    params, options = process_model_or_seed("robinson_crusoe_basic")
+    options["n_periods"] = 3
+    options["solution_cache_size"] = 1
+
+    simulate = get_simulate_func(params, options)
+    df = simulate(params)
+    log_like = get_log_like_func(params, options, df)
+    value = log_like(params)
+
+    assert len(n_solutions) == 1
+
+    options["solution_cache_size"] = 0
+    expected = get_log_like_func(params, options, df)(params)
+
+    assert len(n_solutions) == 2
+    assert value == expected
+
+
 @pytest.mark.edge_case
 @pytest.mark.unit
 def test_explicitly_nonpec_choice_rewards_of_kw_94_one():